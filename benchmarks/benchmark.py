@@ -0,0 +1,233 @@
+#! /usr/bin/env python
+"""Benchmark suite for the vecutils entry points
+
+Times the public functions of vectorutilities, triangleutilities,
+utilities, transformmatrix and quaternion across input sizes
+(powers of 10) and dtypes (float32 and float64), writing the
+results as JSON.  When a baseline results file is provided,
+each timing is compared against it and the run fails (exit
+status 1) if any case is slower than the baseline by more than
+the threshold.
+
+    python benchmarks/benchmark.py --output current.json
+    python benchmarks/benchmark.py --baseline current.json --threshold 0.25
+
+Array functions are timed at each size, functions which operate
+on single values (e.g. utilities.normalise, rotation_matrix) are
+timed per-call and reported with size 1 (and only as float64,
+see FLOAT64_ONLY).
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import os
+
+# allow running from a checkout without installing
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+
+import numpy
+from vecutils import (
+    vectorutilities, triangleutilities, utilities, transformmatrix, quaternion,
+)
+
+DEFAULT_SIZES = [10**i for i in range(2,8)]
+DEFAULT_DTYPES = ['float32','float64']
+
+def _vectors( size, dtype, width=3, seed=1 ):
+    return numpy.random.RandomState( seed ).uniform( -1, 1, (size,width) ).astype( dtype )
+
+def _triangles( size, dtype ):
+    return _vectors( max(3,size - size % 3), dtype )
+
+def _quaternions( size, dtype ):
+    return quaternion.xyzrToQuaternions( _vectors( size, dtype, 4 ) ).astype( dtype )
+
+def _rotations( size, dtype ):
+    return _vectors( size, dtype, 4 )
+
+# name -> (setup(size,dtype) -> args, function, scales-with-size)
+CASES = [
+    ('vectorutilities.crossProduct', lambda n,d: (_vectors(n,d),_vectors(n,d,seed=2)), vectorutilities.crossProduct, True),
+    ('vectorutilities.crossProduct4', lambda n,d: (_vectors(n,d,4),_vectors(n,d,4,seed=2)), vectorutilities.crossProduct4, True),
+    ('vectorutilities.magnitude', lambda n,d: (_vectors(n,d),), vectorutilities.magnitude, True),
+    ('vectorutilities.normalise', lambda n,d: (_vectors(n,d),), vectorutilities.normalise, True),
+    ('vectorutilities.colinear', lambda n,d: (_vectors(3,d),), vectorutilities.colinear, False),
+    ('vectorutilities.orientToXYZR', lambda n,d: ((0,0,-1),(1,0,0)), vectorutilities.orientToXYZR, False),
+    ('triangleutilities.basisVectors', lambda n,d: (_triangles(n,d),), triangleutilities.basisVectors, True),
+    ('triangleutilities.centers', lambda n,d: (_triangles(n,d),), triangleutilities.centers, True),
+    ('triangleutilities.normalPerFace', lambda n,d: (_triangles(n,d),), triangleutilities.normalPerFace, True),
+    ('utilities.coplanar', lambda n,d: (_vectors(n,d),), utilities.coplanar, True),
+    ('utilities.combineNormals', lambda n,d: (_vectors(n,d),), utilities.combineNormals, True),
+    ('utilities.crossProduct', lambda n,d: ((0,1,0,0),(1,0,0,0)), utilities.crossProduct, False),
+    ('utilities.magnitude', lambda n,d: ((1,1,0,0),), utilities.magnitude, False),
+    ('utilities.normalise', lambda n,d: ((1,1,0,0),), utilities.normalise, False),
+    ('utilities.pointNormal2Plane', lambda n,d: ((0,1,0),(0,1,1)), utilities.pointNormal2Plane, False),
+    ('utilities.plane2PointNormal', lambda n,d: ((0,1,0,1),), utilities.plane2PointNormal, False),
+    ('transformmatrix.transform_matrix', lambda n,d: ((1,2,3),(0,0,0),(0,1,0,.5),(2,2,2)), transformmatrix.transform_matrix, False),
+    ('transformmatrix.transform_matrices', lambda n,d: ((1,2,3),(0,0,0),(0,1,0,.5),(2,2,2)), transformmatrix.transform_matrices, False),
+    ('transformmatrix.fused_transform_matrices', lambda n,d: ((1,2,3),(0,0,0),(0,1,0,.5),(2,2,2)), transformmatrix.fused_transform_matrices, False),
+    ('transformmatrix.rotation_matrix', lambda n,d: ((0,1,0,.5),), transformmatrix.rotation_matrix, False),
+    ('transformmatrix.perspective_matrix', lambda n,d: (1.0,1.5,.1,100.), transformmatrix.perspective_matrix, False),
+    ('transformmatrix.transform_matrices_stack', lambda n,d: (_vectors(n,d),None,_rotations(n,d),_vectors(n,d)+2), lambda *a: transformmatrix.transform_matrices_stack( *a, dtype=a[0].dtype ), True),
+    ('transformmatrix.fused_transform_matrices_stack', lambda n,d: (_vectors(n,d),None,_rotations(n,d),_vectors(n,d)+2), lambda *a: transformmatrix.fused_transform_matrices_stack( *a, dtype=a[0].dtype ), True),
+    ('transformmatrix.transform_points', lambda n,d: (_vectors(n,d),transformmatrix.transform_matrix((1,2,3),rotation=(0,1,0,.5)).astype(d)), transformmatrix.transform_points, True),
+    ('transformmatrix.transform_normals', lambda n,d: (_vectors(n,d),transformmatrix.transform_matrix((1,2,3),scale=(1,2,3)).astype(d)), transformmatrix.transform_normals, True),
+    ('transformmatrix.decompose_matrices', lambda n,d: (transformmatrix.transform_matrix_stack(_vectors(n,d),rotations=_rotations(n,d),dtype=d),), transformmatrix.decompose_matrices, True),
+    ('quaternion.fromXYZR', lambda n,d: (0,1,0,.5), quaternion.fromXYZR, False),
+    ('quaternion.fromEuler', lambda n,d: (.1,.2,.3), quaternion.fromEuler, False),
+    ('quaternion.Quaternion.__mul__', lambda n,d: (quaternion.fromXYZR(0,1,0,.5),quaternion.fromXYZR(1,0,0,.2)), lambda a,b: a*b, False),
+    ('quaternion.Quaternion.matrix', lambda n,d: (quaternion.fromXYZR(0,1,0,.5),), lambda a: a.matrix(), False),
+    ('quaternion.Quaternion.slerp', lambda n,d: (quaternion.fromXYZR(0,1,0,.5),quaternion.fromXYZR(1,0,0,.2),.3), lambda a,b,f: a.slerp(b,f), False),
+    ('quaternion.xyzrToQuaternions', lambda n,d: (_rotations(n,d),), quaternion.xyzrToQuaternions, True),
+    ('quaternion.quaternionsToXYZR', lambda n,d: (_quaternions(n,d),), quaternion.quaternionsToXYZR, True),
+]
+
+# cases whose inputs are fixed Python values (the dtype does not apply),
+# only run (and reported) as float64
+FLOAT64_ONLY = set([
+    'vectorutilities.orientToXYZR',
+    'utilities.crossProduct',
+    'utilities.magnitude',
+    'utilities.normalise',
+    'utilities.pointNormal2Plane',
+    'utilities.plane2PointNormal',
+    'transformmatrix.transform_matrix',
+    'transformmatrix.transform_matrices',
+    'transformmatrix.fused_transform_matrices',
+    'transformmatrix.rotation_matrix',
+    'transformmatrix.perspective_matrix',
+    'quaternion.fromXYZR',
+    'quaternion.fromEuler',
+    'quaternion.Quaternion.__mul__',
+    'quaternion.Quaternion.matrix',
+    'quaternion.Quaternion.slerp',
+])
+
+def time_call( function, args, repeat=3, minTime=0.05 ):
+    """Return the best per-call time in seconds for function(*args)
+
+    The number of calls per measurement is increased until a
+    measurement takes at least minTime, the best of repeat
+    measurements is reported.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for i in range( number ):
+            function( *args )
+        elapsed = time.perf_counter() - start
+        if elapsed >= minTime or number >= 1<<20:
+            break
+        number *= max( 2, min( 10, int( minTime / (elapsed or 1e-9) ) + 1 ))
+    best = elapsed / number
+    for i in range( repeat - 1 ):
+        start = time.perf_counter()
+        for i in range( number ):
+            function( *args )
+        best = min( best, (time.perf_counter() - start)/number )
+    return best
+
+def run( sizes=DEFAULT_SIZES, dtypes=DEFAULT_DTYPES, pattern=None, repeat=3, minTime=0.05, log=None ):
+    """Run the benchmark cases, returning list of result records"""
+    results = []
+    for name,setup,function,scaled in CASES:
+        if pattern and pattern not in name:
+            continue
+        for dtype in dtypes:
+            if name in FLOAT64_ONLY and dtype != 'float64':
+                continue
+            for size in (sizes if scaled else [1]):
+                try:
+                    args = setup( size, dtype )
+                    seconds = time_call( function, args, repeat=repeat, minTime=minTime )
+                except MemoryError:
+                    if log:
+                        log.write( '%-50s %-8s %10s   MemoryError\n'%( name, dtype, size ))
+                    continue
+                record = {
+                    'name': name,
+                    'dtype': dtype,
+                    'size': size,
+                    'seconds': seconds,
+                    'per_item': seconds/size,
+                }
+                results.append( record )
+                if log:
+                    log.write( '%-50s %-8s %10s %12.3es\n'%( name, dtype, size, seconds ))
+    return results
+
+def _key( record ):
+    return (record['name'],record['dtype'],record['size'])
+
+def compare( results, baseline, threshold=0.25 ):
+    """Compare result records against baseline records
+
+    returns list of (record, baselineSeconds, ratio) for records
+    slower than baseline by more than threshold (fractional)
+    """
+    previous = dict([ (_key(r),r['seconds']) for r in baseline ])
+    regressions = []
+    for record in results:
+        old = previous.get( _key(record) )
+        if old:
+            ratio = record['seconds'] / old
+            if ratio > 1.0 + threshold:
+                regressions.append( (record,old,ratio) )
+    return regressions
+
+def metadata():
+    """Description of the environment for the results file"""
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime( '%Y-%m-%dT%H:%M:%S' ),
+    }
+
+def get_options():
+    parser = argparse.ArgumentParser( description='Benchmark vecutils entry points' )
+    parser.add_argument( '--output', help='JSON file to which to write results' )
+    parser.add_argument( '--baseline', help='JSON results file to compare against' )
+    parser.add_argument( '--threshold', type=float, default=0.25, help='Fractional slow-down which counts as a regression (default 0.25)' )
+    parser.add_argument( '--max-size', type=float, default=1e7, help='Largest input size to time (default 1e7)' )
+    parser.add_argument( '--min-size', type=float, default=1e2, help='Smallest input size to time (default 1e2)' )
+    parser.add_argument( '--dtype', action='append', choices=DEFAULT_DTYPES, help='Restrict to the given dtype(s)' )
+    parser.add_argument( '--filter', help='Only run cases whose name contains this string' )
+    parser.add_argument( '--repeat', type=int, default=3, help='Measurements per case (best is reported)' )
+    parser.add_argument( '--min-time', type=float, default=0.05, help='Minimum seconds per measurement' )
+    return parser
+
+def main():
+    options = get_options().parse_args()
+    sizes = [s for s in DEFAULT_SIZES if options.min_size <= s <= options.max_size]
+    results = run(
+        sizes = sizes,
+        dtypes = options.dtype or DEFAULT_DTYPES,
+        pattern = options.filter,
+        repeat = options.repeat,
+        minTime = options.min_time,
+        log = sys.stdout,
+    )
+    if options.output:
+        with open( options.output, 'w' ) as fh:
+            json.dump( {'metadata': metadata(), 'results': results}, fh, indent=2 )
+    if options.baseline:
+        with open( options.baseline ) as fh:
+            baseline = json.load( fh )['results']
+        regressions = compare( results, baseline, options.threshold )
+        if regressions:
+            sys.stderr.write( 'REGRESSIONS (>%.0f%% slower than baseline):\n'%( options.threshold*100, ))
+            for record,old,ratio in regressions:
+                sys.stderr.write( '  %-50s %-8s %10s %12.3es -> %12.3es (x%.2f)\n'%(
+                    record['name'], record['dtype'], record['size'], old, record['seconds'], ratio,
+                ))
+            return 1
+        sys.stdout.write( 'No regressions against %s\n'%( options.baseline, ))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit( main() )
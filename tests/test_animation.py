@@ -0,0 +1,55 @@
+from vecutils import arrays, animation, quaternion
+import unittest
+
+def ac(x, y):
+    assert arrays.allclose(x, y), (x, y)
+
+class TestAnimation( unittest.TestCase ):
+    def setUp( self ):
+        self.tracks = animation.KeyframeTracks( [
+            ([0, 1, 3], [(0,0,0),(1,0,0),(1,2,0)]),
+            ([2], [(5,5,5)]),
+            ([0, 10], [(0,0,0),(0,0,10)]),
+        ] )
+    def test_sample( self ):
+        ac( self.tracks.sample( .5 ), [(.5,0,0),(5,5,5),(0,0,.5)] )
+        ac( self.tracks.sample( 2 ), [(1,1,0),(5,5,5),(0,0,2)] )
+        ac( self.tracks.sample( 1 ), [(1,0,0),(5,5,5),(0,0,1)] )
+    def test_clamp( self ):
+        ac( self.tracks.sample( -1 ), [(0,0,0),(5,5,5),(0,0,0)] )
+        ac( self.tracks.sample( 20 ), [(1,2,0),(5,5,5),(0,0,10)] )
+    def test_batch( self ):
+        produced = self.tracks.sample( [0, .5, 2, 20] )
+        assert produced.shape == (4,3,3), produced.shape
+        for time,values in zip( [0, .5, 2, 20], produced ):
+            ac( values, self.tracks.sample( time ) )
+    def test_invalid( self ):
+        self.assertRaises( ValueError, animation.KeyframeTracks, [([], [])] )
+        self.assertRaises( ValueError, animation.KeyframeTracks, [([1,0], [(0,),(1,)])] )
+    def test_slerp( self ):
+        first = quaternion.fromXYZR( 0,1,0,0 )
+        second = quaternion.fromXYZR( 0,1,0,arrays.pi )
+        third = quaternion.fromXYZR( 1,0,0,.5 )
+        sampler = animation.AnimationSampler(
+            rotations = [
+                ([0, 1], [first.internal, second.internal]),
+                ([0, 1], [second.internal, third.internal]),
+                ([0, 1], [third.internal, third.internal]),
+            ],
+        )
+        for fraction in arrays.arange( 0.0, 1.0, .05 ):
+            translations,rotations,scales = sampler.sample( fraction )
+            assert translations is None and scales is None
+            ac( rotations[0], first.slerp( second, fraction ).internal )
+            ac( rotations[1], second.slerp( third, fraction ).internal )
+            ac( rotations[2], third.internal )
+    def test_slerp_arrays( self ):
+        generator = arrays.random.RandomState( 2 )
+        first = quaternion.xyzrToQuaternions( generator.uniform( -3, 3, (30,4) ) )
+        second = quaternion.xyzrToQuaternions( generator.uniform( -3, 3, (30,4) ) )
+        second[0] = first[0]
+        fractions = generator.uniform( 0, 1, 30 )
+        produced = quaternion.slerpQuaternions( first, second, fractions )
+        for a,b,f,p in zip( first, second, fractions, produced ):
+            expected = quaternion.Quaternion( a ).slerp( quaternion.Quaternion( b ), f )
+            ac( p, expected.internal )
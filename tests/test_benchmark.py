@@ -0,0 +1,45 @@
+import importlib.util
+import os
+import unittest
+
+HERE = os.path.dirname( os.path.abspath( __file__ ) )
+spec = importlib.util.spec_from_file_location(
+    'benchmark', os.path.join( os.path.dirname( HERE ), 'benchmarks', 'benchmark.py' ),
+)
+benchmark = importlib.util.module_from_spec( spec )
+spec.loader.exec_module( benchmark )
+
+def record( name, dtype, size, seconds ):
+    return {'name':name,'dtype':dtype,'size':size,'seconds':seconds,'per_item':seconds/size}
+
+class TestCompare( unittest.TestCase ):
+    def test_compare( self ):
+        baseline = [
+            record( 'a', 'float32', 100, 1.0 ),
+            record( 'a', 'float64', 100, 2.0 ),
+            record( 'b', 'float64', 1, 0.0 ),
+        ]
+        results = [
+            record( 'a', 'float32', 100, 1.2 ),   # within threshold
+            record( 'a', 'float64', 100, 3.0 ),   # regression
+            record( 'a', 'float64', 1000, 50.0 ), # no baseline
+            record( 'b', 'float64', 1, 1.0 ),     # zero baseline is ignored
+        ]
+        regressions = benchmark.compare( results, baseline, threshold=0.25 )
+        assert len(regressions) == 1, regressions
+        found, old, ratio = regressions[0]
+        assert (found['dtype'], found['size']) == ('float64', 100)
+        assert old == 2.0 and abs( ratio - 1.5 ) < 1e-12
+        assert benchmark.compare( results, baseline, threshold=0.6 ) == []
+    def test_dtypes( self ):
+        # array cases produce inputs of the requested dtype
+        for name, setup, function, scaled in benchmark.CASES:
+            if name in benchmark.FLOAT64_ONLY or not scaled:
+                continue
+            for dtype in ('float32', 'float64'):
+                for arg in setup( 12, dtype ):
+                    if hasattr( arg, 'dtype' ) and arg.dtype.kind == 'f':
+                        assert arg.dtype == dtype, (name, dtype, arg.dtype)
+
+if __name__ == "__main__":
+    unittest.main()
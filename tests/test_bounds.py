@@ -0,0 +1,94 @@
+from vecutils import arrays, bounds, transformmatrix
+import unittest
+
+class TestBounds( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 3 )
+        self.generator = generator
+        self.soup = generator.uniform( -5, 5, (3000,3) )
+        self.vertices = generator.uniform( -5, 5, (500,3) )
+        self.indices = generator.randint( 0, 500, (400,3) )
+    def test_mesh_bounds( self ):
+        box = bounds.mesh_bounds( self.soup, blockSize=128 )
+        assert arrays.allclose( box, [self.soup.min( 0 ), self.soup.max( 0 )] )
+        center, radius = bounds.mesh_sphere( self.soup )
+        assert arrays.allclose( center, box.sum( 0 )/2 )
+        assert arrays.allclose( radius, arrays.sqrt( ((self.soup - center)**2).sum( 1 ) ).max() )
+    def test_float32( self ):
+        soup = self.soup.astype( 'f' )
+        assert bounds.mesh_bounds( soup ).dtype == arrays.float32
+        assert bounds.triangle_bounds( soup ).dtype == arrays.float32
+    def test_triangle_bounds( self ):
+        corners = self.vertices[self.indices]
+        boxes = bounds.triangle_bounds( self.vertices, self.indices )
+        assert arrays.allclose( boxes[:,0], corners.min( 1 ) )
+        assert arrays.allclose( boxes[:,1], corners.max( 1 ) )
+        boxes = bounds.triangle_bounds( self.soup )
+        assert boxes.shape == (1000,2,3)
+        assert arrays.allclose( boxes[:,1], self.soup.reshape( (-1,3,3) ).max( 1 ) )
+    def test_triangle_spheres( self ):
+        corners = self.soup.reshape( (-1,3,3) )
+        centers, radii = bounds.triangle_spheres( self.soup )
+        distances = arrays.sqrt( ((corners - centers[:,None])**2).sum( 2 ) )
+        assert (distances <= radii[:,None] + 1e-9).all()
+        # minimal: no smaller than half the longest edge, nor the circumradius when acute
+        edges = arrays.sqrt( ((corners - corners[:,[1,2,0]])**2).sum( 2 ) )
+        assert (radii >= edges.max( 1 )/2 - 1e-9).all()
+        assert (radii <= edges.max( 1 )/arrays.sqrt( 3 ) + 1e-9).all()
+    def test_special_triangles( self ):
+        triangles = [
+            [0,0,0],[2,0,0],[1,1,0], # right angle at the third vertex
+            [0,0,0],[4,0,0],[1,.1,0], # obtuse
+            [0,0,0],[1,0,0],[3,0,0], # degenerate
+            [0,0,0],[1,0,0],[.5,3**.5/2,0], # equilateral
+        ]
+        centers, radii = bounds.triangle_spheres( triangles )
+        assert arrays.allclose( centers[:3], [[1,0,0],[2,0,0],[1.5,0,0]] )
+        assert arrays.allclose( radii[:3], [1,2,1.5] )
+        assert arrays.allclose( centers[3], [.5,3**.5/6,0] )
+        assert arrays.allclose( radii[3], 1/3**.5 )
+    def test_transform_aabbs( self ):
+        boxes = bounds.triangle_bounds( self.soup )[:50]
+        matrices = transformmatrix.transform_matrix_stack(
+            translations=self.generator.uniform( -3, 3, (50,3) ),
+            rotations=self.generator.uniform( -1, 1, (50,4) ),
+            scales=self.generator.uniform( .5, 2, (50,3) ),
+        ).astype( 'd' )
+        result = bounds.transform_aabbs( boxes, matrices )
+        for box, matrix, transformed in zip( boxes, matrices, result ):
+            corners = arrays.array( [
+                [box[i,0],box[j,1],box[k,2],1] for i in (0,1) for j in (0,1) for k in (0,1)
+            ] )
+            points = corners.dot( matrix )[:,:3]
+            assert arrays.allclose( transformed, [points.min( 0 ), points.max( 0 )] )
+        single = bounds.transform_aabbs( boxes, matrices[0] )
+        assert arrays.allclose( single[0], result[0] )
+    def check( self, tracker, vertices, indices=None ):
+        expected = bounds.MeshBounds( vertices, indices, blockSize=tracker.blockSize )
+        assert arrays.allclose( tracker.box, expected.box )
+        assert arrays.allclose( tracker.blocks, expected.blocks )
+        assert arrays.allclose( tracker.triangleBoxes, expected.triangleBoxes )
+        assert arrays.allclose( tracker.triangleCenters, expected.triangleCenters )
+        assert arrays.allclose( tracker.triangleRadii, expected.triangleRadii )
+        distances = arrays.sqrt( ((vertices - tracker.center)**2).sum( 1 ) )
+        assert (distances <= tracker.radius + 1e-9).all()
+    def test_incremental_soup( self ):
+        soup = self.soup.copy()
+        tracker = bounds.MeshBounds( soup, blockSize=100 )
+        assert arrays.shares_memory( tracker.vertices, soup )
+        soup[250:320] *= 3
+        tracker.mark_dirty( 250, 320 )
+        updated = tracker.update()
+        assert set( updated ) == set( range( 66, 134 ) )
+        self.check( tracker, soup )
+        assert not len( tracker.update() )
+    def test_incremental_indexed( self ):
+        tracker = bounds.MeshBounds( self.vertices.copy(), self.indices, blockSize=64 )
+        tracker.set_vertices( 10, self.generator.uniform( -20, 20, (5,3) ) )
+        updated = tracker.update()
+        assert set( arrays.flatnonzero( (self.indices < 64).any( 1 ) ) ) == set( updated )
+        self.check( tracker, tracker.vertices, self.indices )
+        self.assertRaises( ValueError, tracker.set_vertices, 498, arrays.zeros( (5,3) ) )
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+from vecutils import arrays, bvh
+import unittest
+
+class TestTriangleBVH( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 12 )
+        self.generator = generator
+        centers = generator.uniform( -10, 10, (2000,1,3) )
+        self.soup = (centers + generator.uniform( -.5, .5, (2000,3,3) )).reshape( (-1,3) ).astype( 'f' )
+        self.tree = bvh.TriangleBVH( self.soup )
+    def brute_boxes( self, lower, upper ):
+        return set([
+            (i,j) for i in range( len(lower) ) for j in arrays.flatnonzero( (
+                (self.tree.triangleLower <= upper[i]) & (self.tree.triangleUpper >= lower[i])
+            ).all( 1 ) )
+        ])
+    def test_structure( self ):
+        tree = self.tree
+        leaves = tree.left < 0
+        assert (tree.count[leaves] <= 4).all()
+        assert tree.count[leaves].sum() == 2000
+        assert sorted( tree.order ) == list( range( 2000 ) )
+        internal = arrays.flatnonzero( ~leaves )
+        children = tree.left[internal]
+        assert (tree.count[children] + tree.count[children+1] == tree.count[internal]).all()
+        assert (tree.lower[internal] <= tree.lower[children]).all()
+        assert (tree.upper[internal] >= tree.upper[children+1]).all()
+        assert len(tree.levels) < 20
+    def test_query_boxes( self ):
+        lower = self.generator.uniform( -10, 8, (30,3) )
+        upper = lower + 2
+        queries, triangles = self.tree.query_boxes( lower, upper )
+        assert set( zip( queries.tolist(), triangles.tolist() ) ) == self.brute_boxes( lower, upper )
+    def test_query_spheres( self ):
+        centers = self.generator.uniform( -10, 10, (30,3) )
+        queries, triangles = self.tree.query_spheres( centers, 1.5 )
+        found = set( zip( queries.tolist(), triangles.tolist() ) )
+        expected = set()
+        for i,center in enumerate( centers ):
+            nearest = arrays.minimum( arrays.maximum( center, self.tree.triangleLower ), self.tree.triangleUpper )
+            for j in arrays.flatnonzero( ((nearest - center)**2).sum( 1 ) <= 1.5**2 ):
+                expected.add( (i,j) )
+        assert found == expected
+    def test_query_rays( self ):
+        origins = self.generator.uniform( -12, 12, (40,3) )
+        directions = self.generator.normal( size=(40,3) )
+        directions[0] = (0,0,1)
+        queries, triangles = self.tree.query_rays( origins, directions )
+        found = set( zip( queries.tolist(), triangles.tolist() ) )
+        hit = self.tree._slabs(
+            origins.repeat( 2000, 0 ), 1.0/directions.repeat( 2000, 0 ),
+            arrays.tile( self.tree.triangleLower, (40,1) ), arrays.tile( self.tree.triangleUpper, (40,1) ),
+            arrays.inf,
+        )[0].reshape( (40,2000) )
+        expected = set( zip( *[a.tolist() for a in arrays.nonzero( hit )] ) )
+        assert found == expected
+        assert len(found)
+    def test_indexed_and_refit( self ):
+        vertices = self.soup
+        indices = arrays.arange( len(vertices) ).reshape( (-1,3) )
+        tree = bvh.TriangleBVH( vertices, indices, leafSize=2 )
+        moved = vertices + (5,0,0)
+        tree.refit( moved )
+        assert arrays.allclose( tree.lower[0], moved.min( 0 ) )
+        lower = self.generator.uniform( -5, 13, (20,3) )
+        upper = lower + 2
+        queries, triangles = tree.query_boxes( lower, upper )
+        expected = set([
+            (i,j) for i in range( len(lower) ) for j in arrays.flatnonzero( (
+                (tree.triangleLower <= upper[i]) & (tree.triangleUpper >= lower[i])
+            ).all( 1 ) )
+        ])
+        assert set( zip( queries.tolist(), triangles.tolist() ) ) == expected
+        self.assertRaises( ValueError, tree.refit, vertices[:10] )
+    def test_degenerate( self ):
+        # identical triangles cannot be separated by center, halved instead
+        soup = arrays.array( [(0,0,0),(1,0,0),(0,1,0)]*20, 'f' )
+        tree = bvh.TriangleBVH( soup )
+        assert (tree.count[tree.left < 0] <= 4).all()
+        queries, triangles = tree.query_boxes( [(0,0,0)], [(1,1,1)] )
+        assert sorted( triangles ) == list( range( 20 ) )
+        empty = bvh.TriangleBVH( arrays.zeros( (0,3), 'f' ) )
+        assert len(empty.query_boxes( [(0,0,0)], [(1,1,1)] )[0]) == 0
@@ -0,0 +1,41 @@
+from vecutils import arrays, culling, transformmatrix, utilities
+import unittest
+
+class TestCulling( unittest.TestCase ):
+    def setUp( self ):
+        # camera at z=10 looking down -z
+        view = transformmatrix.transform_matrix( translation=(0,0,-10) )
+        projection = transformmatrix.perspective_matrix( arrays.pi/2, 1.0, 1.0, 100.0 )
+        self.planes = culling.frustum_planes( arrays.dot( view, projection ) )
+    def test_near_far( self ):
+        near = self.planes[culling.NEAR]
+        far = self.planes[culling.FAR]
+        expected = utilities.pointNormal2Plane( (0,0,9), (0,0,-1) )
+        assert arrays.allclose( near, expected, atol=1e-5 ), (near, expected)
+        expected = utilities.pointNormal2Plane( (0,0,-90), (0,0,1) )
+        assert arrays.allclose( far, expected, atol=1e-5 ), (far, expected)
+    def test_spheres( self ):
+        centers = [(0,0,0), (0,0,20), (0,0,9), (50,0,0), (0,0,-200)]
+        inside,outside,intersecting = culling.cull_spheres( self.planes, centers, 1.0 )
+        assert inside.tolist() == [True, False, False, False, False], inside
+        assert outside.tolist() == [False, True, False, True, True], outside
+        assert intersecting.tolist() == [False, False, True, False, False], intersecting
+    def test_boxes( self ):
+        boxes = [
+            [(-1,-1,-1), (1,1,1)],
+            [(-1,-1,15), (1,1,20)],
+            [(-1,-1,5), (1,1,15)],
+            [(-200,-200,-50), (200,200,0)],
+        ]
+        inside,outside,intersecting = culling.cull_boxes( self.planes, boxes )
+        assert inside.tolist() == [True, False, False, False], inside
+        assert outside.tolist() == [False, True, False, False], outside
+        assert intersecting.tolist() == [False, False, True, True], intersecting
+    def test_ortho( self ):
+        projection = transformmatrix.ortho_matrix( -1, 1, -1, 1, -1, 1 ).T
+        planes = culling.frustum_planes( projection )
+        inside,outside,intersecting = culling.cull_spheres(
+            planes, [(0,0,0), (2,0,0), (1,0,0)], [.5, .5, .5],
+        )
+        assert inside.tolist() == [True, False, False]
+        assert outside.tolist() == [False, True, False]
@@ -0,0 +1,84 @@
+from vecutils import arrays, hierarchy, transformmatrix
+import unittest
+
+class TestHierarchy( unittest.TestCase ):
+    def setUp( self ):
+        # 0 -> (1 -> (3, 4), 2 -> 5), 6 -> 7
+        self.parents = [-1, 0, 0, 1, 1, 2, -1, 6]
+        self.tree = hierarchy.TransformHierarchy( self.parents )
+        generator = arrays.random.RandomState( 7 )
+        count = len(self.parents)
+        self.tree.set_transforms(
+            slice(None),
+            translations = generator.uniform( -3, 3, (count,3) ),
+            rotations = generator.uniform( -1, 1, (count,4) ),
+            scales = generator.uniform( .5, 2, (count,3) ),
+        )
+    def _expected( self, index ):
+        """Recursive scalar reference for a node's world matrix"""
+        parent = self.parents[index]
+        parentMatrix = None
+        if parent >= 0:
+            parentMatrix = self._expected( parent )
+        matrix = transformmatrix.transform_matrix(
+            translation = self.tree.translations[index],
+            rotation = self.tree.rotations[index],
+            scale = self.tree.scales[index],
+            parentMatrix = parentMatrix,
+        )
+        return matrix
+    def _check( self ):
+        for i in range( len(self.tree) ):
+            expected = self._expected( i )
+            assert arrays.allclose( self.tree.world[i], expected, atol=1e-4 ), (i, self.tree.world[i], expected)
+            assert arrays.allclose(
+                arrays.dot( self.tree.world[i], self.tree.worldInverse[i] ),
+                arrays.identity(4), atol=1e-4,
+            )
+    def test_levels( self ):
+        depths,levels = hierarchy.hierarchy_levels( self.parents )
+        assert depths.tolist() == [0, 1, 1, 2, 2, 2, 0, 1], depths
+        assert [sorted(l.tolist()) for l in levels] == [[0,6],[1,2,7],[3,4,5]], levels
+    def test_cycle( self ):
+        self.assertRaises( ValueError, hierarchy.hierarchy_levels, [1, 0, -1] )
+        self.assertRaises( ValueError, hierarchy.hierarchy_levels, [-1, 5] )
+    def test_world_matrices( self ):
+        assert self.tree.update() == len(self.parents)
+        self._check()
+    def test_incremental( self ):
+        self.tree.update()
+        assert self.tree.update() == 0
+        self.tree.set_transforms( 5, translations=(1,2,3) )
+        assert self.tree.update() == 1
+        self._check()
+        self.tree.set_transforms( 1, rotations=(1,0,0,.5) )
+        assert self.tree.update() == 3
+        self._check()
+    def test_depth_first_order( self ):
+        depths,levels = hierarchy.hierarchy_levels( self.parents )
+        order,starts,stops = hierarchy.depth_first_order( self.parents, levels )
+        assert order.tolist() == [0, 1, 3, 4, 2, 5, 6, 7], order
+        assert sorted( order[starts[1]:stops[1]].tolist() ) == [1, 3, 4]
+        assert order[starts[6]:stops[6]].tolist() == [6, 7]
+        assert (stops - starts).tolist() == [6, 3, 2, 1, 1, 1, 2, 1]
+    def test_incremental_random( self ):
+        generator = arrays.random.RandomState( 3 )
+        parents = [-1] + [generator.randint( -1, i ) for i in range( 1, 200 )]
+        tree = hierarchy.TransformHierarchy( parents, dtype='d' )
+        tree.set_transforms( slice(None), translations=generator.uniform( -1, 1, (200,3) ) )
+        tree.update()
+        changed = generator.randint( 0, 200, 12 )
+        tree.set_transforms( changed, translations=generator.uniform( -1, 1, (12,3) ) )
+        world = tree.world.copy()
+        recalculated = tree.update()
+        full = hierarchy.TransformHierarchy( parents, dtype='d' )
+        full.set_transforms( slice(None), translations=tree.translations )
+        full.update()
+        assert arrays.allclose( tree.world, full.world )
+        # only the changed subtrees were recalculated
+        affected = set()
+        for node in changed:
+            affected.update( tree.order[tree.starts[node]:tree.stops[node]].tolist() )
+        assert recalculated == len(affected), (recalculated, len(affected))
+        untouched = sorted( set( range( 200 ) ) - affected )
+        assert (tree.world[untouched] == world[untouched]).all()
@@ -0,0 +1,68 @@
+from vecutils import arrays, instrument, vectorutilities, triangleutilities
+import unittest
+
+class TestInstrument( unittest.TestCase ):
+    def test_disabled( self ):
+        assert instrument.active() is None
+        vectorutilities.normalise( [[1,0,0]] )
+        assert instrument.active() is None
+    def test_no_wrappers_when_disabled( self ):
+        raw = vectorutilities.magnitude
+        normalise = triangleutilities.normalise
+        assert not hasattr( raw, '__wrapped__' )
+        assert vectorutilities.asarray is arrays.asarray
+        with instrument.recording():
+            assert vectorutilities.magnitude is not raw
+            # names imported into other modules are swapped too
+            assert triangleutilities.normalise is not normalise
+        assert vectorutilities.magnitude is raw
+        assert triangleutilities.normalise is normalise
+        assert vectorutilities.asarray is arrays.asarray
+    def test_recording( self ):
+        data = arrays.ones( (10,4), 'f' )
+        other = arrays.ones( (10,4), 'd' )
+        with instrument.recording() as recorder:
+            vectorutilities.crossProduct4( data, other )
+            vectorutilities.magnitude( data )
+            vectorutilities.magnitude( data )
+            vectorutilities.normalise( arrays.ones( (10,3), 'i' ) )
+        assert instrument.active() is None
+        stats = recorder.stats( 'vectorutilities.crossProduct4' )
+        assert stats['calls'] == 1, stats
+        assert stats['casts'] == 0, stats
+        assert stats['result_bytes'] == 10*4*8, stats
+        stats = recorder.stats( 'vectorutilities.normalise' )
+        assert stats['casts'] == 1, stats
+        stats = recorder.stats( 'vectorutilities.magnitude' )
+        # normalise calls magnitude into a scratch buffer
+        assert stats['calls'] == 3, stats
+        assert stats['copies'] == stats['casts'] == 0, stats
+        assert stats['result_bytes'] == 2 * 10 * 4, stats
+        assert 'vectorutilities.magnitude' in recorder.report()
+    def test_conversions( self ):
+        with instrument.recording() as recorder:
+            triangleutilities.normalPerFace( [[0,0,0],[1,0,0],[0,1,0]] )
+        stats = recorder.stats( 'triangleutilities.normalPerFace' )
+        assert stats['conversions'] == 1, stats
+        assert recorder.stats( 'triangleutilities.normalPerFace' )['calls'] == 1
+        assert recorder.stats( 'vectorutilities.normalise' )['calls'] == 1
+    def test_reshape_copy( self ):
+        data = arrays.ones( (4,6), 'f' )[:,:3]
+        with instrument.recording() as recorder:
+            instrument.reshape( data, (-1,) )
+            instrument.reshape( arrays.ones( (4,3) ), (-1,) )
+        assert recorder.stats( instrument.UNTRACED )['copies'] == 1
+    def test_zero_allocation( self ):
+        """Steady-state loops with out/scratch allocate no new arrays"""
+        vertices = arrays.random.RandomState( 1 ).uniform( -1, 1, (30,3) ).astype( 'f' )
+        normals = arrays.zeros( (10,3), 'f' )
+        scratch = {}
+        triangleutilities.normalPerFace( vertices, out=normals, scratch=scratch )
+        with instrument.recording() as recorder:
+            for i in range( 3 ):
+                result = triangleutilities.normalPerFace( vertices, out=normals, scratch=scratch )
+        assert result is normals
+        for name,stats in recorder.functions.items():
+            assert stats.result_bytes == 0, (name, stats.as_dict())
+            assert stats.copies == stats.casts == stats.conversions == 0, (name, stats.as_dict())
+        assert arrays.allclose( normals, triangleutilities.normalPerFace( vertices ) )
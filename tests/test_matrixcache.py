@@ -0,0 +1,45 @@
+from vecutils import arrays, matrixcache, transformmatrix
+import unittest
+
+class TestMatrixCache( unittest.TestCase ):
+    def setUp( self ):
+        self.cache = matrixcache.MatrixCache( maxsize=2 )
+    def test_hits( self ):
+        first = self.cache.rotation_matrix( (0,1,0,.5) )
+        second = self.cache.rotation_matrix( arrays.array( (0,1,0,.5) ) )
+        assert first is second
+        assert self.cache.stats()['hits'] == 1
+        assert self.cache.stats()['misses'] == 1
+        assert arrays.allclose( first[0], transformmatrix.rotation_matrix( (0,1,0,.5) )[0] )
+    def test_read_only( self ):
+        forward,inverse = self.cache.transform_matrices( translation=(1,2,3) )
+        self.assertRaises( ValueError, forward.__setitem__, 0, 5 )
+        self.assertRaises( ValueError, inverse.__setitem__, 0, 5 )
+    def test_null( self ):
+        assert self.cache.rotation_matrix( (0,1,0,0) ) == (None,None)
+        assert self.cache.transform_matrix() is None
+    def test_eviction( self ):
+        for i in range( 3 ):
+            self.cache.translate_matrix( (i,0,0) )
+        assert len(self.cache) == 2
+        self.cache.translate_matrix( (2,0,0) )
+        assert self.cache.hits == 1
+        self.cache.translate_matrix( (0,0,0) )
+        assert self.cache.misses == 4
+    def test_lru_order( self ):
+        self.cache.scale_matrix( (1,2,3) )
+        self.cache.scale_matrix( (2,2,3) )
+        self.cache.scale_matrix( (1,2,3) )
+        self.cache.scale_matrix( (3,2,3) )
+        self.cache.scale_matrix( (1,2,3) )
+        assert self.cache.hits == 2, self.cache.stats()
+    def test_parent( self ):
+        parent = transformmatrix.transform_matrix( rotation=(0,1,0,.3) )
+        produced = self.cache.transform_matrix( translation=(1,2,3), parentMatrix=parent )
+        expected = transformmatrix.transform_matrix( translation=(1,2,3), parentMatrix=parent )
+        assert arrays.allclose( produced, expected )
+    def test_projection( self ):
+        produced = self.cache.perspective_matrix( 1.0, 1.5, .1, 100 )
+        assert produced is self.cache.perspective_matrix( 1.0, 1.5, .1, 100 )
+        assert arrays.allclose( produced, transformmatrix.perspective_matrix( 1.0, 1.5, .1, 100 ) )
+        assert self.cache.perspective_matrix( 1.0, 1.5, .1, 100, inverse=True ) is not produced
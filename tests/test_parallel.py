@@ -0,0 +1,80 @@
+from vecutils import arrays, parallel, triangleutilities, utilities, vectorutilities
+import threading
+import unittest
+
+class TestParallel( unittest.TestCase ):
+    def setUp( self ):
+        self.settings = parallel.THRESHOLD, parallel.CHUNK_SIZE
+        parallel.THRESHOLD, parallel.CHUNK_SIZE = 100, 64
+        self.vectors = arrays.random.RandomState( 11 ).uniform( -1, 1, (3000,3) ).astype( 'f' )
+    def tearDown( self ):
+        parallel.THRESHOLD, parallel.CHUNK_SIZE = self.settings
+    def test_kernels( self ):
+        expected = vectorutilities.normalise( self.vectors, workers=1 )
+        produced = vectorutilities.normalise( self.vectors, workers=4 )
+        assert produced.dtype == arrays.float32
+        assert arrays.allclose( produced, expected )
+        assert arrays.allclose(
+            vectorutilities.magnitude( self.vectors, workers=3 ),
+            vectorutilities.magnitude( self.vectors ),
+        )
+        assert arrays.allclose(
+            vectorutilities.crossProduct( self.vectors, self.vectors[::-1], workers=3 ),
+            vectorutilities.crossProduct( self.vectors, self.vectors[::-1] ),
+        )
+        assert arrays.allclose(
+            vectorutilities.crossProduct( self.vectors, (0,0,1), workers=3 ),
+            vectorutilities.crossProduct( self.vectors, (0,0,1) ),
+        )
+        assert arrays.allclose(
+            triangleutilities.normalPerFace( self.vectors, workers=4 ),
+            triangleutilities.normalPerFace( self.vectors ),
+        )
+        planar = abs( self.vectors )
+        planar[:,2] = 0
+        planar[:2] = (0,0,0),(-1,0,0)
+        assert utilities.coplanar( planar, workers=4 )
+        assert not utilities.coplanar( self.vectors, workers=4 )
+    def test_global_setting( self ):
+        threads = set()
+        def record( start, stop ):
+            threads.add( threading.get_ident() )
+        with parallel.workers( 4 ):
+            assert parallel.get_workers() == 4
+            parallel.run_chunked( record, 1000 )
+        assert parallel.get_workers() == 1
+        assert threading.get_ident() not in threads
+        threads.clear()
+        parallel.run_chunked( record, 1000 )
+        assert threads == set([threading.get_ident()])
+    def test_threshold( self ):
+        calls = []
+        parallel.run_chunked( lambda start,stop: calls.append( (start,stop) ), 50, workers=4 )
+        assert calls == [(0,50)], calls
+        calls = []
+        parallel.run_chunked( lambda start,stop: calls.append( (start,stop) ), 200, workers=4 )
+        assert sorted( calls ) == [(0,64),(64,128),(128,192),(192,200)], calls
+    def test_out_and_scratch( self ):
+        scratch = {}
+        out = arrays.zeros( (1000,3), 'f' )
+        produced = triangleutilities.normalPerFace( self.vectors, out=out, scratch=scratch, workers=2 )
+        assert produced is out
+        assert arrays.allclose( out, triangleutilities.normalPerFace( self.vectors ) )
+        assert [key for key in scratch if key[0] == 'worker'], scratch
+    def test_scratch_bounded( self ):
+        scratch = {}
+        for workers in (2,4,3,4):
+            triangleutilities.normalPerFace( self.vectors, scratch=scratch, workers=workers )
+        slots = sorted( key[1] for key in scratch if key[0] == 'worker' )
+        assert slots == [0,1,2,3], slots
+    def test_pool_replaced( self ):
+        small = parallel.pool( 1 )
+        large = parallel.pool( 64 )
+        if large is not small:
+            assert small._shutdown
+        assert parallel.pool( 2 ) is large
+        parallel.run_chunked( lambda start,stop: None, 1000, workers=4 )
+    def test_errors( self ):
+        def fail( start, stop ):
+            raise ValueError( start )
+        self.assertRaises( ValueError, parallel.run_chunked, fail, 1000, 4 )
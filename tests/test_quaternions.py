@@ -56,3 +56,223 @@ class TestQuaternions( unittest.TestCase ):
         transformed = q*v
         ac(transformed, [0, 0, -1, 0])
     
+    def test_xyzr_arrays(self):
+        rotations = arrays.array([(0,1,0,arrays.pi/2),(1,0,0,0),(0,0,2,1.0)])
+        produced = quaternion.xyzrToQuaternions( rotations )
+        for source,q in zip( rotations, produced ):
+            ac( q, quaternion.fromXYZR( *source ).internal )
+        xyzr = quaternion.quaternionsToXYZR( produced )
+        ac( xyzr, [(0,1,0,arrays.pi/2),(0,1,0,0),(0,0,1,1.0)] )
+    def test_matrices_to_quaternions(self):
+        generator = arrays.random.RandomState( 1 )
+        for source in generator.uniform( -1, 1, (50,4) ) * (1,1,1,arrays.pi):
+            q = quaternion.fromXYZR( *source )
+            produced = quaternion.matricesToQuaternions( q.matrix('d')[None] )[0]
+            if q.internal[0] < 0:
+                ac( produced, -q.internal )
+            else:
+                ac( produced, q.internal )
+
+class TestInPlace( unittest.TestCase ):
+    def setUp( self ):
+        self.first = quaternion.fromXYZR( 0,1,0,.5 )
+        self.second = quaternion.fromXYZR( 1,1,0,1.2 )
+    def test_imul( self ):
+        expected = self.first * self.second
+        internal = self.first.internal
+        assert self.first.imul( self.second ) is self.first
+        assert self.first.internal is internal
+        ac( self.first.internal, expected.internal )
+    def test_islerp( self ):
+        for fraction in (0,.25,.5,1.0):
+            source = quaternion.Quaternion( self.first.internal.copy() )
+            for target in (self.second, quaternion.Quaternion( -self.second.internal ), self.first):
+                expected = source.slerp( target, fraction )
+                produced = quaternion.Quaternion( source.internal.copy() ).islerp( target, fraction )
+                ac( produced.internal, expected.internal )
+    def test_islerp_nearby( self ):
+        # the linear fallback for nearly-equal rotations stays unit length
+        source = quaternion.fromXYZR( 0,1,0,.5 )
+        target = quaternion.fromXYZR( 0,1,0,.5001 )
+        produced = quaternion.Quaternion.trusted( source.internal.copy() )
+        expected = source
+        for i in range( 10 ):
+            produced.islerp( target, .5 )
+            expected = expected.slerp( target, .5 )
+            assert abs( arrays.sqrt( (produced.internal**2).sum() ) - 1.0 ) < 1e-12
+        ac( produced.internal, expected.internal )
+    def test_no_aliasing( self ):
+        elements = arrays.array( [1.,0,0,0] )
+        q = quaternion.Quaternion( elements )
+        assert q.internal is not elements
+        q.imul( self.second ).conjugateInPlace()
+        ac( elements, [1,0,0,0] )
+    def test_inverse_normalises( self ):
+        q = quaternion.Quaternion()
+        q.internal[:] = [2,0,0,0]
+        ac( q.inverse().internal, [1,0,0,0] )
+    def test_conjugate( self ):
+        expected = self.second.inverse()
+        self.second.conjugateInPlace()
+        ac( self.second.internal, expected.internal )
+    def test_trusted( self ):
+        elements = arrays.array( (2,0,0,0), 'd' )
+        q = quaternion.Quaternion.trusted( elements )
+        assert q.internal is elements
+        q.normaliseInPlace()
+        ac( elements, (1,0,0,0) )
+    def test_renormalise( self ):
+        step = quaternion.Quaternion.trusted( self.second.internal * 1.001 )
+        current = quaternion.Quaternion()
+        for i in range( current.renormaliseInterval - 1 ):
+            current.imul( step )
+        assert abs( arrays.dot( current.internal, current.internal ) - 1.0 ) > 1e-3
+        current.imul( step )
+        assert current.steps == 0
+        assert abs( arrays.dot( current.internal, current.internal ) - 1.0 ) < 1e-12
+
+class TestQuaternionArray( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 3 )
+        self.rotations = generator.uniform( -1, 1, (20,4) ) * (1,1,1,arrays.pi)
+        self.other = generator.uniform( -1, 1, (20,4) ) * (1,1,1,arrays.pi)
+        self.quaternions = [quaternion.fromXYZR( *r ) for r in self.rotations]
+        self.array = quaternion.QuaternionArray.fromXYZR( self.rotations )
+    def test_items_are_copies( self ):
+        before = self.array.internal.copy()
+        self.array[0].imul( self.quaternions[1] )
+        for q in self.array:
+            q.conjugateInPlace()
+        ac( self.array.internal, before )
+    def test_construction( self ):
+        for q,produced in zip( self.quaternions, self.array ):
+            ac( produced.internal, q.internal )
+        assert len(self.array) == 20
+        normalised = quaternion.QuaternionArray( [(2,0,0,0),(0,0,3,0)] )
+        ac( normalised.internal, [(1,0,0,0),(0,0,1,0)] )
+    def test_multiply( self ):
+        other = quaternion.QuaternionArray.fromXYZR( self.other )
+        produced = self.array * other
+        for i,(a,b) in enumerate( zip( self.quaternions, other ) ):
+            ac( produced[i].internal, (a*b).internal )
+        single = self.quaternions[0] * other
+        assert isinstance( single, quaternion.QuaternionArray )
+        ac( single[3].internal, (self.quaternions[0]*other[3]).internal )
+        broadcast = other * self.quaternions[1]
+        ac( broadcast[2].internal, (other[2]*self.quaternions[1]).internal )
+    def test_inverse( self ):
+        produced = self.array * self.array.inverse()
+        ac( produced.internal, [(1,0,0,0)]*20 )
+    def test_matrix( self ):
+        matrices = self.array.matrix()
+        assert matrices.shape == (20,4,4)
+        for q,m in zip( self.quaternions, matrices ):
+            ac( m, q.matrix() )
+        ac( self.array.matrix( inverse=True )[4], self.quaternions[4].matrix( inverse=True ) )
+    def test_xyzr( self ):
+        for q,xyzr in zip( self.quaternions, self.array.XYZR() ):
+            ac( xyzr, q.XYZR() )
+    def test_indexing( self ):
+        subset = self.array[[1,3,5]]
+        assert isinstance( subset, quaternion.QuaternionArray )
+        ac( subset.internal, self.array.internal[[1,3,5]] )
+        masked = self.array[self.rotations[:,3] > 0]
+        assert len(masked) == (self.rotations[:,3] > 0).sum()
+        self.array[2] = quaternion.Quaternion()
+        ac( self.array[2].internal, (1,0,0,0) )
+        copy = quaternion.QuaternionArray.fromQuaternions( self.quaternions[:3] )
+        ac( copy.internal, [q.internal for q in self.quaternions[:3]] )
+    def test_rotate_vectors( self ):
+        vectors = arrays.random.RandomState( 4 ).uniform( -1, 1, (20,4) ).astype( 'f' )
+        produced = self.array * vectors
+        for q,v,p in zip( self.quaternions, vectors, produced ):
+            ac( p, q*v )
+        ac( (self.array * vectors[:,:3])[5], (self.quaternions[5]*vectors[5])[:3] )
+
+class TestRotateVectors( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 5 )
+        self.rotations = generator.uniform( -1, 1, (50,4) ) * (1,1,1,arrays.pi)
+        self.quaternions = quaternion.xyzrToQuaternions( self.rotations )
+        self.vectors = generator.uniform( -10, 10, (50,3) ).astype( 'f' )
+    def test_single( self ):
+        q = quaternion.Quaternion( self.quaternions[0] )
+        produced = quaternion.rotateVectors( q, self.vectors )
+        assert produced.dtype == arrays.float32, produced.dtype
+        expected = arrays.dot( self.vectors, q.matrix( dtype='d' )[:3,:3] )
+        assert arrays.allclose( produced, expected, atol=1e-4 ), produced
+        ac( q * self.vectors, produced )
+        ac( q * self.vectors[0], produced[0] )
+    def test_paired( self ):
+        produced = quaternion.rotateVectors( self.quaternions, self.vectors )
+        matrices = quaternion.quaternionsToMatrices( self.quaternions, dtype='d' )
+        for v,m,p in zip( self.vectors, matrices, produced ):
+            assert arrays.allclose( p, arrays.dot( v, m[:3,:3] ), atol=1e-4 ), p
+    def test_out( self ):
+        scratch = {}
+        out = arrays.zeros( (50,3), 'f' )
+        expected = quaternion.rotateVectors( self.quaternions, self.vectors )
+        result = quaternion.rotateVectors( self.quaternions, self.vectors, out=out, scratch=scratch )
+        assert result is out
+        ac( out, expected )
+        quaternion.rotateVectors( self.quaternions, self.vectors, out=self.vectors, scratch=scratch )
+        ac( self.vectors, expected )
+        single = quaternion.rotateVectors( self.quaternions[1], self.vectors[:10] )
+        quaternion.rotateVectors( self.quaternions[1], self.vectors, out=self.vectors )
+        ac( self.vectors[:10], single )
+
+class TestEuler( unittest.TestCase ):
+    def setUp( self ):
+        self.angles = arrays.random.RandomState( 6 ).uniform( -arrays.pi, arrays.pi, (200,3) )
+    def assert_same_rotation( self, first, second ):
+        difference = arrays.minimum(
+            abs( first - second ).max( 1 ), abs( first + second ).max( 1 ),
+        )
+        assert difference.max() < 1e-9, difference.max()
+    def test_from_euler( self ):
+        produced = quaternion.eulerToQuaternions( self.angles[:10] )
+        for angles,q in zip( self.angles, produced ):
+            ac( q, quaternion.fromEuler( *angles ).internal )
+    def test_orders( self ):
+        for order in quaternion.EULER_ORDERS:
+            q = quaternion.eulerToQuaternions( self.angles, order )
+            first,second,third = [
+                quaternion.fromXYZR( *(tuple( arrays.identity(3)['xyz'.index( axis )] ) + (angle,)) )
+                for axis,angle in zip( order, self.angles[3] )
+            ]
+            ac( q[3], (first*second*third).internal )
+            angles = quaternion.quaternionsToEuler( q, order )
+            self.assert_same_rotation( quaternion.eulerToQuaternions( angles, order ), q )
+            if order[0] == order[2]:
+                assert (angles[:,1] >= 0).all()
+            else:
+                assert (abs( angles[:,1] ) <= arrays.pi/2 + 1e-9).all()
+    def test_gimbal_lock( self ):
+        for order in quaternion.EULER_ORDERS:
+            proper = order[0] == order[2]
+            for middle in ((0,arrays.pi) if proper else (arrays.pi/2,-arrays.pi/2)):
+                angles = self.angles.copy()
+                angles[:,1] = middle
+                q = quaternion.eulerToQuaternions( angles, order )
+                produced = quaternion.quaternionsToEuler( q, order )
+                ac( produced[:,2], 0 )
+                self.assert_same_rotation( quaternion.eulerToQuaternions( produced, order ), q )
+    def test_matrices_and_xyzr( self ):
+        matrices = quaternion.eulerToMatrices( self.angles, 'zyx', dtype='d' )
+        assert matrices.shape == (200,4,4)
+        self.assert_same_rotation(
+            quaternion.eulerToQuaternions( quaternion.matricesToEuler( matrices, 'zyx' ), 'zyx' ),
+            quaternion.eulerToQuaternions( self.angles, 'zyx' ),
+        )
+        ac( quaternion.matricesToEuler( matrices[:,:3,:3], 'zyx' ), quaternion.matricesToEuler( matrices, 'zyx' ) )
+        rotations = quaternion.eulerToMatrices( self.angles, 'zyx', dtype='d', size=3 )
+        assert rotations.shape == (200,3,3) and rotations.flags.c_contiguous
+        ac( rotations, matrices[:,:3,:3] )
+        self.assertRaises( ValueError, quaternion.eulerToMatrices, self.angles, size=2 )
+        xyzr = quaternion.eulerToXYZR( self.angles, 'yzy' )
+        self.assert_same_rotation(
+            quaternion.xyzrToQuaternions( xyzr ),
+            quaternion.eulerToQuaternions( quaternion.xyzrToEuler( xyzr, 'yzy' ), 'yzy' ),
+        )
+    def test_invalid_order( self ):
+        self.assertRaises( ValueError, quaternion.eulerToQuaternions, self.angles, 'xxy' )
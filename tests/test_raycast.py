@@ -0,0 +1,70 @@
+from vecutils import arrays, bvh, raycast, triangleutilities
+import unittest
+
+class TestRaycast( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 5 )
+        centers = generator.uniform( -5, 5, (300,1,3) )
+        self.soup = (centers + generator.uniform( -1, 1, (300,3,3) )).reshape( (-1,3) )
+        self.origins = generator.uniform( -5, 5, (200,3) )
+        self.origins[:,2] = -10
+        self.directions = generator.uniform( -.2, .2, (200,3) )
+        self.directions[:,2] = 1
+    def test_single( self ):
+        triangle = [[0,0,0],[1,0,0],[0,1,0]]
+        t, triangles, barycentrics = raycast.raycast( [[.25,.5,-2]], [[0,0,1]], triangle )
+        assert arrays.allclose( t, [2] )
+        assert triangles.tolist() == [0]
+        assert arrays.allclose( barycentrics, [[.25,.25,.5]] )
+        t, triangles, barycentrics = raycast.raycast( [[.75,.75,-2]], [[0,0,1]], triangle )
+        assert t[0] == arrays.inf and triangles[0] == -1
+    def test_barycentrics( self ):
+        t, triangles, barycentrics = raycast.raycast( self.origins, self.directions, self.soup )
+        hit = arrays.flatnonzero( triangles >= 0 )
+        assert len(hit) > 50
+        corners = self.soup.reshape( (-1,3,3) )[triangles[hit]]
+        points = self.origins[hit] + t[hit,None] * self.directions[hit]
+        assert arrays.allclose( arrays.einsum( 'ni,nij->nj', barycentrics[hit], corners ), points )
+        assert (barycentrics[hit] >= -1e-12).all()
+    def test_chunked( self ):
+        expected = raycast.raycast( self.origins, self.directions, self.soup )
+        for chunkSize in (1, 97, 1000):
+            result = raycast.raycast( self.origins, self.directions, self.soup, chunkSize=chunkSize )
+            for a,b in zip( expected, result ):
+                assert arrays.allclose( a, b ), chunkSize
+    def test_cull( self ):
+        normals = triangleutilities.normalPerFace( self.soup )
+        t, triangles, _ = raycast.raycast( self.origins, self.directions, self.soup, cull=True )
+        hit = triangles[triangles >= 0]
+        assert len(hit)
+        facing = arrays.einsum( 'ij,ij->i', normals[hit], self.directions[triangles >= 0] )
+        assert (facing < 0).all()
+        t, triangles, _ = raycast.raycast( self.origins, self.directions, self.soup, cull=True, ccw=0 )
+        facing = arrays.einsum( 'ij,ij->i', normals[triangles[triangles >= 0]], self.directions[triangles >= 0] )
+        assert (facing > 0).all()
+    def test_tmax( self ):
+        t, triangles, _ = raycast.raycast( self.origins, self.directions, self.soup )
+        limit = t.copy()
+        limit[::2] *= .5
+        limited, limitedTriangles, _ = raycast.raycast( self.origins, self.directions, self.soup, tmax=limit )
+        assert (limitedTriangles[1::2] == triangles[1::2]).all()
+        hit = limitedTriangles >= 0
+        assert (limited[hit] <= limit[hit]).all()
+        assert (limited[~hit] == arrays.inf).all()
+    def test_indexed( self ):
+        vertices, indices = self.soup[::-1].copy(), arrays.arange( len(self.soup) )[::-1].reshape( (-1,3) )
+        expected = raycast.raycast( self.origins, self.directions, self.soup )
+        result = raycast.raycast( self.origins, self.directions, vertices, indices )
+        assert (expected[1] == result[1]).all()
+        assert arrays.allclose( expected[2], result[2] )
+    def test_bvh( self ):
+        tree = bvh.TriangleBVH( self.soup, leafSize=2 )
+        for cull in (False, True):
+            expected = raycast.raycast( self.origins, self.directions, self.soup, cull=cull )
+            result = raycast.raycast_bvh( tree, self.origins, self.directions, cull=cull, chunkSize=50 )
+            assert (expected[1] == result[1]).all()
+            assert arrays.allclose( expected[0], result[0] )
+            assert arrays.allclose( expected[2], result[2] )
+
+if __name__ == "__main__":
+    unittest.main()
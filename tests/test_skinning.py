@@ -0,0 +1,105 @@
+from vecutils import arrays, parallel, skinning, transformmatrix
+import unittest
+
+def ac(x, y, atol=1e-4):
+    assert arrays.allclose(x, y, atol=atol), (x, y)
+
+class TestSkinning( unittest.TestCase ):
+    def setUp( self ):
+        generator = arrays.random.RandomState( 7 )
+        self.count = 500
+        self.positions = generator.uniform( -1, 1, (self.count,3) ).astype( 'f' )
+        self.normals = generator.uniform( -1, 1, (self.count,3) ).astype( 'f' )
+        self.normals /= arrays.sqrt( (self.normals**2).sum( 1 ) )[:,arrays.newaxis]
+        self.indices = generator.randint( 0, 4, (self.count,2) )
+        weights = generator.uniform( 0, 1, (self.count,2) )
+        self.weights = weights / weights.sum( 1 )[:,arrays.newaxis]
+        self.matrices = transformmatrix.transform_matrix_stack(
+            generator.uniform( -2, 2, (4,3) ),
+            rotations = generator.uniform( -1, 1, (4,4) ) * (1,1,1,arrays.pi),
+            dtype = 'd',
+        )
+    def test_linear_blend( self ):
+        positions, normals = skinning.linear_blend_skinning(
+            self.matrices, self.indices, self.weights, self.positions, self.normals,
+        )
+        assert positions.dtype == arrays.float32
+        for i in range( 0, self.count, 37 ):
+            matrix = sum([
+                w * self.matrices[b] for b,w in zip( self.indices[i], self.weights[i] )
+            ])
+            ac( positions[i], arrays.dot( (tuple(self.positions[i])+(1,)), matrix )[:3] )
+            normal = arrays.dot( self.normals[i], matrix[:3,:3] )
+            ac( normals[i], normal / arrays.sqrt( (normal**2).sum() ) )
+    def test_dual_quaternion_rigid( self ):
+        """A single influence reproduces the rigid bone transform"""
+        dual = skinning.matrices_to_dual_quaternions( self.matrices )
+        weights = arrays.zeros( (self.count,2) )
+        weights[:,0] = 1
+        positions, normals = skinning.dual_quaternion_skinning(
+            dual, self.indices, weights, self.positions, self.normals,
+        )
+        expected, expectedNormals = skinning.linear_blend_skinning(
+            self.matrices, self.indices, weights, self.positions, self.normals,
+        )
+        ac( positions, expected )
+        ac( normals, expectedNormals )
+    def test_dual_quaternion_blend( self ):
+        """Blended results are rigid, preserving distance from a shared pivot"""
+        dual = skinning.matrices_to_dual_quaternions( self.matrices )
+        dual[1] *= -1 # antipodal representation of the same transform
+        positions, normals = skinning.dual_quaternion_skinning(
+            dual, self.indices, self.weights, self.positions, self.normals,
+        )
+        ac( (normals**2).sum( 1 ), 1.0 )
+        same = self.indices[:,0] == self.indices[:,1]
+        expected = skinning.linear_blend_skinning(
+            self.matrices, self.indices, self.weights, self.positions,
+        )[0]
+        ac( positions[same], expected[same] )
+    def test_skinner( self ):
+        expected = skinning.linear_blend_skinning(
+            self.matrices, self.indices, self.weights, self.positions, self.normals,
+        )
+        dual = skinning.matrices_to_dual_quaternions( self.matrices )
+        expectedDual = skinning.dual_quaternion_skinning(
+            dual, self.indices, self.weights, self.positions, self.normals,
+        )
+        previous = parallel.THRESHOLD
+        parallel.THRESHOLD = 1
+        try:
+            for workers in (1,3,None):
+                skinner = skinning.Skinner(
+                    self.indices, self.weights, self.positions, self.normals, workers=workers,
+                )
+                with parallel.workers( 2 ):
+                    positions, normals = skinner.skin_matrices( self.matrices )
+                if workers is None:
+                    # follows the global setting
+                    assert ('worker',1) in skinner.scratch, skinner.scratch
+                assert positions is skinner.positionsOut
+                ac( positions, expected[0] )
+                ac( normals, expected[1] )
+                positions, normals = skinner.skin_dual_quaternions( dual )
+                ac( positions, expectedDual[0] )
+                ac( normals, expectedDual[1] )
+        finally:
+            parallel.THRESHOLD = previous
+    def test_bad_indices( self ):
+        indices = self.indices.copy()
+        indices[3,1] = len(self.matrices)
+        self.assertRaises(
+            ValueError, skinning.linear_blend_skinning,
+            self.matrices, indices, self.weights, self.positions,
+        )
+        dual = skinning.matrices_to_dual_quaternions( self.matrices )
+        self.assertRaises(
+            ValueError, skinning.dual_quaternion_skinning,
+            dual, indices, self.weights, self.positions,
+        )
+        skinner = skinning.Skinner( indices, self.weights, self.positions )
+        self.assertRaises( ValueError, skinner.skin_matrices, self.matrices )
+        ac( skinner.skin_matrices( arrays.concatenate( (self.matrices,self.matrices[:1]) ) )[0][:3],
+            skinning.linear_blend_skinning( self.matrices, self.indices, self.weights, self.positions )[0][:3] )
+        indices[3,1] = -1
+        self.assertRaises( ValueError, skinning.Skinner, indices, self.weights, self.positions )
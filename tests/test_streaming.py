@@ -0,0 +1,38 @@
+from vecutils import arrays, streaming, triangleutilities
+import os, shutil, tempfile, tracemalloc
+import unittest
+
+class TestStreaming( unittest.TestCase ):
+    def setUp( self ):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join( self.directory, 'vertices.f32' )
+        self.vertices = arrays.random.RandomState( 10 ).uniform( -1, 1, (3000,3) ).astype( 'f' )
+        self.vertices.tofile( self.filename )
+    def tearDown( self ):
+        shutil.rmtree( self.directory )
+    def test_normals( self ):
+        vertices = arrays.memmap( self.filename, dtype='f', mode='r' )
+        out = streaming.create_output( os.path.join( self.directory, 'normals.f32' ), (1000,3) )
+        produced = streaming.normalPerFace( vertices, out, chunkSize=64 )
+        assert produced is out
+        expected = triangleutilities.normalPerFace( self.vertices )
+        assert arrays.allclose( produced, expected, atol=1e-6 )
+        written = arrays.fromfile( os.path.join( self.directory, 'normals.f32' ), 'f' )
+        assert arrays.allclose( written.reshape( (-1,3) ), expected, atol=1e-6 )
+    def test_centers( self ):
+        with open( self.filename, 'rb' ) as handle:
+            buffer = handle.read()
+        produced = streaming.centers( buffer, chunkSize=100 )
+        assert arrays.allclose( produced, triangleutilities.centers( self.vertices ) )
+        produced = streaming.centers( self.vertices, vertexCount=4, chunkSize=7 )
+        assert arrays.allclose( produced, triangleutilities.centers( self.vertices, vertexCount=4 ) )
+    def test_bounded_memory( self ):
+        vertices = arrays.memmap( self.filename, dtype='f', mode='r' )
+        out = arrays.empty( (1000,3), 'f' )
+        tracemalloc.start()
+        try:
+            streaming.normalPerFace( vertices, out, chunkSize=10 )
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert peak < 16*1024, peak
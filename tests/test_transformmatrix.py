@@ -1,6 +1,13 @@
 import unittest,sys
+from vecutils import arrays, vectorutilities, quaternion
 from vecutils.transformmatrix import translate_matrix, rotation_matrix, scale_matrix, perspective_matrix, DEGTORAD
-from vecutils.arrays import allclose,dot, pi, array
+from vecutils.arrays import allclose,dot, pi, array, identity, random
+from vecutils.transformmatrix import (
+    transform_matrix, itransform_matrix, transform_matrices,
+    transform_matrix_stack, itransform_matrix_stack, transform_matrices_stack,
+    rotation_matrix_stack, fused_transform_matrices, fused_transform_matrices_stack,
+    transform_points, transform_vectors, transform_normals, decompose_matrices,
+)
 
 class TestTransformMatrix( unittest.TestCase ):
     def test_calculations( self ):
@@ -53,3 +60,177 @@ class TestTransformMatrix( unittest.TestCase ):
         unprojected = dot( inverse, projected )
         assert allclose( unprojected, test ), (unprojected, test)
     
+
+class TestTransformMatrixStack( unittest.TestCase ):
+    """Batched matrix stacks should match the scalar reference functions"""
+    def setUp( self ):
+        generator = random.RandomState( 42 )
+        count = 20
+        self.translations = generator.uniform( -5, 5, (count,3) )
+        self.centers = generator.uniform( -2, 2, (count,3) )
+        self.rotations = generator.uniform( -1, 1, (count,4) )
+        self.scales = generator.uniform( .5, 2, (count,3) )
+        self.scaleOrientations = generator.uniform( -1, 1, (count,4) )
+        # exercise the identity-skipping masks
+        self.translations[::3] = 0
+        self.centers[1::2] = 0
+        self.rotations[::4,3] = 0
+        self.rotations[1::5,3] = 2*pi
+        self.scales[::2] = 1
+        self.scaleOrientations[::3,3] = 0
+    def _parameters( self, i ):
+        return dict(
+            translation = self.translations[i],
+            center = self.centers[i],
+            rotation = self.rotations[i],
+            scale = self.scales[i],
+            scaleOrientation = self.scaleOrientations[i],
+        )
+    def _check( self, produced, expected ):
+        if expected is None:
+            expected = identity(4)
+        assert allclose( produced, expected, rtol=1e-4, atol=1e-4 ), (produced, expected)
+    def test_transform_matrices_stack( self ):
+        forward,inverse = transform_matrices_stack(
+            self.translations, self.centers, self.rotations, self.scales, self.scaleOrientations,
+        )
+        assert forward.shape == (20,4,4), forward.shape
+        for i in range( len(forward) ):
+            f,b = transform_matrices( **self._parameters(i) )
+            self._check( forward[i], f )
+            self._check( inverse[i], b )
+            self._check( dot( forward[i], inverse[i] ), None )
+    def test_parent_matrices( self ):
+        parent = transform_matrix( translation=(1,2,3), rotation=(0,1,0,.5) )
+        forward = transform_matrix_stack(
+            self.translations, rotations=self.rotations, parentMatrices=parent,
+        )
+        for i in range( len(forward) ):
+            expected = transform_matrix(
+                translation=self.translations[i], rotation=self.rotations[i],
+                parentMatrix=parent,
+            )
+            self._check( forward[i], expected )
+    def test_broadcast_single( self ):
+        inverse = itransform_matrix_stack( self.translations, scales=(2,2,2) )
+        for i in range( len(inverse) ):
+            self._check( inverse[i], itransform_matrix( translation=self.translations[i], scale=(2,2,2) ))
+    def test_rotation_mask( self ):
+        R,R1,mask = rotation_matrix_stack( [(0,1,0,0),(0,1,0,2*pi),(0,0,2,pi/2)] )
+        assert mask.tolist() == [False,False,True], mask
+        self._check( R[1], None )
+        self._check( dot( (1,0,0,1), R[2] ), (0,1,0,1) )
+    def test_fused_stack( self ):
+        parent = transform_matrix( translation=(1,2,3), rotation=(0,1,0,.5) )
+        out = identity(4)[None].repeat( 20, 0 ).astype('f')
+        forward,inverse = fused_transform_matrices_stack(
+            self.translations, self.centers, self.rotations, self.scales, self.scaleOrientations,
+            parentMatrices = parent, out = out,
+        )
+        assert forward is out
+        for i in range( len(forward) ):
+            f,b = transform_matrices( parentMatrix=parent, **self._parameters(i) )
+            self._check( forward[i], f )
+            self._check( inverse[i], b )
+    def test_fused( self ):
+        for i in range( len(self.translations) ):
+            f,b = transform_matrices( **self._parameters(i) )
+            forward,inverse = fused_transform_matrices( **self._parameters(i) )
+            self._check( forward, f )
+            self._check( inverse, b )
+    def test_fused_out( self ):
+        out,inverseOut = identity(4), identity(4)
+        forward,inverse = fused_transform_matrices(
+            translation=(1,2,3), scale=(2,2,2), out=out, inverseOut=inverseOut,
+        )
+        assert forward is out and inverse is inverseOut
+        self._check( forward, transform_matrix( translation=(1,2,3), scale=(2,2,2) ))
+        self._check( fused_transform_matrices()[0], None )
+
+class TestBulkTransforms( unittest.TestCase ):
+    def setUp( self ):
+        self.matrix = transform_matrix(
+            translation=(1,2,3), rotation=(0,1,0,.5), scale=(1,2,3),
+        ).astype('f')
+        self.points = random.RandomState( 3 ).uniform( -5, 5, (50,3) ).astype('f')
+    def _homogenous( self, points, w=1.0 ):
+        result = arrays.ones( (len(points),4), 'f' )
+        result[:,:3] = points
+        result[:,3] = w
+        return result
+    def test_points( self ):
+        expected = dot( self._homogenous( self.points ), self.matrix )[:,:3]
+        produced = transform_points( self.points, self.matrix, chunkSize=7 )
+        assert produced.dtype == arrays.float32, produced.dtype
+        assert allclose( produced, expected, atol=1e-4 )
+    def test_points_inplace( self ):
+        expected = dot( self._homogenous( self.points ), self.matrix )[:,:3]
+        produced = transform_points( self.points, self.matrix, out=self.points, chunkSize=7 )
+        assert produced is self.points
+        assert allclose( produced, expected, atol=1e-4 )
+    def test_points_homogenous( self ):
+        points = self._homogenous( self.points )
+        produced = transform_points( points, self.matrix )
+        assert allclose( produced, dot( points, self.matrix ), atol=1e-4 )
+    def test_points_projective( self ):
+        projection = perspective_matrix( 1.0, 1.0, .1, 100 )
+        points = self.points - (0,0,10)
+        clip = dot( self._homogenous( points ), projection )
+        produced = transform_points( points, projection )
+        assert allclose( produced, clip[:,:3]/clip[:,3:], atol=1e-4 )
+    def test_vectors( self ):
+        expected = dot( self._homogenous( self.points, 0.0 ), self.matrix )
+        produced = transform_vectors( self._homogenous( self.points, 0.0 ), self.matrix, chunkSize=9 )
+        assert allclose( produced, expected, atol=1e-4 )
+        produced = transform_vectors( self.points, self.matrix )
+        assert allclose( produced, expected[:,:3], atol=1e-4 )
+    def test_normals( self ):
+        """Transformed normals stay perpendicular to transformed tangents"""
+        tangents = arrays.cross( self.points, (0,0,1) )
+        normals = self.points
+        forward,inverse = transform_matrices( scale=(1,5,.2), rotation=(1,1,0,1) )
+        for produced in (
+            transform_normals( normals, forward ),
+            transform_normals( normals, forward, inverse=inverse, chunkSize=5 ),
+        ):
+            moved = transform_vectors( tangents, forward )
+            assert allclose( (produced*moved).sum(1), 0, atol=1e-3 )
+            assert allclose( vectorutilities.magnitude( produced ), 1 )
+
+class TestDecompose( unittest.TestCase ):
+    def _round_trip( self, translations, rotations, scales ):
+        matrices = transform_matrix_stack( translations, rotations=rotations, scales=scales, dtype='d' )
+        t,r,s = decompose_matrices( matrices )
+        rebuilt = transform_matrix_stack( t, rotations=r, scales=s, dtype='d' )
+        assert allclose( rebuilt, matrices, atol=1e-6 ), (rebuilt, matrices)
+        return t,r,s
+    def test_round_trip( self ):
+        generator = random.RandomState( 5 )
+        translations = generator.uniform( -5, 5, (100,3) )
+        rotations = generator.uniform( -1, 1, (100,4) )
+        rotations[:,3] *= pi
+        scales = generator.uniform( .1, 3, (100,3) )
+        scales[::3] *= -1
+        scales[1::4,1] *= -1
+        t,r,s = self._round_trip( translations, rotations, scales )
+        assert allclose( t, translations )
+        assert allclose( arrays.absolute( s ), arrays.absolute( scales ) )
+    def test_exact_values( self ):
+        t,r,s = decompose_matrices( transform_matrix(
+            translation=(1,2,3), rotation=(0,0,1,pi/2), scale=(2,3,4),
+        ))
+        assert allclose( t, [(1,2,3)] )
+        assert allclose( r, [(0,0,1,pi/2)] ), r
+        assert allclose( s, [(2,3,4)] ), s
+    def test_quaternions( self ):
+        t,q,s = decompose_matrices( transform_matrix( rotation=(0,1,0,pi/2) ), quaternions=True )
+        expected = quaternion.fromXYZR( 0,1,0,pi/2 ).internal
+        assert allclose( q[0], expected ), q
+    def test_degenerate( self ):
+        self._round_trip(
+            [(0,0,0)]*4,
+            [(0,1,0,.5),(1,0,0,1),(1,1,1,2),(0,1,0,0)],
+            [(0,2,3),(0,0,3),(0,0,0),(-1,1,1)],
+        )
+        t,r,s = decompose_matrices( arrays.zeros( (1,4,4) ) )
+        assert allclose( r, [(0,1,0,0)] ), r
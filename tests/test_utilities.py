@@ -100,3 +100,34 @@ class TestUtilities( unittest.TestCase ):
         )
         assert arrays.allclose(produced, utilities.normalise((0, 1, 1))), produced
         
+    def test_float32_preserved(self):
+        data = arrays.ones( (5,3), 'f' )
+        assert vectorutilities.crossProduct( data, data ).dtype == arrays.float32
+        assert vectorutilities.crossProduct4( arrays.ones( (5,4), 'f' ), [1,0,0,1] ).dtype == arrays.float32
+        assert vectorutilities.magnitude( data ).dtype == arrays.float32
+        assert vectorutilities.normalise( data ).dtype == arrays.float32
+        assert vectorutilities.normalise( data.astype('d') ).dtype == arrays.float64
+    def test_out(self):
+        data = arrays.array( [[0,1,0],[1,0,0],[3,4,0]], 'f' )
+        out = arrays.zeros( (3,3), 'f' )
+        scratch = {}
+        produced = vectorutilities.crossProduct( data, [-1,0,0], out=out, scratch=scratch )
+        assert produced is out
+        self._allclose( out, [[0,0,1],[0,0,0],[0,0,4]] )
+        mags = arrays.zeros( (3,), 'f' )
+        assert vectorutilities.magnitude( data, out=mags ) is mags
+        assert arrays.allclose( mags, [1,1,5] )
+        assert vectorutilities.normalise( data, out=data, scratch=scratch ) is data
+        self._allclose( data, [[0,1,0],[1,0,0],[.6,.8,0]] )
+        plane = arrays.zeros( (4,), 'f' )
+        assert utilities.pointNormal2Plane( (0,1,0), (0,2,0), out=plane ) is plane
+        assert arrays.allclose( plane, (0,1,0,-1) )
+    def test_crossProduct_aliased(self):
+        data = arrays.array( [[0,1,0],[1,0,0]], 'f' )
+        vectorutilities.crossProduct( data, [-1,0,0], out=data )
+        self._allclose( data, [[0,0,1],[0,0,0]] )
+    def test_coplanar_scratch(self):
+        scratch = {}
+        for i in range(2):
+            assert utilities.coplanar( [[0,0,1],[0,1,1],[0,1,2],[0,1,3],[0,0,1],[0,1,1]], scratch=scratch )
+            assert not utilities.coplanar( [[0,0,1],[0,1,1],[0,1,2],[0,1,3],[0,0,1],[1,1,1]], scratch=scratch )
@@ -1,5 +1,5 @@
 from unittest import TestCase
-from vecutils import arrays, triangleutilities, vectorutilities
+from vecutils import arrays, triangleutilities, vectorutilities, utilities
 
 class TriangleUtilityTests(TestCase):
     def setUp(self):
@@ -24,6 +24,210 @@ class TriangleUtilityTests(TestCase):
             [1/3., 1/3., 0], 
         ]), centers
         
+    def test_out(self):
+        normals = arrays.zeros( (2,3), 'f' )
+        scratch = {}
+        produced = triangleutilities.normalPerFace( self.triangles, out=normals, scratch=scratch )
+        assert produced is normals
+        assert arrays.allclose(normals, [[0, 0, 1], [0, 0, -1]]), normals
+        centers = arrays.zeros( (2,3), 'f' )
+        assert triangleutilities.centers( self.triangles, out=centers ) is centers
+        a,b = arrays.zeros( (2,3), 'f' ), arrays.zeros( (2,3), 'f' )
+        assert triangleutilities.basisVectors( self.triangles, out=(a,b) )[0] is a
+    def test_dtype_preserved(self):
+        triangles = self.triangles.astype( 'd' )
+        assert triangleutilities.normalPerFace( triangles ).dtype == arrays.float64
+        assert triangleutilities.normalPerFace( self.triangles ).dtype == arrays.float32
+    def test_dtype_promotion(self):
+        integers = arrays.array( [[0,0,0],[1,0,0],[0,1,0]], 'i' )
+        assert triangleutilities.normalPerFace( integers ).dtype == arrays.float64
+        assert vectorutilities.normalise( integers ).dtype == arrays.float64
+        assert vectorutilities.magnitude( integers.astype( bool ) ).dtype == arrays.float64
+        assert vectorutilities.magnitude( integers.tolist() ).dtype == arrays.float32
+        assert vectorutilities.magnitude( integers.astype( 'f' ) ).dtype == arrays.float32
+    def test_indexed(self):
+        generator = arrays.random.RandomState( 8 )
+        vertices = generator.uniform( -1, 1, (30,3) ).astype( 'f' )
+        indices = generator.randint( 0, 30, (50,3) )
+        soup = vertices[indices.ravel()]
+        for ccw in (1,0):
+            expected = triangleutilities.basisVectors( soup, ccw=ccw )
+            produced = triangleutilities.basisVectorsIndexed( vertices, indices, ccw=ccw )
+            assert arrays.allclose( produced[0], expected[0] ), produced[0]
+            assert arrays.allclose( produced[1], expected[1] ), produced[1]
+            normals = triangleutilities.normalPerFaceIndexed( vertices, indices, ccw=ccw )
+            assert normals.dtype == arrays.float32
+            assert arrays.allclose( normals, triangleutilities.normalPerFace( soup, ccw=ccw ), atol=1e-5 )
+        centers = triangleutilities.centersIndexed( vertices, indices )
+        assert arrays.allclose( centers, triangleutilities.centers( soup ) ), centers
+        quads = generator.randint( 0, 30, (10,4) )
+        centers = triangleutilities.centersIndexed( vertices, quads )
+        assert arrays.allclose( centers, vertices[quads].mean( 1 ) ), centers
+    def test_indexed_out(self):
+        indices = [(0,1,2),(3,4,5)]
+        normals = arrays.zeros( (2,3), 'f' )
+        produced = triangleutilities.normalPerFaceIndexed( self.triangles, indices, out=normals, scratch={} )
+        assert produced is normals
+        assert arrays.allclose(normals, [[0, 0, 1], [0, 0, -1]]), normals
+        self.assertRaises( ValueError, triangleutilities.normalPerFaceIndexed, self.triangles, [(0,1,6)] )
+        self.assertRaises( ValueError, triangleutilities.centersIndexed, self.triangles, [(0,-1,2)] )
+
+class VertexNormalTests(TestCase):
+    def setUp(self):
+        # two faces meeting at a right angle along the 0-1 edge
+        self.vertices = arrays.array( [(0,0,0),(1,0,0),(0,1,0),(0,0,1)], 'f' )
+        self.indices = arrays.array( [(0,1,2),(0,3,1)] )
+    def test_vertex_normals(self):
+        normals = triangleutilities.vertexNormals( self.vertices, self.indices )
+        assert normals.dtype == arrays.float32
+        assert arrays.allclose( normals[0], utilities.combineNormals( [(0,0,1),(0,1,0)] ) ), normals
+        assert arrays.allclose( normals[2:], [(0,0,1),(0,1,0)] ), normals
+    def test_weighting(self):
+        generator = arrays.random.RandomState( 9 )
+        vertices = generator.uniform( -1, 1, (20,3) )
+        indices = generator.randint( 0, 20, (60,3) )
+        faceNormals = triangleutilities.normalPerFaceIndexed( vertices, indices )
+        a,b = triangleutilities.basisVectorsIndexed( vertices, indices )
+        areas = vectorutilities.magnitude( vectorutilities.crossProduct( a, b ) )
+        for weighting in (triangleutilities.UNIFORM,triangleutilities.AREA,triangleutilities.ANGLE):
+            normals = triangleutilities.vertexNormals( vertices, indices, weighting=weighting )
+            for vertex in (0,7):
+                weights = []
+                for face,corners in enumerate( indices ):
+                    for corner,index in enumerate( corners ):
+                        if index != vertex:
+                            continue
+                        if weighting == triangleutilities.AREA:
+                            weights.append( (face,areas[face]) )
+                        elif weighting == triangleutilities.ANGLE:
+                            first = vertices[corners[(corner+1)%3]] - vertices[index]
+                            second = vertices[corners[(corner+2)%3]] - vertices[index]
+                            cosine = arrays.dot( first, second ) / arrays.sqrt( arrays.dot( first, first ) * arrays.dot( second, second ) )
+                            weights.append( (face,arrays.arccos( cosine )) )
+                        else:
+                            weights.append( (face,1.0) )
+                expected = utilities.combineNormals(
+                    [faceNormals[f] for f,w in weights], [w for f,w in weights],
+                )
+                assert arrays.allclose( normals[vertex], expected, atol=1e-5 ), (weighting, normals[vertex], expected)
+    def test_degenerate(self):
+        indices = [(0,1,2),(0,2,1)]
+        normals = triangleutilities.vertexNormals( self.vertices, indices )
+        assert arrays.allclose( normals[0], utilities.combineNormals( [(0,0,1),(0,0,-1)] ) ), normals
+        assert arrays.allclose( normals[3], 0 ), normals
+    def test_crease(self):
+        normals,sources,indices = triangleutilities.creaseNormals(
+            self.vertices, self.indices, arrays.radians( 60 ),
+        )
+        assert len(normals) == 6, normals
+        assert arrays.allclose( sources, [0,0,1,1,2,3] ), sources
+        assert arrays.allclose( normals[indices[0]], [(0,0,1)]*3 ), normals
+        assert arrays.allclose( normals[indices[1]], [(0,1,0)]*3 ), normals
+        normals,sources,indices = triangleutilities.creaseNormals(
+            self.vertices, self.indices, arrays.radians( 120 ),
+        )
+        assert arrays.allclose( sources, [0,1,2,3] ), sources
+        assert arrays.allclose( indices, self.indices ), indices
+        assert arrays.allclose(
+            normals, triangleutilities.vertexNormals( self.vertices, self.indices ),
+        ), normals
+    def test_crease_chunked(self):
+        # a fan around vertex 0 compares count*count corner pairs there
+        count = 200
+        angles = arrays.arange( count ) * (2*arrays.pi/count)
+        vertices = arrays.zeros( (count+1,3) )
+        vertices[1:,0], vertices[1:,1] = arrays.cos( angles ), arrays.sin( angles )
+        vertices[1::2,2] = .2
+        indices = arrays.zeros( (count,3), 'i' )
+        indices[:,1] = arrays.arange( count ) + 1
+        indices[:,2] = (arrays.arange( count ) + 1) % count + 1
+        expected = triangleutilities.creaseNormals( vertices, indices, arrays.radians( 30 ) )
+        for chunkSize in (1, 150, 1000):
+            produced = triangleutilities.creaseNormals(
+                vertices, indices, arrays.radians( 30 ), chunkSize=chunkSize,
+            )
+            for a,b in zip( expected, produced ):
+                assert arrays.array_equal( a, b ), chunkSize
+
+class TangentTests(TestCase):
+    def setUp(self):
+        self.vertices = arrays.array( [(0,0,0),(1,0,0),(1,1,0),(0,1,0)], 'f' )
+        self.normals = arrays.array( [(0,0,1)]*4, 'f' )
+        self.indices = [(0,1,2),(0,2,3)]
+    def test_tangents(self):
+        produced = triangleutilities.tangents(
+            self.vertices, self.normals, self.vertices[:,:2], self.indices,
+        )
+        assert produced.dtype == arrays.float32
+        assert arrays.allclose( produced, [(1,0,0,1)]*4 ), produced
+        # rotated texture coordinates rotate the tangent
+        produced = triangleutilities.tangents(
+            self.vertices, self.normals, self.vertices[:,1::-1], self.indices,
+        )
+        assert arrays.allclose( produced, [(0,1,0,-1)]*4 ), produced
+    def test_mirrored(self):
+        produced = triangleutilities.tangents(
+            self.vertices, self.normals, self.vertices[:,:2] * (-1,1), self.indices,
+        )
+        assert arrays.allclose( produced, [(-1,0,0,-1)]*4 ), produced
+    def test_soup(self):
+        soup = self.vertices[[0,1,2,0,2,3]]
+        produced = triangleutilities.tangents( soup, self.normals[[0,1,2,0,2,3]], soup[:,:2] )
+        assert arrays.allclose( produced, [(1,0,0,1)]*6 ), produced
+    def test_degenerate(self):
+        for texCoords in (arrays.zeros( (4,2) ), [(0,0),(1,1),(2,2),(3,3)]):
+            produced = triangleutilities.tangents(
+                self.vertices, self.normals, texCoords, self.indices,
+            )
+            assert arrays.isfinite( produced ).all(), produced
+            assert arrays.allclose( arrays.dot( produced[:,:3], (0,0,1) ), 0 ), produced
+            assert arrays.allclose( vectorutilities.magnitude( produced[:,:3] ), 1 ), produced
+
+class WeldTests(TestCase):
+    def setUp(self):
+        self.vertices = arrays.array( [(0,0,0),(1,0,0),(1,1,0),(0,1,0)], 'f' )
+        self.soup = self.vertices[[0,1,2,0,2,3]]
+    def test_weld(self):
+        welded, indices, sources = triangleutilities.weldVertices( self.soup + 1e-8 )
+        assert welded.dtype == arrays.float32
+        assert arrays.allclose( welded, self.vertices ), welded
+        assert indices.tolist() == [[0,1,2],[0,2,3]], indices
+        assert sources.tolist() == [0,1,2,5], sources
+    def test_attributes(self):
+        normals = arrays.array( [(0,0,1)]*3 + [(0,0,-1)]*3, 'f' )
+        welded, indices, sources = triangleutilities.weldVertices( self.soup, normals )
+        assert len(welded) == 6
+        texCoords = self.soup[:,:2].copy()
+        texCoords[3:] += 1e-8
+        welded, indices, sources = triangleutilities.weldVertices( self.soup, texCoords=texCoords )
+        assert len(welded) == 4
+        welded, indices, sources = triangleutilities.weldVertices( self.soup, texCoords=texCoords, texCoordTolerance=1e-9 )
+        # (1,1) + 1e-8 is (1,1) in float32, so only that vertex still merges
+        assert len(welded) == 5
+        self.assertRaises( ValueError, triangleutilities.weldVertices, self.soup, normals[:3] )
+        self.assertRaises( ValueError, triangleutilities.weldVertices, self.soup, tolerance=0 )
+        self.assertRaises( ValueError, triangleutilities.weldVertices, self.soup[:5] )
+    def test_random(self):
+        generator = arrays.random.RandomState( 4 )
+        base = generator.uniform( -100, 100, (500,3) )
+        normals = vectorutilities.normalise( generator.normal( size=(500,3) ) )
+        selected = generator.randint( 0, 500, 3000 )
+        for extra in ((), (normals[selected],)):
+            welded, indices, sources = triangleutilities.weldVertices( base[selected], *extra )
+            assert len(welded) == len(set( selected.tolist() ))
+            assert arrays.allclose( welded[indices.ravel()], base[selected] )
+            # first occurrences, in order
+            assert (sources == arrays.sort( arrays.unique( selected, return_index=True )[1] )).all()
+        # tolerances too fine to pack the keys use hashing
+        welded, indices, sources = triangleutilities.weldVertices(
+            base[selected], normals[selected], tolerance=1e-9, normalTolerance=1e-9,
+        )
+        assert len(welded) == len(set( selected.tolist() ))
+        assert arrays.allclose( welded[indices.ravel()], base[selected] )
+    def test_empty(self):
+        welded, indices, sources = triangleutilities.weldVertices( arrays.zeros( (0,3), 'f' ) )
+        assert welded.shape == (0,3) and indices.shape == (0,3) and sources.shape == (0,)
+
 class VectorUtilityTests(TestCase):
     def test_colinear(self):
         for points in [
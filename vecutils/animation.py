@@ -0,0 +1,142 @@
+"""Keyframe animation sampling over many tracks at once
+
+Tracks of keyframes (times plus values) are packed into flat
+arrays with per-track offsets, so that sampling every track
+at a given time (or at a batch of times) is a vectorized key
+search followed by a single batched lerp or slerp, rather
+than a Python loop over tracks.
+
+Rotation tracks hold (w,x,y,z) quaternions (see
+quaternion.xyzrToQuaternions to convert from VRML-style
+rotations) and are interpolated with quaternion.slerpQuaternions,
+translation and scale tracks are interpolated linearly.
+Times before the first (after the last) key of a track
+sample the first (last) key.
+"""
+from .arrays import (
+    asarray, concatenate, cumsum, zeros, where, clip, newaxis, intp,
+    broadcast_to,
+)
+from . import quaternion
+
+LINEAR = 'linear'
+SLERP = 'slerp'
+
+class KeyframeTracks(object):
+    """Set of keyframe tracks packed into flat arrays
+
+    times -- (K,) double array of key times, sorted within each track
+    values -- (K,width) double array of key values
+    offsets -- (T+1,) index of the first key of each track (and the end)
+    interpolation -- LINEAR or SLERP
+    minimalStep -- slerp threshold for linear fallback (see Quaternion.slerp)
+    """
+    def __init__( self, tracks, interpolation=LINEAR, minimalStep=0.0001 ):
+        """Pack tracks into flat arrays
+
+        tracks -- sequence of (times, values) pairs, where times is
+            an (k,) sequence of ascending key times and values is a
+            (k,width) sequence of key values, each track must have
+            at least one key and all tracks must share width
+        """
+        if interpolation not in (LINEAR,SLERP):
+            raise ValueError( "Unknown interpolation: %r"%( interpolation, ))
+        times = [asarray( t, 'd' ).reshape( (-1,) ) for t,v in tracks]
+        values = [asarray( v, 'd' ) for t,v in tracks]
+        values = [v.reshape( (len(t),-1) ) for t,v in zip( times, values )]
+        lengths = asarray( [len(t) for t in times], intp )
+        if not len(lengths) or (lengths < 1).any():
+            raise ValueError( "Each track requires at least one key" )
+        for t in times:
+            if (t[1:] < t[:-1]).any():
+                raise ValueError( "Key times must be ascending within each track" )
+        self.times = concatenate( times )
+        self.values = concatenate( values )
+        self.offsets = zeros( (len(lengths)+1,), intp )
+        cumsum( lengths, out=self.offsets[1:] )
+        self.interpolation = interpolation
+        self.minimalStep = minimalStep
+        self.depth = int( lengths.max() ).bit_length()
+    def __len__( self ):
+        return len(self.offsets) - 1
+    def locate( self, times ):
+        """Find the bracketing keys for each track at each time
+
+        times -- scalar or (M,) array of sample times
+
+        returns (lower, upper, fraction) arrays of shape (T,) (or
+        (M,T)) giving the key indices on either side of each sample
+        and the fraction of the way from lower to upper
+        """
+        times = asarray( times, 'd' )
+        shape = times.shape + (len(self),)
+        starts = broadcast_to( self.offsets[:-1], shape )
+        ends = broadcast_to( self.offsets[1:], shape )
+        sample = times[...,newaxis]
+        # vectorized binary search for first key with time > sample
+        low = starts.copy()
+        high = ends.copy()
+        last = len(self.times) - 1
+        for i in range( self.depth ):
+            active = low < high
+            middle = (low + high) // 2
+            after = self.times[clip( middle, 0, last )] > sample
+            high = where( active & after, middle, high )
+            low = where( active & ~after, middle + 1, low )
+        upper = clip( low, starts, ends - 1 )
+        lower = clip( low - 1, starts, ends - 1 )
+        span = self.times[upper] - self.times[lower]
+        fraction = where(
+            span > 0,
+            (sample - self.times[lower]) / where( span > 0, span, 1.0 ),
+            0.0,
+        )
+        return lower, upper, fraction
+    def sample( self, times ):
+        """Sample all tracks at the given time(s)
+
+        times -- scalar or (M,) array of sample times
+
+        returns (T,width) (or (M,T,width)) array of interpolated values
+        """
+        lower, upper, fraction = self.locate( times )
+        first = self.values[lower]
+        second = self.values[upper]
+        if self.interpolation == SLERP:
+            return quaternion.slerpQuaternions(
+                first, second, fraction, minimalStep=self.minimalStep,
+            )
+        result = second - first
+        result *= fraction[...,newaxis]
+        result += first
+        return result
+
+class AnimationSampler(object):
+    """Samples translation, rotation and scale keyframe tracks together
+
+    translations -- KeyframeTracks of (x,y,z) values (or None)
+    rotations -- KeyframeTracks of (w,x,y,z) quaternions (or None)
+    scales -- KeyframeTracks of (x,y,z) values (or None)
+    """
+    def __init__( self, translations=None, rotations=None, scales=None ):
+        """Initialise from sequences of (times, values) tracks for each channel"""
+        self.translations = self.rotations = self.scales = None
+        if translations is not None:
+            self.translations = KeyframeTracks( translations, LINEAR )
+        if rotations is not None:
+            self.rotations = KeyframeTracks( rotations, SLERP )
+        if scales is not None:
+            self.scales = KeyframeTracks( scales, LINEAR )
+    def sample( self, times ):
+        """Sample all channels at the given time(s)
+
+        times -- scalar or (M,) array of sample times
+
+        returns (translations, rotations, scales), each an array
+        as returned by KeyframeTracks.sample, or None for channels
+        without tracks
+        """
+        return tuple([
+            (tracks.sample( times ) if tracks is not None else None)
+            for tracks in (self.translations,self.rotations,self.scales)
+        ])
@@ -23,3 +23,38 @@ except Exception as err:
 def contiguous( a ):
     """Force to a contiguous array"""
     return array( a, a.dtype )
+
+def scratch_array( scratch, key, shape, dtype ):
+    """Get a reusable temporary array from a caller-owned scratch dictionary
+
+    scratch -- dictionary in which buffers are cached between
+        calls, or None to simply allocate a new array
+    key -- name of the buffer within scratch
+    shape -- required shape, buffers with a longer first
+        dimension are re-used (a leading slice is returned)
+    dtype -- required data-type
+
+    Passing the same scratch dictionary to repeated calls with
+    the same (or smaller) sizes allocates no new arrays after
+    the first call.
+    """
+    if scratch is None:
+        return empty( shape, dtype )
+    buffer = scratch.get( key )
+    if (
+        buffer is None or
+        buffer.dtype != dtype or
+        buffer.shape[1:] != tuple(shape[1:]) or
+        len(buffer) < shape[0]
+    ):
+        buffer = scratch[key] = empty( shape, dtype )
+    return buffer[:shape[0]]
+
+def segment_ranges( starts, stops ):
+    """Concatenate arange(start,stop) for each start,stop pair (vectorized)"""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if not total:
+        return zeros( (0,), intp )
+    offsets = cumsum( lengths ) - lengths
+    return repeat( starts - offsets, lengths ) + arange( total )
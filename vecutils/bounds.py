@@ -0,0 +1,269 @@
+"""Axis-aligned bounding boxes and bounding spheres of meshes and triangles
+
+Boxes use the (N,2,3) (minimum, maximum) layout of culling.cull_boxes
+and spheres are (N,3) centers with (N,) radii as for
+culling.cull_spheres.  Triangles are given either in the
+triangleutilities (triangle soup) layout or as (V,3) vertices
+plus (F,3) indices.
+
+Mesh boxes are reduced from per-block boxes, each block of
+vertices being small enough that its minimum and maximum are
+both taken while it is in cache (so the vertices are read once).
+MeshBounds keeps those block boxes, along with per-triangle
+bounds, so that update() after editing a range of vertices only
+recomputes the blocks and triangles touching that range.
+
+transform_aabbs transforms boxes by transformmatrix (row-vector)
+matrices from their centers and half-extents, without needing
+the vertices.
+"""
+from .arrays import (
+    asarray, empty, zeros, arange, sqrt, einsum, absolute, maximum,
+    where, cross, take, newaxis, flatnonzero, intp, concatenate,
+)
+from . import triangleutilities
+from .vectorutilities import _fformat
+
+BLOCK_SIZE = 8192
+LANES = 128
+
+def _vertices( vertices ):
+    return asarray( vertices, _fformat(vertices) ).reshape( (-1,3) )
+
+def _corners( vertices, indices=None ):
+    """Get (F,3,3) triangle corners from a soup or indexed mesh"""
+    if indices is None:
+        vertices = _vertices( vertices )
+        return vertices[:len(vertices)-len(vertices)%3].reshape( (-1,3,3) )
+    vertices, indices = triangleutilities._indexed( vertices, indices )
+    return take( vertices[:,:3], indices, axis=0 )
+
+def block_bounds( vertices, blockSize=BLOCK_SIZE, out=None ):
+    """Calculate the boxes of each blockSize block of (V,3) vertices
+
+    returns (ceil(V/blockSize),2,3) boxes
+    """
+    vertices = _vertices( vertices )
+    count = -(-len(vertices) // blockSize)
+    if out is None:
+        out = empty( (count,2,3), vertices.dtype )
+    for block in range( count ):
+        _block_box( vertices[block*blockSize:(block+1)*blockSize], out[block] )
+    return out
+
+def _block_box( vertices, out ):
+    """Write the (2,3) box of a block of vertices into out"""
+    rows = len(vertices) // LANES
+    if rows and vertices.flags.c_contiguous:
+        # reducing LANES vertices per row is contiguous (vectorised),
+        # unlike the strided reduction of a (V,3) array over axis 0
+        lanes = vertices[:rows*LANES].reshape( (rows,LANES*3) )
+        lower = lanes.min( 0 ).reshape( (LANES,3) )
+        upper = lanes.max( 0 ).reshape( (LANES,3) )
+        rest = vertices[rows*LANES:]
+        if len(rest):
+            lower = concatenate( (lower,rest) )
+            upper = concatenate( (upper,rest) )
+        lower.min( 0, out=out[0] )
+        upper.max( 0, out=out[1] )
+    else:
+        vertices.min( 0, out=out[0] )
+        vertices.max( 0, out=out[1] )
+
+def mesh_bounds( vertices, blockSize=BLOCK_SIZE ):
+    """Calculate the (2,3) box of (V,3) vertices in a single pass"""
+    return reduce_boxes( block_bounds( vertices, blockSize ) )
+
+def reduce_boxes( boxes ):
+    """Combine (N,2,3) boxes into the (2,3) box containing them all"""
+    boxes = asarray( boxes )
+    result = empty( (2,3), boxes.dtype )
+    boxes[:,0].min( 0, out=result[0] )
+    boxes[:,1].max( 0, out=result[1] )
+    return result
+
+def mesh_sphere( vertices, box=None ):
+    """Calculate a bounding sphere of (V,3) vertices
+
+    The sphere is centered on the bounding box (box, calculated if
+    not provided), which is not the minimal sphere but is found
+    with one further pass over the vertices.
+
+    returns (center, radius)
+    """
+    vertices = _vertices( vertices )
+    if box is None:
+        box = mesh_bounds( vertices )
+    center = box.sum( 0 ) * .5
+    offsets = vertices - center
+    return center, sqrt( einsum( 'ij,ij->i', offsets, offsets ).max() )
+
+def triangle_bounds( vertices, indices=None, out=None ):
+    """Calculate the (F,2,3) box of each triangle
+
+    vertices, indices -- triangle soup, or (V,3) vertices and
+        (F,3) indices
+    """
+    corners = _corners( vertices, indices )
+    if out is None:
+        out = empty( (len(corners),2,3), corners.dtype )
+    corners.min( 1, out=out[:,0] )
+    corners.max( 1, out=out[:,1] )
+    return out
+
+def _corner_spheres( corners ):
+    """Minimal bounding spheres of (F,3,3) corners, returns (centers, radii)"""
+    a, b, c = corners[:,0], corners[:,1], corners[:,2]
+    ab = b - a
+    ac = c - a
+    normal = cross( ab, ac )
+    lengthAB = einsum( 'ij,ij->i', ab, ab )
+    lengthAC = einsum( 'ij,ij->i', ac, ac )
+    area = einsum( 'ij,ij->i', normal, normal )
+    # circumcenter of acute triangles
+    offset = cross( normal, ab ) * lengthAC[:,newaxis]
+    offset += cross( ac, normal ) * lengthAB[:,newaxis]
+    offset /= where( area > 0, 2 * area, 1 )[:,newaxis]
+    centers = a + offset
+    # right, obtuse and degenerate triangles use their longest edge
+    dotA = einsum( 'ij,ij->i', ab, ac )
+    dotB = lengthAB - dotA
+    dotC = lengthAC - dotA
+    longest = (dotA <= 0) | (dotB <= 0) | (dotC <= 0) | (area <= 0)
+    lengthBC = lengthAB + lengthAC - 2 * dotA
+    edges = (
+        (lengthAB >= lengthAC) & (lengthAB >= lengthBC),
+        (lengthAC > lengthAB) & (lengthAC >= lengthBC),
+    )
+    first = where( edges[1][:,newaxis], c, b )
+    second = where( (edges[0] | edges[1])[:,newaxis], a, c )
+    centers = where( longest[:,newaxis], (first + second) * .5, centers )
+    radii = zeros( (len(corners),), corners.dtype )
+    for corner in (a, b, c):
+        offsets = corner - centers
+        maximum( radii, einsum( 'ij,ij->i', offsets, offsets ), out=radii )
+    return centers, sqrt( radii, out=radii )
+
+def triangle_spheres( vertices, indices=None ):
+    """Calculate the minimal bounding sphere of each triangle
+
+    The circumsphere for acute triangles, otherwise the sphere on
+    the longest edge.
+
+    returns (centers, radii) as (F,3) and (F,) arrays
+    """
+    return _corner_spheres( _corners( vertices, indices ) )
+
+def transform_aabbs( boxes, matrices ):
+    """Transform (N,2,3) boxes by (N,4,4) (or a single (4,4)) matrices
+
+    The transformed box contains the transformed corners of the
+    box (for affine matrices), calculated from the box center and
+    half-extents (extents are transformed by the absolute values of
+    the upper 3x3) rather than from the 8 corners.
+
+    returns (N,2,3) boxes
+    """
+    boxes = asarray( boxes, _fformat(boxes) ).reshape( (-1,2,3) )
+    matrices = asarray( matrices, boxes.dtype )
+    centers = boxes.sum( 1 )
+    centers *= .5
+    extents = boxes[:,1] - boxes[:,0]
+    extents *= .5
+    if matrices.ndim == 2:
+        centers = centers.dot( matrices[:3,:3] )
+        centers += matrices[3,:3]
+        extents = extents.dot( absolute( matrices[:3,:3] ) )
+    else:
+        matrices = matrices.reshape( (-1,4,4) )
+        centers = einsum( 'ni,nij->nj', centers, matrices[:,:3,:3] )
+        centers += matrices[:,3,:3]
+        extents = einsum( 'ni,nij->nj', extents, absolute( matrices[:,:3,:3] ) )
+    result = empty( (len(centers),2,3), boxes.dtype )
+    result[:,0] = centers - extents
+    result[:,1] = centers + extents
+    return result
+
+class MeshBounds(object):
+    """Incrementally updated bounds of a mesh and its triangles
+
+    vertices -- (V,3) vertex array (the caller's array when
+        possible, edit it in place then call mark_dirty/update)
+    indices -- (F,3) triangle indices (None for a triangle soup)
+    blockSize -- vertices per block
+    blocks -- (B,2,3) box of each block of vertices
+    box -- (2,3) box of the mesh
+    center, radius -- bounding sphere of the mesh, the box center
+        and the distance to the farthest block box corner (so
+        conservative, not minimal)
+    triangleBoxes -- (F,2,3) triangle boxes
+    triangleCenters, triangleRadii -- (F,3) and (F,) triangle spheres
+    dirty -- (B,) boolean mask of blocks needing update
+    """
+    def __init__( self, vertices, indices=None, blockSize=BLOCK_SIZE ):
+        """Calculate all bounds for the mesh"""
+        self.vertices = _vertices( vertices )
+        if indices is not None:
+            self.vertices, indices = triangleutilities._indexed( self.vertices, indices )
+            self.vertices = self.vertices[:,:3]
+        self.indices = indices
+        self.blockSize = max( 1, blockSize )
+        self.blocks = block_bounds( self.vertices, self.blockSize )
+        self.dirty = zeros( (len(self.blocks),), bool )
+        corners = _corners( self.vertices, indices )
+        self.triangleBoxes = triangle_bounds( self.vertices, indices )
+        self.triangleCenters, self.triangleRadii = _corner_spheres( corners )
+        self._mesh()
+    def mark_dirty( self, start=0, stop=None ):
+        """Mark vertices [start:stop] as modified"""
+        if stop is None:
+            stop = len(self.vertices)
+        if stop > start:
+            self.dirty[start//self.blockSize:-(-stop//self.blockSize)] = True
+    def set_vertices( self, start, values ):
+        """Replace vertices from start with (N,3) values and mark them dirty"""
+        values = asarray( values, self.vertices.dtype ).reshape( (-1,3) )
+        stop = start + len(values)
+        if start < 0 or stop > len(self.vertices):
+            raise ValueError( "Vertex range %s:%s out of range for %s vertices"%( start, stop, len(self.vertices) ))
+        self.vertices[start:stop] = values
+        self.mark_dirty( start, stop )
+    def update( self ):
+        """Recalculate the bounds of dirty blocks and the triangles using them
+
+        returns (F,) indices of the updated triangles
+        """
+        blocks = flatnonzero( self.dirty )
+        if not len(blocks):
+            return arange( 0, dtype=intp )
+        size = self.blockSize
+        for block in blocks:
+            _block_box( self.vertices[block*size:(block+1)*size], self.blocks[block] )
+        if self.indices is None:
+            # a soup triangle's vertices are contiguous, so its first and
+            # last vertices cover every block it touches
+            first = arange( len(self.triangleBoxes) ) * 3
+            triangles = flatnonzero( self.dirty[first // size] | self.dirty[(first+2) // size] )
+            corners = self.vertices[:len(self.triangleBoxes)*3].reshape( (-1,3,3) )[triangles]
+        else:
+            triangles = flatnonzero( self.dirty[self.indices // size].any( 1 ) )
+            corners = take( self.vertices, self.indices[triangles], axis=0 )
+        self.triangleBoxes[triangles,0] = corners.min( 1 )
+        self.triangleBoxes[triangles,1] = corners.max( 1 )
+        self.triangleCenters[triangles], self.triangleRadii[triangles] = _corner_spheres( corners )
+        self.dirty[:] = False
+        self._mesh()
+        return triangles
+    def _mesh( self ):
+        if not len(self.blocks):
+            self.box = zeros( (2,3), self.vertices.dtype )
+            self.center, self.radius = self.box[0], 0.0
+            return
+        self.box = reduce_boxes( self.blocks )
+        self.center = self.box.sum( 0 ) * .5
+        # the farthest corner of each block from the center
+        farthest = maximum(
+            absolute( self.blocks[:,0] - self.center ),
+            absolute( self.blocks[:,1] - self.center ),
+        )
+        self.radius = sqrt( einsum( 'ij,ij->i', farthest, farthest ).max() )
@@ -0,0 +1,282 @@
+"""Bounding volume hierarchy over triangle vertex arrays
+
+TriangleBVH indexes the triangles of either a triangle soup
+(vertices in the triangleutilities format) or an indexed mesh
+((V,3) vertices plus (F,3) indices).  Nodes are stored in flat
+arrays rather than Python objects:
+
+    lower, upper -- (N,3) node bounding boxes
+    left -- (N,) index of the node's first child (the second
+        child is left+1), or -1 for leaves
+    start, count -- (N,) range of the node's triangles in order
+    order -- (F,) triangle indices, sorted so that each node's
+        triangles are contiguous
+
+Construction splits all nodes of a level at once using a binned
+surface area heuristic (SAH) over the triangle centers (see
+triangleutilities.centers).  refit() updates the bounds after
+the vertices move (keeping the topology), and the query methods
+traverse the tree breadth-first for a whole batch of queries at
+once, so the work per query depends on the number of nodes it
+overlaps rather than on the number of triangles.
+"""
+from .arrays import (
+    asarray, full, zeros, arange, repeat, concatenate, argsort,
+    bincount, cumsum, minimum, maximum, argmax, argmin, clip, where,
+    take, inf, intp, newaxis, flatnonzero, broadcast_to, segment_ranges,
+)
+from . import triangleutilities
+from .vectorutilities import _fformat
+
+def _half_area( lower, upper ):
+    """Half the surface area of (...,3) boxes (0 for empty boxes)"""
+    extent = maximum( upper - lower, 0 )
+    return (
+        extent[...,0]*extent[...,1] +
+        extent[...,1]*extent[...,2] +
+        extent[...,2]*extent[...,0]
+    )
+
+class TriangleBVH(object):
+    """Binned-SAH bounding volume hierarchy of triangles in flat arrays
+
+    vertices -- (V,3) vertex array (the expanded soup for soup input)
+    indices -- (F,3) vertex indices of each triangle
+    triangleLower, triangleUpper -- (F,3) triangle bounding boxes
+    lower, upper, left, start, count, order -- node arrays, see module
+    levels -- list of node index arrays for each depth (root first)
+    """
+    def __init__( self, vertices, indices=None, leafSize=4, bins=16 ):
+        """Build the hierarchy
+
+        vertices -- triangle soup (as for triangleutilities) or
+            (V,3) vertex array when indices is provided
+        indices -- optional (F,3) array of vertex indices
+        leafSize -- nodes with at most this many triangles are leaves
+        bins -- number of SAH candidate bins per node
+        """
+        if indices is None:
+            vertices = asarray( vertices, _fformat(vertices) ).reshape( (-1,3) )
+            indices = arange( len(vertices) - len(vertices)%3 )
+        self.vertices, self.indices = triangleutilities._indexed( vertices, indices )
+        self.vertices = self.vertices[:,:3]
+        self.leafSize = max( 1, leafSize )
+        self.bins = max( 2, bins )
+        self._triangle_bounds()
+        self._build()
+    def __len__( self ):
+        """Number of nodes"""
+        return len(self.left)
+    def _triangle_bounds( self ):
+        corners = take( self.vertices, self.indices, axis=0 )
+        self.triangleLower = corners.min( 1 )
+        self.triangleUpper = corners.max( 1 )
+    def _build( self ):
+        triangles = len(self.indices)
+        bins = self.bins
+        # per-triangle values for the nodes of the current level, kept
+        # aligned with members (the nodes' slices of order)
+        members = arange( triangles )
+        lower, upper = self.triangleLower, self.triangleUpper
+        centers = triangleutilities.centersIndexed( self.vertices, self.indices )
+        self.order = members.copy()
+        nodeStart = zeros( (1,), intp )
+        nodeCount = full( (1,), triangles, intp )
+        if triangles:
+            nodeLower, nodeUpper = lower.min( 0 )[newaxis], upper.max( 0 )[newaxis]
+        else:
+            nodeLower = nodeUpper = zeros( (1,3), lower.dtype )
+        lowers, uppers, lefts, starts, counts, levels = [],[],[],[],[],[]
+        nextNode = 1
+        while True:
+            left = full( (len(nodeStart),), -1, intp )
+            levels.append( arange( nextNode - len(nodeStart), nextNode ) )
+            for target,values in zip(
+                (lowers,uppers,lefts,starts,counts),
+                (nodeLower,nodeUpper,left,nodeStart,nodeCount),
+            ):
+                target.append( values )
+            split = nodeCount > self.leafSize
+            if not split.any():
+                break
+            # restrict to the nodes being split
+            keep = repeat( split, nodeCount )
+            members, lower, upper, centers = members[keep], lower[keep], upper[keep], centers[keep]
+            selected = flatnonzero( split )
+            nodeStart, nodeCount = nodeStart[selected], nodeCount[selected]
+            offsets = cumsum( nodeCount ) - nodeCount
+            owner = repeat( arange( len(nodeStart) ), nodeCount )
+            # bin centers along the longest axis of each node's center bounds
+            centerLower = minimum.reduceat( centers, offsets )
+            extent = maximum.reduceat( centers, offsets ) - centerLower
+            axis = argmax( extent, 1 )
+            width = extent[arange( len(axis) ),axis]
+            scale = where( width > 0, bins / where( width > 0, width, 1 ), 0 )
+            axes = axis[owner]
+            positions = centers[arange( len(centers) ),axes] - centerLower[owner,axes]
+            binned = clip( (positions * scale[owner]).astype( intp ), 0, bins-1 )
+            keys = owner * bins + binned
+            sort = argsort( keys, kind='stable' )
+            members, lower, upper, centers, keys = (
+                members[sort], lower[sort], upper[sort], centers[sort], keys[sort],
+            )
+            self.order[segment_ranges( nodeStart, nodeStart + nodeCount )] = members
+            # per-bin counts and bounds, then sweep for the SAH cost of each split
+            binCount = bincount( keys, minlength=len(nodeStart)*bins ).reshape( (-1,bins) )
+            firsts = flatnonzero( concatenate( ([True],keys[1:] != keys[:-1]) ) )
+            binLower = full( (len(nodeStart)*bins,3), inf, lower.dtype )
+            binUpper = full( (len(nodeStart)*bins,3), -inf, upper.dtype )
+            binLower[keys[firsts]] = minimum.reduceat( lower, firsts )
+            binUpper[keys[firsts]] = maximum.reduceat( upper, firsts )
+            binLower = binLower.reshape( (-1,bins,3) )
+            binUpper = binUpper.reshape( (-1,bins,3) )
+            leftCount = cumsum( binCount, 1 )[:,:-1]
+            rightCount = nodeCount[:,newaxis] - leftCount
+            leftArea = _half_area(
+                minimum.accumulate( binLower, 1 )[:,:-1],
+                maximum.accumulate( binUpper, 1 )[:,:-1],
+            )
+            rightArea = _half_area(
+                minimum.accumulate( binLower[:,::-1], 1 )[:,::-1][:,1:],
+                maximum.accumulate( binUpper[:,::-1], 1 )[:,::-1][:,1:],
+            )
+            cost = where(
+                (leftCount > 0) & (rightCount > 0),
+                leftCount*leftArea + rightCount*rightArea, inf,
+            )
+            best = argmin( cost, 1 )
+            splitCount = leftCount[arange( len(best) ),best]
+            # all centers in one bin, split the (arbitrary) order in half
+            fallback = ~(cost[arange( len(best) ),best] < inf)
+            splitCount[fallback] = nodeCount[fallback] // 2
+            left[selected] = nextNode + 2*arange( len(selected) )
+            nextNode += 2*len(selected)
+            # children, with siblings adjacent (left, left+1)
+            nodeStart = concatenate(
+                (nodeStart[:,newaxis],(nodeStart+splitCount)[:,newaxis]), 1,
+            ).ravel()
+            nodeCount = concatenate(
+                (splitCount[:,newaxis],(nodeCount-splitCount)[:,newaxis]), 1,
+            ).ravel()
+            offsets = cumsum( nodeCount ) - nodeCount
+            nodeLower = minimum.reduceat( lower, offsets )
+            nodeUpper = maximum.reduceat( upper, offsets )
+        self.lower = concatenate( lowers )
+        self.upper = concatenate( uppers )
+        self.left = concatenate( lefts )
+        self.start = concatenate( starts )
+        self.count = concatenate( counts )
+        self.levels = levels
+    def refit( self, vertices=None ):
+        """Update triangle and node bounds after the vertices have moved
+
+        vertices -- optional new (V,3) vertex array (same layout
+            as at construction), otherwise self.vertices is assumed
+            to have been modified in-place
+
+        The tree topology is unchanged, so query performance
+        degrades if the deformation is large (rebuild instead).
+        """
+        if vertices is not None:
+            vertices = asarray( vertices, self.vertices.dtype ).reshape( (-1,3) )
+            if vertices.shape != self.vertices.shape:
+                raise ValueError( "Refit requires vertices of shape %s"%( self.vertices.shape, ))
+            self.vertices = vertices
+        self._triangle_bounds()
+        leaves = flatnonzero( self.left < 0 )
+        leaves = leaves[argsort( self.start[leaves] )]
+        leaves = leaves[self.count[leaves] > 0]
+        if len(leaves):
+            self.lower[leaves] = minimum.reduceat( self.triangleLower[self.order], self.start[leaves] )
+            self.upper[leaves] = maximum.reduceat( self.triangleUpper[self.order], self.start[leaves] )
+        for level in self.levels[::-1]:
+            nodes = level[self.left[level] >= 0]
+            children = self.left[nodes]
+            self.lower[nodes] = minimum( self.lower[children], self.lower[children+1] )
+            self.upper[nodes] = maximum( self.upper[children], self.upper[children+1] )
+    def traverse( self, count, overlaps ):
+        """Breadth-first traversal for a batch of count queries
+
+        overlaps -- function( queries, lower, upper ) returning a
+            boolean mask of whether each query (index array)
+            overlaps the corresponding (M,3) boxes
+
+        returns (queries, triangles) arrays of candidate pairs, i.e.
+        triangles in leaves whose bounds overlap the query
+        """
+        queries = arange( count )
+        nodes = zeros( (count,), intp )
+        foundQueries, foundTriangles = [],[]
+        while len(queries):
+            hit = overlaps( queries, self.lower[nodes], self.upper[nodes] )
+            queries, nodes = queries[hit], nodes[hit]
+            children = self.left[nodes]
+            leaf = children < 0
+            leafNodes = nodes[leaf]
+            foundQueries.append( repeat( queries[leaf], self.count[leafNodes] ) )
+            foundTriangles.append( self.order[segment_ranges(
+                self.start[leafNodes], self.start[leafNodes] + self.count[leafNodes],
+            )] )
+            queries = repeat( queries[~leaf], 2 )
+            nodes = repeat( children[~leaf], 2 )
+            nodes[1::2] += 1
+        return concatenate( foundQueries ), concatenate( foundTriangles )
+    def _filter( self, candidates, overlaps ):
+        queries, triangles = candidates
+        hit = overlaps( queries, self.triangleLower[triangles], self.triangleUpper[triangles] )
+        return queries[hit], triangles[hit]
+    def query_boxes( self, lower, upper ):
+        """Find triangles whose bounding boxes overlap (N,3) query boxes
+
+        returns (queries, triangles) index arrays of overlapping pairs
+        """
+        lower = asarray( lower, self.lower.dtype ).reshape( (-1,3) )
+        upper = asarray( upper, self.lower.dtype ).reshape( (-1,3) )
+        def overlaps( queries, nodeLower, nodeUpper ):
+            return (
+                (nodeLower <= upper[queries]) & (nodeUpper >= lower[queries])
+            ).all( 1 )
+        return self._filter( self.traverse( len(lower), overlaps ), overlaps )
+    def query_spheres( self, centers, radii ):
+        """Find triangles whose bounding boxes overlap (N,3) centered spheres
+
+        radii -- (N,) sphere radii (or a single radius)
+
+        returns (queries, triangles) index arrays of overlapping pairs
+        """
+        centers = asarray( centers, self.lower.dtype ).reshape( (-1,3) )
+        radii = broadcast_to( asarray( radii, self.lower.dtype ), (len(centers),) )
+        squared = radii * radii
+        def overlaps( queries, nodeLower, nodeUpper ):
+            points = centers[queries]
+            nearest = minimum( maximum( points, nodeLower ), nodeUpper )
+            nearest -= points
+            return (nearest*nearest).sum( 1 ) <= squared[queries]
+        return self._filter( self.traverse( len(centers), overlaps ), overlaps )
+    def query_rays( self, origins, directions, tmax=inf ):
+        """Find triangles whose bounding boxes are hit by (N,3) rays
+
+        origins, directions -- (N,3) ray origins and directions
+        tmax -- (N,) (or single) maximum ray parameter, boxes
+            beyond origin + tmax*direction are not reported
+
+        returns (queries, triangles) index arrays of candidate pairs
+        """
+        origins = asarray( origins, 'd' ).reshape( (-1,3) )
+        directions = asarray( directions, 'd' ).reshape( (-1,3) )
+        inverse = 1.0 / directions
+        limits = broadcast_to( asarray( tmax, 'd' ), (len(origins),) )
+        def overlaps( queries, nodeLower, nodeUpper ):
+            return self._slabs( origins[queries], inverse[queries], nodeLower, nodeUpper, limits[queries] )[0]
+        return self._filter( self.traverse( len(origins), overlaps ), overlaps )
+    @staticmethod
+    def _slabs( origins, inverse, lower, upper, limits ):
+        """Ray/box slab test, returns (hit, entry) for each ray/box pair"""
+        first = (lower - origins) * inverse
+        second = (upper - origins) * inverse
+        # 0 * inf for rays parallel to (and within) a slab
+        first[first != first] = -inf
+        second[second != second] = inf
+        entry = maximum( minimum( first, second ).max( 1 ), 0.0 )
+        exit = minimum( maximum( first, second ).min( 1 ), limits )
+        return entry <= exit, entry
@@ -0,0 +1,98 @@
+"""View-frustum extraction and batched culling
+
+Frustum planes are extracted from a combined (view * projection)
+matrix, using the row-vector convention of transformmatrix
+(clip = dot( point, dot( view, projection ) )), such as the
+perspective_matrix result.  Note that ortho_matrix returns the
+transposed (column-vector) form, pass ortho_matrix(...).T
+
+Planes use the same (a,b,c,d) layout as utilities.pointNormal2Plane,
+with normals pointing into the frustum, that is, a point is
+inside a plane when dot( (x,y,z,1), plane ) >= 0.
+"""
+from .arrays import (asarray, sqrt, dot, absolute, float32, newaxis)
+
+LEFT, RIGHT, BOTTOM, TOP, NEAR, FAR = range(6)
+
+def frustum_planes( matrix, normalise=True ):
+    """Extract the 6 frustum planes from a combined view-projection matrix
+
+    matrix -- 4x4 matrix mapping (row-vector) coordinates to clip space
+    normalise -- if True, scale planes so that (a,b,c) is unit length,
+        which makes plane distances true distances (required for
+        sphere culling)
+
+    returns (6,4) array of planes in LEFT, RIGHT, BOTTOM, TOP, NEAR,
+    FAR order
+    """
+    matrix = asarray( matrix, 'd' )
+    w = matrix[:,3]
+    planes = asarray( [
+        w + matrix[:,0],
+        w - matrix[:,0],
+        w + matrix[:,1],
+        w - matrix[:,1],
+        w + matrix[:,2],
+        w - matrix[:,2],
+    ] )
+    if normalise:
+        lengths = sqrt( (planes[:,:3]*planes[:,:3]).sum( 1 ) )
+        planes /= lengths[:,newaxis]
+    return planes
+
+def _classify( distances, radii ):
+    """Produce inside, outside, intersecting masks from (N,6) distances and radii"""
+    outside = (distances < -radii).any( 1 )
+    inside = (distances >= radii).all( 1 )
+    inside &= ~outside
+    intersecting = ~(inside | outside)
+    return inside, outside, intersecting
+
+def _distances( planes, points ):
+    """Signed distances of (N,3) points from each of the planes as (N,6)"""
+    planes = asarray( planes, points.dtype )
+    distances = dot( points, planes[:,:3].T )
+    distances += planes[:,3]
+    return distances
+
+def cull_spheres( planes, centers, radii ):
+    """Classify bounding spheres against frustum planes
+
+    planes -- (6,4) normalised planes from frustum_planes
+    centers -- (N,3) sphere centers
+    radii -- (N,) sphere radii (or a single radius)
+
+    returns (inside, outside, intersecting) (N,) boolean masks
+    """
+    centers = asarray( centers )
+    if centers.dtype.kind != 'f':
+        centers = asarray( centers, float32 )
+    centers = centers.reshape( (-1,3) )
+    radii = asarray( radii, centers.dtype )
+    if radii.ndim:
+        radii = radii[:,newaxis]
+    return _classify( _distances( planes, centers ), radii )
+
+def cull_boxes( planes, boxes ):
+    """Classify axis-aligned bounding boxes against frustum planes
+
+    planes -- (6,4) planes from frustum_planes
+    boxes -- (N,2,3) array of (minimum, maximum) box corners
+
+    Each box is tested as its center and its projected radius
+    (half-extents dotted with the absolute plane normal) for
+    each plane, which is equivalent to testing the nearest and
+    farthest box corners.
+
+    returns (inside, outside, intersecting) (N,) boolean masks
+    """
+    boxes = asarray( boxes )
+    if boxes.dtype.kind != 'f':
+        boxes = asarray( boxes, float32 )
+    boxes = boxes.reshape( (-1,2,3) )
+    centers = boxes.sum( 1 )
+    centers *= .5
+    extents = boxes[:,1] - boxes[:,0]
+    extents *= .5
+    radii = dot( extents, absolute( asarray( planes, boxes.dtype )[:,:3] ).T )
+    return _classify( _distances( planes, centers ), radii )
@@ -0,0 +1,203 @@
+"""Flat, array-backed transform hierarchy
+
+Rather than walking a scenegraph recursively and calling
+transform_matrix( parentMatrix=... ) for every node, the
+hierarchy is stored as a parent-index array along with
+(N,...) arrays of the VRML transform values for each node.
+
+World matrices are calculated level-by-level (all nodes at
+a given depth at once) with batched matrix multiplies.  Edits
+to local transforms mark nodes dirty, and update() only
+recomputes the dirty nodes and their descendants, which are
+found as ranges of the depth-first order (see depth_first_order)
+rather than by visiting every node.
+
+Matrices follow the transformmatrix conventions, that is,
+the world matrix of a node is dot( local, parentWorld ) and
+is applied as dot( point, world ).
+"""
+from .arrays import (
+    asarray, zeros, ones, full, empty, nonzero, argsort, searchsorted,
+    matmul, intp, segment_ranges, add, cumsum, arange, maximum,
+    concatenate,
+)
+from . import transformmatrix
+
+def hierarchy_levels( parents ):
+    """Group nodes by depth in the hierarchy
+
+    parents -- (N,) integer array of parent indices, with
+        negative values for root nodes
+
+    returns (depths, levels) where depths is an (N,) array of
+    node depths (roots are 0) and levels is a list of index
+    arrays, levels[d] holding the nodes at depth d
+
+    raises ValueError if parents references non-existent nodes
+    or contains cycles
+    """
+    parents = asarray( parents, intp )
+    count = len(parents)
+    if count and parents.max() >= count:
+        raise ValueError( "Parent index out of range: %s"%( parents.max(), ))
+    depths = full( (count,), -1, intp )
+    order = argsort( parents, kind='stable' )
+    sortedParents = parents[order]
+    current = nonzero( parents < 0 )[0]
+    levels = []
+    while len(current):
+        depths[current] = len(levels)
+        levels.append( current )
+        current = order[segment_ranges(
+            searchsorted( sortedParents, current, 'left' ),
+            searchsorted( sortedParents, current, 'right' ),
+        )]
+    if (depths < 0).any():
+        raise ValueError( "Hierarchy contains cycles: %s"%( nonzero(depths < 0)[0], ))
+    return depths, levels
+
+def depth_first_order( parents, levels ):
+    """Calculate the depth-first (pre-)order of a hierarchy
+
+    parents -- (N,) integer array of parent indices
+    levels -- per-depth node arrays from hierarchy_levels
+
+    returns (order, starts, stops) where order is the (N,) array
+    of nodes in depth-first order and order[starts[i]:stops[i]]
+    holds node i followed by all of its descendants
+    """
+    parents = asarray( parents, intp )
+    count = len(parents)
+    sizes = ones( (count,), intp )
+    for nodes in levels[:0:-1]:
+        add.at( sizes, parents[nodes], sizes[nodes] )
+    starts = zeros( (count,), intp )
+    for depth,nodes in enumerate( levels ):
+        # hierarchy_levels keeps siblings contiguous, so each node
+        # follows the subtrees of its earlier siblings
+        nodeSizes = sizes[nodes]
+        offsets = cumsum( nodeSizes ) - nodeSizes
+        if depth:
+            nodeParents = parents[nodes]
+            first = concatenate( ([True],nodeParents[1:] != nodeParents[:-1]) )
+            heads = maximum.accumulate( arange( len(nodes) ) * first )
+            offsets -= offsets[heads]
+            offsets += starts[nodeParents] + 1
+        starts[nodes] = offsets
+    order = empty( (count,), intp )
+    order[starts] = arange( count )
+    return order, starts, starts + sizes
+
+class TransformHierarchy(object):
+    """Array-backed transform hierarchy with incremental world matrices
+
+    parents -- (N,) parent index for each node, negative for roots
+    translations, centers, scales -- (N,3) local transform values
+    rotations, scaleOrientations -- (N,4) local rotations (radians, angle last)
+    local, localInverse -- (N,4,4) local matrix stacks
+    world, worldInverse -- (N,4,4) world matrix stacks, valid after update()
+    order, starts, stops -- depth-first order and subtree ranges,
+        see depth_first_order
+
+    The topology is fixed at construction time, create a new
+    hierarchy to add, remove or re-parent nodes.
+    """
+    def __init__( self, parents, dtype='f' ):
+        """Initialise the hierarchy with identity transforms
+
+        parents -- (N,) integer array of parent indices, negative for roots
+        dtype -- data-type of the matrix stacks
+        """
+        self.parents = asarray( parents, intp )
+        self.depths, self.levels = hierarchy_levels( self.parents )
+        self.order, self.starts, self.stops = depth_first_order( self.parents, self.levels )
+        count = len(self.parents)
+        self.translations = zeros( (count,3), 'd' )
+        self.centers = zeros( (count,3), 'd' )
+        self.rotations = zeros( (count,4), 'd' )
+        self.rotations[:,1] = 1
+        self.scales = ones( (count,3), 'd' )
+        self.scaleOrientations = self.rotations.copy()
+        self.local = transformmatrix._identity_stack( count, dtype )
+        self.localInverse = transformmatrix._identity_stack( count, dtype )
+        self.world = transformmatrix._identity_stack( count, dtype )
+        self.worldInverse = transformmatrix._identity_stack( count, dtype )
+        self.dirty = zeros( (count,), bool )
+    def __len__( self ):
+        return len(self.parents)
+    def set_transforms(
+            self,
+            indices,
+            translations = None,
+            centers = None,
+            rotations = None,
+            scales = None,
+            scaleOrientations = None,
+        ):
+        """Update local transform values for the given nodes
+
+        indices -- index (or index array/slice/mask) of nodes to update
+        translations, centers, scales -- values to assign (broadcast
+            as for normal numpy assignment), None to leave unchanged
+        rotations, scaleOrientations -- values to assign, None to leave
+            unchanged
+
+        The nodes are marked dirty, call update() to recalculate
+        the world matrices.
+        """
+        for source,target in (
+            (translations,self.translations),
+            (centers,self.centers),
+            (rotations,self.rotations),
+            (scales,self.scales),
+            (scaleOrientations,self.scaleOrientations),
+        ):
+            if source is not None:
+                target[indices] = source
+        self.dirty[indices] = True
+    def mark_dirty( self, indices=slice(None) ):
+        """Force recalculation of the given nodes (default all) on next update()"""
+        self.dirty[indices] = True
+    def update( self ):
+        """Recalculate local and world matrices for dirty nodes and their descendants
+
+        returns the number of nodes whose world matrices were recalculated
+        """
+        changed = nonzero( self.dirty )[0]
+        if not len(changed):
+            return 0
+        forward,inverse = transformmatrix.fused_transform_matrices_stack(
+            self.translations[changed],
+            self.centers[changed],
+            self.rotations[changed],
+            self.scales[changed],
+            self.scaleOrientations[changed],
+            dtype = self.local.dtype,
+        )
+        self.local[changed] = forward
+        self.localInverse[changed] = inverse
+        self.dirty[changed] = False
+        # subtree ranges are nested or disjoint, drop those within
+        # the range of an earlier (in depth-first order) dirty node
+        starts = self.starts[changed]
+        sortedStarts = argsort( starts )
+        starts, stops = starts[sortedStarts], self.stops[changed][sortedStarts]
+        outer = starts >= concatenate( ([0],maximum.accumulate( stops )[:-1]) )
+        nodes = self.order[segment_ranges( starts[outer], stops[outer] )]
+        # descendants follow their ancestors once grouped by depth
+        depths = self.depths[nodes]
+        byDepth = argsort( depths, kind='stable' )
+        nodes, depths = nodes[byDepth], depths[byDepth]
+        bounds = searchsorted( depths, arange( depths[0], depths[-1]+2 ) )
+        for depth,start,stop in zip( range( depths[0], depths[-1]+1 ), bounds[:-1], bounds[1:] ):
+            level = nodes[start:stop]
+            if depth:
+                parents = self.parents[level]
+                self.world[level] = matmul( self.local[level], self.world[parents] )
+                self.worldInverse[level] = matmul(
+                    self.worldInverse[parents], self.localInverse[level]
+                )
+            else:
+                self.world[level] = self.local[level]
+                self.worldInverse[level] = self.localInverse[level]
+        return len(nodes)
@@ -0,0 +1,237 @@
+"""Opt-in instrumentation of vecutils hot paths
+
+Functions decorated with traced() record per-function call
+counts, wall-clock time (inclusive of nested calls), result
+bytes (the size of newly allocated arrays returned by traced
+functions and by the coercion helpers, temporaries and scratch
+buffers are not counted) and the number of implicit copies and
+dtype casts made by the asarray/reshape coercion helpers in
+this module.
+
+Recording is disabled by default, in which case traced()
+returns the undecorated function and asarray/reshape are the
+numpy functions, so there is no overhead.  Enabling recording
+replaces the traced functions (and the coercion helpers of the
+modules defining them) in the vecutils module namespaces with
+recording versions, and disabling restores them, so references
+to functions taken (e.g. with from ... import) by code outside
+vecutils before recording was enabled are not recorded.
+Enable it for a block of code with:
+
+    with instrument.recording() as recorder:
+        normalPerFace( vertices )
+    print( recorder.report() )
+
+or for the whole process by setting the VECUTILS_INSTRUMENT
+environment variable (to anything other than 0), in which
+case a report is written to stderr at exit.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from .arrays import (
+    asarray as _asarray, reshape as _reshape, ndarray, may_share_memory,
+)
+
+_RECORDER = None
+_LOCAL = threading.local()
+UNTRACED = '<untraced>'
+# raw function -> recording wrapper, for all traced functions
+_WRAPPERS = {}
+# names of modules defining traced functions
+_MODULES = set()
+_PACKAGE = __name__.rsplit( '.', 1 )[0] + '.'
+
+class FunctionStats(object):
+    """Accumulated statistics for a single traced function"""
+    __slots__ = ('calls','seconds','result_bytes','copies','casts','conversions')
+    def __init__( self ):
+        self.calls = 0
+        self.seconds = 0.0
+        self.result_bytes = 0
+        self.copies = 0
+        self.casts = 0
+        self.conversions = 0
+    def as_dict( self ):
+        return dict([ (key,getattr(self,key)) for key in self.__slots__ ])
+
+class Recorder(object):
+    """Collects FunctionStats for traced functions
+
+    functions -- mapping of function name to FunctionStats
+    """
+    def __init__( self ):
+        self.functions = {}
+        self.lock = threading.Lock()
+    def _stats( self, name ):
+        stats = self.functions.get( name )
+        if stats is None:
+            stats = self.functions.setdefault( name, FunctionStats() )
+        return stats
+    def call( self, name, function, args, named ):
+        """Call function(*args,**named) recording its statistics under name"""
+        stack = _stack()
+        stack.append( name )
+        start = time.perf_counter()
+        try:
+            result = function( *args, **named )
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+        allocated = 0
+        inputs = []
+        for arg in args + tuple(named.values()):
+            for item in (arg if isinstance( arg, tuple ) else (arg,)):
+                if isinstance( item, ndarray ):
+                    inputs.append( item )
+        for item in (result if isinstance( result, tuple ) else (result,)):
+            if isinstance( item, ndarray ) and not any([
+                may_share_memory( item, arg ) for arg in inputs
+            ]):
+                allocated += item.nbytes
+        with self.lock:
+            stats = self._stats( name )
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.result_bytes += allocated
+        return result
+    def coerced( self, source, result ):
+        """Record an implicit conversion of source to the (new) array result"""
+        stack = _stack()
+        name = stack[-1] if stack else UNTRACED
+        with self.lock:
+            stats = self._stats( name )
+            if not isinstance( source, ndarray ):
+                stats.conversions += 1
+            elif source.dtype != result.dtype:
+                stats.casts += 1
+            else:
+                stats.copies += 1
+            stats.result_bytes += result.nbytes
+    def stats( self, name ):
+        """Retrieve the statistics dictionary for the named function"""
+        return self._stats( name ).as_dict()
+    def report( self ):
+        """Format the collected statistics as a text table"""
+        lines = ['%-40s %8s %12s %12s %7s %7s %7s'%(
+            'function','calls','seconds','result bytes','copies','casts','convert',
+        )]
+        for name,stats in sorted( self.functions.items() ):
+            lines.append( '%-40s %8d %12.6f %12d %7d %7d %7d'%(
+                name, stats.calls, stats.seconds, stats.result_bytes,
+                stats.copies, stats.casts, stats.conversions,
+            ))
+        return '\n'.join( lines )
+
+def _stack():
+    """Get the per-thread stack of currently executing traced function names"""
+    try:
+        return _LOCAL.stack
+    except AttributeError:
+        _LOCAL.stack = []
+        return _LOCAL.stack
+
+def active():
+    """Return the active Recorder or None"""
+    return _RECORDER
+
+def _install( recorder ):
+    """Set the active recorder, swapping recording/raw functions as required"""
+    global _RECORDER
+    previous, _RECORDER = _RECORDER, recorder
+    if (previous is None) != (recorder is None):
+        if recorder is None:
+            replacements = dict([ (id(wrapper),raw) for raw,wrapper in _WRAPPERS.items() ])
+            helpers = {'asarray': _asarray, 'reshape': _reshape}
+        else:
+            replacements = dict([ (id(raw),wrapper) for raw,wrapper in _WRAPPERS.items() ])
+            helpers = {'asarray': _recording_asarray, 'reshape': _recording_reshape}
+        for name, module in list( sys.modules.items() ):
+            if module is None or not (name.startswith( _PACKAGE ) or name == __name__):
+                continue
+            namespace = vars( module )
+            for key, value in list( namespace.items() ):
+                replacement = replacements.get( id(value) )
+                if replacement is not None:
+                    namespace[key] = replacement
+            if name in _MODULES or name == __name__:
+                for key, helper in helpers.items():
+                    if key in namespace:
+                        namespace[key] = helper
+    return previous
+
+def enable( recorder=None ):
+    """Start recording into recorder (or a new Recorder), returns the recorder"""
+    recorder = recorder or Recorder()
+    _install( recorder )
+    return recorder
+
+def disable():
+    """Stop recording, returns the previously active recorder (or None)"""
+    return _install( None )
+
+@contextmanager
+def recording( recorder=None ):
+    """Context manager which records traced calls within the block
+
+    yields the Recorder, the previously active recorder (if any)
+    is restored on exit
+    """
+    recorder = recorder or Recorder()
+    previous = _install( recorder )
+    try:
+        yield recorder
+    finally:
+        _install( previous )
+
+def traced( function ):
+    """Register function so that its calls are recorded when instrumentation is enabled
+
+    returns function itself unless recording is currently enabled
+    (in which case the recording wrapper is returned)
+    """
+    name = '%s.%s'%( function.__module__.split('.')[-1], function.__name__ )
+    @wraps( function )
+    def traced_function( *args, **named ):
+        recorder = _RECORDER
+        if recorder is None:
+            return function( *args, **named )
+        return recorder.call( name, function, args, named )
+    _WRAPPERS[function] = traced_function
+    _MODULES.add( function.__module__ )
+    return function if _RECORDER is None else traced_function
+
+def _recording_asarray( source, dtype=None ):
+    """numpy.asarray which records implicit copies/casts"""
+    result = _asarray( source, dtype )
+    recorder = _RECORDER
+    if recorder is not None and result is not source:
+        if not (isinstance( source, ndarray ) and may_share_memory( source, result )):
+            recorder.coerced( source, result )
+    return result
+
+def _recording_reshape( source, shape ):
+    """numpy.reshape which records implicit copies"""
+    result = _reshape( source, shape )
+    recorder = _RECORDER
+    if recorder is not None and not (
+        isinstance( source, ndarray ) and may_share_memory( source, result )
+    ):
+        recorder.coerced( source, result )
+    return result
+
+# coercion helpers for instrumented modules, numpy's own unless recording
+asarray = _asarray
+reshape = _reshape
+
+def _report_at_exit():
+    if _RECORDER is not None:
+        sys.stderr.write( _RECORDER.report() + '\n' )
+
+if os.environ.get( 'VECUTILS_INSTRUMENT', '0' ) not in ('','0'):
+    enable()
+    atexit.register( _report_at_exit )
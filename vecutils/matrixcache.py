@@ -0,0 +1,155 @@
+"""Opt-in memoizing cache for transformmatrix results
+
+Static scenes and instanced geometry tend to request the
+same matrices over and over.  A MatrixCache wraps the
+transformmatrix functions, keying results on the (float)
+parameter tuples and evicting least-recently-used entries
+once the configured size is exceeded.
+
+Cached matrices are shared between all callers, so they
+are marked read-only, copy them before modifying.
+
+    cache = MatrixCache( maxsize=4096 )
+    forward,inverse = cache.transform_matrices( translation=(1,0,0) )
+"""
+from collections import OrderedDict
+from . import transformmatrix
+
+def _key( source ):
+    """Convert a parameter sequence to a hashable tuple of floats"""
+    if source is None:
+        return None
+    return tuple([ float(x) for x in source ])
+
+def _frozen( matrix ):
+    """Mark a matrix (or None) read-only"""
+    if matrix is not None:
+        matrix.setflags( write=False )
+    return matrix
+
+class MatrixCache(object):
+    """Bounded LRU cache of transformation matrices
+
+    maxsize -- maximum number of entries retained
+    hits, misses -- number of lookups satisfied/not satisfied
+        from the cache
+    """
+    def __init__( self, maxsize=1024 ):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    def __len__( self ):
+        return len(self.entries)
+    def clear( self ):
+        """Discard all entries and reset statistics"""
+        self.entries.clear()
+        self.hits = self.misses = 0
+    def stats( self ):
+        """Return a dictionary of cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+            'hitRate': (self.hits / float(lookups)) if lookups else 0.0,
+        }
+    def lookup( self, key, function, *args ):
+        """Retrieve key from the cache, calculating function(*args) on a miss
+
+        function must return a matrix, None or a tuple of those,
+        all matrices are made read-only before being cached.
+        """
+        entries = self.entries
+        try:
+            result = entries[key]
+        except KeyError:
+            self.misses += 1
+            result = function( *args )
+            if isinstance( result, tuple ):
+                result = tuple([ _frozen(m) for m in result ])
+            else:
+                result = _frozen( result )
+            entries[key] = result
+            if len(entries) > self.maxsize:
+                entries.popitem( last=False )
+        else:
+            self.hits += 1
+            entries.move_to_end( key )
+        return result
+
+    def rotation_matrix( self, source=None ):
+        """Cached transformmatrix.rotation_matrix"""
+        return self.lookup(
+            ('rotation',_key(source)), transformmatrix.rotation_matrix, source,
+        )
+    def scale_matrix( self, source=None ):
+        """Cached transformmatrix.scale_matrix"""
+        return self.lookup(
+            ('scale',_key(source)), transformmatrix.scale_matrix, source,
+        )
+    def translate_matrix( self, source=None ):
+        """Cached transformmatrix.translate_matrix"""
+        return self.lookup(
+            ('translate',_key(source)), transformmatrix.translate_matrix, source,
+        )
+    def perspective_matrix( self, fovy, aspect, zNear, zFar, inverse=False ):
+        """Cached transformmatrix.perspective_matrix"""
+        return self.lookup(
+            ('perspective',float(fovy),float(aspect),float(zNear),float(zFar),bool(inverse)),
+            transformmatrix.perspective_matrix, fovy, aspect, zNear, zFar, inverse,
+        )
+    def ortho_matrix( self, left=-1.0, right=1.0, bottom=-1.0, top=1.0, zNear=-1.0, zFar=1.0 ):
+        """Cached transformmatrix.ortho_matrix"""
+        return self.lookup(
+            ('ortho',)+_key( (left,right,bottom,top,zNear,zFar) ),
+            transformmatrix.ortho_matrix, left, right, bottom, top, zNear, zFar,
+        )
+    def local_matrices(
+            self,
+            translation = (0,0,0),
+            center = (0,0,0),
+            rotation = (0,1,0,0),
+            scale = (1,1,1),
+            scaleOrientation = (0,1,0,0),
+        ):
+        """Cached transformmatrix.local_matrices"""
+        return self.lookup(
+            (
+                'local',_key(translation),_key(center),_key(rotation),
+                _key(scale),_key(scaleOrientation),
+            ),
+            transformmatrix.local_matrices,
+            translation, center, rotation, scale, scaleOrientation,
+        )
+    def transform_matrices(
+            self,
+            translation = (0,0,0),
+            center = (0,0,0),
+            rotation = (0,1,0,0),
+            scale = (1,1,1),
+            scaleOrientation = (0,1,0,0),
+            parentMatrix = None,
+        ):
+        """Cached transformmatrix.transform_matrices
+
+        The local (forward, inverse) matrices are cached, when
+        parentMatrix is provided it is applied to (uncached) copies
+        in the same manner as transform_matrices.
+        """
+        forward,inverse = self.local_matrices(
+            translation, center, rotation, scale, scaleOrientation,
+        )
+        if parentMatrix is None:
+            return forward,inverse
+        return (
+            transformmatrix.compress_matrices( parentMatrix, forward ),
+            transformmatrix.compress_matrices( parentMatrix, inverse ),
+        )
+    def transform_matrix( self, *args, **named ):
+        """Cached transformmatrix.transform_matrix"""
+        return self.transform_matrices( *args, **named )[0]
+    def itransform_matrix( self, *args, **named ):
+        """Cached transformmatrix.itransform_matrix"""
+        return self.transform_matrices( *args, **named )[1]
@@ -0,0 +1,133 @@
+"""Shared thread pool for splitting large-array kernels into chunks
+
+numpy releases the GIL within ufuncs, so large inputs can be
+processed by several threads at once by splitting them into
+(cache-sized) chunks, each of which writes into its slice of a
+pre-allocated output.  Functions supporting this take a workers
+argument, which defaults to the global setting:
+
+    parallel.set_workers( 8 )          # for the whole process
+    with parallel.workers( 8 ):        # for a block of code
+        normalPerFace( vertices )
+    normalPerFace( vertices, workers=8 )  # for a single call
+
+The default is 1 (serial), or the value of the VECUTILS_WORKERS
+environment variable.  Inputs with fewer than THRESHOLD items
+always take the serial path, as do calls made from within a
+chunk (nested calls never wait on the pool).
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+THRESHOLD = 65536
+CHUNK_SIZE = 16384
+
+_WORKERS = max( 1, int( os.environ.get( 'VECUTILS_WORKERS', '1' ) or 1 ) )
+_POOL = None
+_POOL_SIZE = 0
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+
+def get_workers():
+    """Return the global default number of workers"""
+    return _WORKERS
+
+def set_workers( count ):
+    """Set the global default number of workers, returns the previous value"""
+    global _WORKERS
+    previous, _WORKERS = _WORKERS, max( 1, int( count ) )
+    return previous
+
+@contextmanager
+def workers( count ):
+    """Context manager setting the global default number of workers within the block"""
+    previous = set_workers( count )
+    try:
+        yield count
+    finally:
+        set_workers( previous )
+
+def _grow( count ):
+    """Get the shared pool grown to at least count threads (call with _LOCK held)"""
+    global _POOL, _POOL_SIZE
+    if _POOL is None or _POOL_SIZE < count:
+        previous = _POOL
+        _POOL = ThreadPoolExecutor( count, thread_name_prefix='vecutils' )
+        _POOL_SIZE = count
+        if previous is not None:
+            # tasks already submitted still complete, its threads then exit
+            previous.shutdown( wait=False )
+    return _POOL
+
+def pool( count ):
+    """Get the shared thread pool, grown to at least count threads
+
+    run_chunked submits at most count tasks, so a larger pool
+    does not increase the parallelism of a call.  Growing the
+    pool replaces it, shutting down the previous pool, so submit
+    to the result promptly (run_chunked submits under the lock).
+    """
+    with _LOCK:
+        return _grow( count )
+
+def resolve( workers, count ):
+    """Number of workers to use for count items (1 means serial)"""
+    if workers is None:
+        workers = _WORKERS
+    if workers <= 1 or count < THRESHOLD or getattr( _LOCAL, 'inside', False ):
+        return 1
+    return workers
+
+def _run( function, ranges, slot ):
+    _LOCAL.inside = True
+    _LOCAL.slot = slot
+    try:
+        for start,stop in ranges:
+            function( start, stop )
+    finally:
+        _LOCAL.inside = False
+        _LOCAL.slot = 0
+
+def run_chunked( function, count, workers=None, chunkSize=None ):
+    """Call function( start, stop ) for chunks covering range(count)
+
+    When resolve( workers, count ) is greater than 1 the chunks are
+    interleaved between that many tasks on the shared pool,
+    otherwise function( 0, count ) is called directly.  Exceptions
+    raised in any chunk are re-raised.
+
+    chunkSize -- items per chunk, default CHUNK_SIZE
+    """
+    workers = resolve( workers, count )
+    if workers <= 1:
+        function( 0, count )
+        return
+    chunkSize = chunkSize or CHUNK_SIZE
+    ranges = [
+        (start,min( start+chunkSize, count ))
+        for start in range( 0, count, chunkSize )
+    ]
+    with _LOCK:
+        executor = _grow( workers )
+        futures = [
+            executor.submit( _run, function, ranges[index::workers], index )
+            for index in range( min( workers, len(ranges) ) )
+        ]
+    for future in futures:
+        future.result()
+
+def worker_slot():
+    """Index of the run_chunked task running in this thread (0 outside tasks)"""
+    return getattr( _LOCAL, 'slot', 0 )
+
+def thread_scratch( scratch ):
+    """Per-worker scratch dictionary nested within caller-owned scratch (or None)
+
+    Keyed by worker_slot(), so scratch holds at most one nested
+    dictionary per worker, however many threads have been used.
+    """
+    if scratch is None:
+        return None
+    return scratch.setdefault( ('worker',worker_slot()), {} )
@@ -7,8 +7,15 @@ Note: this is an entirely separate implementation from the PyOpenGL
     commonly needed for manipulating rotations.
 """
 #from OpenGLContext.arrays import *
-from .arrays import (array, sin, cos, asarray, sqrt, sum, dot, arccos)
-from . import utilities
+import math
+from .arrays import (
+    array, sin, cos, asarray, sqrt, sum, dot, arccos, empty, where,
+    clip, newaxis, einsum, ascontiguousarray, broadcast_shapes,
+    matmul, zeros, integer, divide, multiply, add,
+    scratch_array, identity, may_share_memory, arctan2, hypot,
+    absolute, pi,
+)
+from . import utilities, vectorutilities
 
 def fromXYZR( x,y,z, r ):
     """Create a new quaternion from a VRML-style rotation
@@ -18,9 +25,371 @@ def fromXYZR( x,y,z, r ):
     return Quaternion ( array( [
         cos(r/2.0), x*(sin(r/2.0)), y*(sin(r/2.0)), z*(sin(r/2.0)),
     ]) )
+def xyzrToQuaternions( rotations ):
+    """Convert (N,4) VRML-style rotations to (N,4) quaternion array
+
+    rotations -- (N,4) array of x,y,z axis and angle in radians,
+        axes are normalised (0-length axes produce null rotations)
+
+    returns (N,4) double array of (w,x,y,z) quaternions
+    """
+    rotations = asarray( rotations, 'd' ).reshape( (-1,4) )
+    axes = rotations[:,:3]
+    lengths = sqrt( einsum( 'ij,ij->i', axes, axes ) )
+    half = rotations[:,3] / 2.0
+    scale = sin( half ) / where( lengths, lengths, 1.0 )
+    result = empty( (len(rotations),4), 'd' )
+    result[:,0] = cos( half )
+    result[:,1:] = axes * scale[:,newaxis]
+    result[lengths == 0] = (1,0,0,0)
+    return result
+
+def quaternionsToXYZR( quaternions ):
+    """Convert (N,4) (unit) quaternion array to (N,4) VRML-style rotations
+
+    Vectorized equivalent of Quaternion.XYZR, null rotations
+    are reported as (0,1,0,0)
+
+    returns (N,4) double array of x,y,z axis and angle in radians
+    """
+    quaternions = asarray( quaternions, 'd' ).reshape( (-1,4) )
+    w = clip( quaternions[:,0], -1.0, 1.0 )
+    scale = sqrt( 1.0 - w*w )
+    null = scale < 1e-12
+    result = empty( (len(quaternions),4), 'd' )
+    result[:,:3] = quaternions[:,1:] / where( null, 1.0, scale )[:,newaxis]
+    result[:,3] = 2 * arccos( w )
+    result[null] = (0,1,0,0)
+    return result
+
+def matricesToQuaternions( matrices ):
+    """Convert (N,3,3) or (N,4,4) rotation matrices to (N,4) quaternion array
+
+    matrices -- rotation matrices in the same layout as
+        Quaternion.matrix (and transformmatrix.rotation_matrix),
+        only the upper 3x3 is used
+
+    Uses the largest of the trace and diagonal elements for each
+    matrix to avoid precision loss.  Results are normalised and
+    have non-negative w.
+
+    returns (N,4) double array of (w,x,y,z) quaternions
+    """
+    matrices = asarray( matrices, 'd' )
+    size = matrices.shape[-1]
+    m = matrices.reshape( (-1,size,size) )
+    m00,m11,m22 = m[:,0,0],m[:,1,1],m[:,2,2]
+    trace = m00 + m11 + m22
+    result = empty( (len(m),4), 'd' )
+    # differences/sums of off-diagonal elements
+    wx = m[:,1,2] - m[:,2,1]
+    wy = m[:,2,0] - m[:,0,2]
+    wz = m[:,0,1] - m[:,1,0]
+    xy = m[:,0,1] + m[:,1,0]
+    xz = m[:,0,2] + m[:,2,0]
+    yz = m[:,1,2] + m[:,2,1]
+    choice = array( [trace, m00, m11, m22] ).argmax( 0 )
+    for index,(diagonal,others) in enumerate([
+        (1+trace, (0,(wx,1),(wy,2),(wz,3))),
+        (1+m00-m11-m22, (1,(wx,0),(xy,2),(xz,3))),
+        (1-m00+m11-m22, (2,(wy,0),(xy,1),(yz,3))),
+        (1-m00-m11+m22, (3,(wz,0),(xz,1),(yz,2))),
+    ]):
+        selected = choice == index
+        if not selected.any():
+            continue
+        root = sqrt( diagonal[selected] )
+        target,rest = others[0],others[1:]
+        result[selected,target] = root / 2.0
+        for values,component in rest:
+            result[selected,component] = values[selected] / (2.0*root)
+    result /= sqrt( einsum( 'ij,ij->i', result, result ) )[:,newaxis]
+    result[result[:,0] < 0] *= -1
+    return result
+
+def multiplyQuaternions( first, second, out=None ):
+    """Element-wise (Hamilton) product of (N,4) quaternion arrays
+
+    first, second -- (N,4) (or broadcastable (4,)) arrays of
+        (w,x,y,z) quaternions, as for Quaternion.__mul__ the
+        second rotation takes place within the coordinate space
+        defined by the first
+    out -- optional (N,4) array for the result, must not
+        overlap the inputs
+
+    returns (N,4) array of products (not re-normalised)
+    """
+    first = asarray( first, 'd' )
+    second = asarray( second, 'd' )
+    if out is None:
+        out = empty( broadcast_shapes( first.shape, second.shape ), 'd' )
+    w1,x1,y1,z1 = first[...,0],first[...,1],first[...,2],first[...,3]
+    w2,x2,y2,z2 = second[...,0],second[...,1],second[...,2],second[...,3]
+    out[...,0] = w1*w2 - x1*x2 - y1*y2 - z1*z2
+    out[...,1] = w1*x2 + x1*w2 + y1*z2 - z1*y2
+    out[...,2] = w1*y2 + y1*w2 + z1*x2 - x1*z2
+    out[...,3] = w1*z2 + z1*w2 + x1*y2 - y1*x2
+    return out
+
+def quaternionsToMatrices( quaternions, dtype='f', inverse=False ):
+    """Convert (N,4) unit quaternions to (N,4,4) rotation matrices
+
+    Vectorized equivalent of Quaternion.matrix, dtype and
+    inverse have the same meaning.
+    """
+    quaternions = asarray( quaternions, 'd' ).reshape( (-1,4) )
+    w,x,y,z = quaternions.T
+    if inverse:
+        x,y,z = -x,-y,-z
+    result = zeros( (len(quaternions),4,4), dtype )
+    result[:,0,0] = 1-2*y*y-2*z*z
+    result[:,0,1] = 2*x*y+2*w*z
+    result[:,0,2] = 2*x*z-2*w*y
+    result[:,1,0] = 2*x*y-2*w*z
+    result[:,1,1] = 1-2*x*x-2*z*z
+    result[:,1,2] = 2*y*z+2*w*x
+    result[:,2,0] = 2*x*z+2*w*y
+    result[:,2,1] = 2*y*z-2*w*x
+    result[:,2,2] = 1-2*x*x-2*y*y
+    result[:,3,3] = 1
+    return result
+
+def normaliseQuaternions( quaternions, out=None ):
+    """Normalise (N,4) quaternion array (0-length records left unchanged)"""
+    quaternions = asarray( quaternions, 'd' )
+    lengths = sqrt( einsum( '...i,...i->...', quaternions, quaternions ) )
+    lengths = where( lengths, lengths, 1.0 )
+    return divide( quaternions, lengths[...,newaxis], out=out )
+
+def slerpQuaternions( first, second, fractions, minimalStep=0.0001 ):
+    """Spherical linear interpolation between (N,4) quaternion arrays
+
+    first, second -- (N,4) (or broadcastable) unit quaternion arrays
+    fractions -- (N,) (or broadcastable) fractions of the way
+        from first to second
+    minimalStep -- as for Quaternion.slerp, when 1-cos(angle) is
+        at or below this value linear interpolation is used
+
+    Vectorized equivalent of Quaternion.slerp (including taking
+    the shorter path by negating second when the dot product is
+    negative), results are normalised.
+
+    returns (N,4) double array
+    """
+    first = asarray( first, 'd' )
+    second = asarray( second, 'd' )
+    fractions = asarray( fractions, 'd' )
+    cosValue = einsum( '...i,...i->...', first, second )
+    negative = cosValue < 0.0
+    cosValue = where( negative, -cosValue, cosValue )
+    sign = where( negative, -1.0, 1.0 )
+    linear = (1.0 - cosValue) <= minimalStep
+    angle = arccos( clip( cosValue, -1.0, 1.0 ) )
+    angleSin = sin( angle )
+    angleSin = where( linear, 1.0, angleSin )
+    sourceScale = where( linear, 1.0-fractions, sin( (1.0-fractions) * angle ) / angleSin )
+    targetScale = where( linear, fractions, sin( fractions * angle ) / angleSin ) * sign
+    result = first * sourceScale[...,newaxis]
+    result += second * targetScale[...,newaxis]
+    return normaliseQuaternions( result, out=result )
+
+_BASIS = identity( 3, 'd' )
+
+def rotateVectors( quaternions, vectors, out=None, scratch=None ):
+    """Rotate (N,3) vectors by unit quaternion(s) without building matrices
+
+    quaternions -- a Quaternion or (4,) (w,x,y,z) unit quaternion
+        applied to every vector, or an (N,4) array of unit
+        quaternions paired element-wise with the vectors
+    vectors -- (N,3) array of vectors (or points)
+    out -- optional (N,3) array for the result, may be vectors
+        for in-place rotation
+    scratch -- optional scratch dictionary for temporaries
+
+    Computes q*v*q^-1 directly as v + w*t + u x t, where u is the
+    vector part of q and t = 2*(u x v), giving the same result as
+    rotating by Quaternion.matrix without allocating the matrices.
+    The floating-point dtype of vectors is preserved (quaternions
+    are cast to it), see vectorutilities for the out/scratch contract.
+    A single quaternion is applied to many vectors by rotating the
+    three basis vectors this way and taking a (3,3) dot product.
+
+    returns (N,3) array of rotated vectors
+    """
+    quaternions = getattr( quaternions, 'internal', quaternions )
+    dtype = vectorutilities._fformat( vectors )
+    vectors = asarray( vectors, dtype ).reshape( (-1,3) )
+    quaternions = asarray( quaternions ).reshape( (-1,4) )
+    if quaternions.dtype != dtype:
+        source = quaternions
+        quaternions = scratch_array(
+            scratch, 'rotateVectors.quaternions', source.shape, dtype,
+        )
+        quaternions[:] = source
+    if len(quaternions) == 1 and len(vectors) > 3:
+        # rotate the basis vectors directly, then apply them to all
+        # vectors with a single (3,3) dot product
+        basis = rotateVectors( quaternions, _BASIS.astype( dtype ) )
+        if out is None:
+            return dot( vectors, basis )
+        if may_share_memory( out, vectors ):
+            out[:] = dot( vectors, basis )
+            return out
+        return dot( vectors, basis, out=out )
+    count = max( len(quaternions), len(vectors) )
+    w,u = quaternions[:,:1],quaternions[:,1:]
+    temporary = scratch_array( scratch, 'rotateVectors.temporary', (count,), dtype )
+    twice = vectorutilities._cross(
+        u, vectors, scratch_array( scratch, 'rotateVectors.t', (count,3), dtype ), temporary,
+    )
+    twice *= 2
+    second = vectorutilities._cross(
+        u, twice, scratch_array( scratch, 'rotateVectors.c', (count,3), dtype ), temporary,
+    )
+    multiply( twice, w, out=twice )
+    twice += second
+    if out is None:
+        out = empty( (count,3), dtype )
+    return add( vectors, twice, out=out )
+
+EULER_ORDERS = (
+    'xyz','xzy','yxz','yzx','zxy','zyx',
+    'xyx','xzx','yxy','yzy','zxz','zyz',
+)
+
+def _eulerAxes( order ):
+    """Convert an EULER_ORDERS string to a tuple of axis indices (0,1,2)"""
+    if order not in EULER_ORDERS:
+        raise ValueError( "Unknown Euler axis order %r, expected one of %s"%(
+            order, ", ".join( EULER_ORDERS ),
+        ))
+    return tuple([ 'xyz'.index( axis ) for axis in order ])
+
+def eulerToQuaternions( angles, order='xyz' ):
+    """Convert (N,3) Euler angles to (N,4) quaternion array
+
+    angles -- (N,3) array of angles in radians, angles[:,i] is
+        the rotation about axis order[i]
+    order -- one of EULER_ORDERS, rotations are intrinsic, that
+        is, each takes place within the coordinate space defined
+        by the preceding rotations, so that for 'xyz' the result
+        matches fromEuler
+
+    returns (N,4) double array of (w,x,y,z) quaternions
+    """
+    axes = _eulerAxes( order )
+    angles = asarray( angles, 'd' ).reshape( (-1,3) )
+    half = angles / 2.0
+    cosines,sines = cos( half ),sin( half )
+    result = None
+    for index,axis in enumerate( axes ):
+        current = zeros( (len(angles),4), 'd' )
+        current[:,0] = cosines[:,index]
+        current[:,1+axis] = sines[:,index]
+        if result is None:
+            result = current
+        else:
+            result = multiplyQuaternions( result, current )
+    return result
+
+def quaternionsToEuler( quaternions, order='xyz', tolerance=1e-7 ):
+    """Convert (N,4) (unit) quaternion array to (N,3) Euler angles
+
+    order -- one of EULER_ORDERS, see eulerToQuaternions
+    tolerance -- distance (radians) of the middle angle from its
+        singular values (0 or pi for proper Euler orders such as
+        'zxz', +/- pi/2 for Tait-Bryan orders such as 'xyz')
+        within which the rotation is treated as gimbal-locked,
+        in which case the third angle is reported as 0
+
+    Closed-form method of Bernardes and Viollet (2022), angles
+    are in the range [-pi,pi], the middle angle is in [0,pi]
+    for proper Euler orders and [-pi/2,pi/2] for Tait-Bryan.
+
+    returns (N,3) double array, angles[:,i] about axis order[i]
+    """
+    # the method is defined for extrinsic sequences, an intrinsic
+    # sequence is the extrinsic sequence with axes (and angles) reversed
+    i,j,k = _eulerAxes( order )[::-1]
+    proper = i == k
+    if proper:
+        k = 3 - i - j
+    sign = (i-j)*(j-k)*(k-i)//2
+    quaternions = asarray( quaternions, 'd' ).reshape( (-1,4) )
+    w = quaternions[:,0]
+    qi,qj,qk = quaternions[:,1+i],quaternions[:,1+j],quaternions[:,1+k]*sign
+    if proper:
+        a,b,c,d = w,qi,qj,qk
+    else:
+        a,b,c,d = w - qj, qi + qk, qj + w, qk - qi
+    result = empty( (len(quaternions),3), 'd' )
+    middle = result[:,1]
+    middle[:] = 2 * arctan2( hypot( c, d ), hypot( a, b ) )
+    halfSum = arctan2( b, a )
+    halfDiff = arctan2( d, c )
+    first,third = result[:,0],result[:,2]
+    first[:] = halfSum + halfDiff
+    third[:] = halfSum - halfDiff
+    # gimbal lock, the whole rotation is reported by the first angle
+    low = absolute( middle ) <= tolerance
+    high = absolute( middle - pi ) <= tolerance
+    third[low | high] = 0.0
+    first[low] = 2 * halfSum[low]
+    first[high] = 2 * halfDiff[high]
+    if not proper:
+        first *= sign
+        middle -= pi / 2
+    result[result < -pi] += 2*pi
+    result[result > pi] -= 2*pi
+    return result
+
+def eulerToMatrices( angles, order='xyz', dtype='f', inverse=False, size=4 ):
+    """Convert (N,3) Euler angles to (N,size,size) rotation matrices
+
+    size -- 4 for (N,4,4) transformmatrix-style matrices, 3 for
+        (N,3,3) rotation-only matrices
+
+    See eulerToQuaternions and quaternionsToMatrices
+    """
+    if size not in (3,4):
+        raise ValueError( "Matrix size must be 3 or 4, got %r"%( size, ))
+    matrices = quaternionsToMatrices(
+        eulerToQuaternions( angles, order ), dtype=dtype, inverse=inverse,
+    )
+    if size == 3:
+        matrices = ascontiguousarray( matrices[:,:3,:3] )
+    return matrices
+
+def matricesToEuler( matrices, order='xyz', tolerance=1e-7 ):
+    """Convert (N,3,3) or (N,4,4) rotation matrices to (N,3) Euler angles
+
+    See matricesToQuaternions and quaternionsToEuler
+    """
+    return quaternionsToEuler(
+        matricesToQuaternions( matrices ), order, tolerance=tolerance,
+    )
+
+def eulerToXYZR( angles, order='xyz' ):
+    """Convert (N,3) Euler angles to (N,4) VRML-style rotations
+
+    See eulerToQuaternions and quaternionsToXYZR
+    """
+    return quaternionsToXYZR( eulerToQuaternions( angles, order ) )
+
+def xyzrToEuler( rotations, order='xyz', tolerance=1e-7 ):
+    """Convert (N,4) VRML-style rotations to (N,3) Euler angles
+
+    See xyzrToQuaternions and quaternionsToEuler
+    """
+    return quaternionsToEuler(
+        xyzrToQuaternions( rotations ), order, tolerance=tolerance,
+    )
+
 def fromEuler( x=0,y=0,z=0 ):
     """Create a new quaternion from a 3-element euler-angle
     rotation about x, then y, then z
+
+    See eulerToQuaternions for arrays of angles and other orders
     """
     if x:
         base = fromXYZR( 1,0,0,x)
@@ -39,20 +408,46 @@ def fromEuler( x=0,y=0,z=0 ):
 
 class Quaternion(object):
     """Quaternion object implementing those methods required
-    to be useful for OpenGL rendering (and not many others)"""
-    __slots__ = ('internal','__weakref__')
+    to be useful for OpenGL rendering (and not many others)
+
+    The in-place operations (imul, islerp, normaliseInPlace and
+    conjugateInPlace) update internal without allocating, so that
+    update loops can hold a single instance per rotation.  As
+    repeated products drift from unit length, imul and islerp
+    renormalise every renormaliseInterval operations (set to
+    None to disable, and call normaliseInPlace as required).
+    """
+    __slots__ = ('internal','steps','__weakref__')
+    renormaliseInterval = 32
     def __init__ (self, elements = [1,0,0,0] ):
         """The initializer is a four-element array,
         
         w, x,y,z -- all elements should be doubles/floats
         the default values are those for a unit multiplication
         quaternion.
+
+        elements is always copied, as the in-place operations
+        modify internal (see trusted for a no-copy constructor).
         """
-        elements = asarray( elements, 'd')
+        elements = array( elements, 'd')
         length = sqrt( sum( elements * elements))
         if length != 1:
-            elements = elements/length
+            elements /= length
         self.internal = elements
+        self.steps = 0
+    @classmethod
+    def trusted( cls, elements ):
+        """Construct from known unit-length (4,) double w,x,y,z elements
+
+        Skips the normalisation of the initializer, elements is
+        used directly (not copied) when it is already a double array,
+        so the in-place operations will modify it.  This is the only
+        constructor which shares the caller's array.
+        """
+        self = cls.__new__( cls )
+        self.internal = asarray( elements, 'd' )
+        self.steps = 0
+        return self
     def __mul__( self, other ):
         """Multiply this quaternion by another quaternion,
         generating a new quaternion which is the combination of the
@@ -62,9 +457,12 @@ class Quaternion(object):
         space defined by this quaternion.
 
         Alternately, if "other" is a matrix, return the dot-product
-        of that matrix with our matrix (i.e. rotate the coordinate)
+        of that matrix with our matrix (i.e. rotate the coordinate),
+        (N,3) vectors are rotated directly with rotateVectors
         """
-        if hasattr( other, 'internal' ):
+        if isinstance( other, QuaternionArray ):
+            return QuaternionArray( self.internal[newaxis], normalise=False ) * other
+        elif hasattr( other, 'internal' ):
             w1,x1,y1,z1 = self.internal
             w2,x2,y2,z2 = other.internal
             
@@ -73,8 +471,10 @@ class Quaternion(object):
             y = w1*y2 + y1*w2 + z1*x2 - x1*z2
             z = w1*z2 + z1*w2 + x1*y2 - y1*x2
             return self.__class__( array([w,x,y,z],'d'))
-        else:
-            return dot( other, self.matrix() )
+        other = asarray( other )
+        if other.shape[-1:] == (3,):
+            return rotateVectors( self.internal, other ).reshape( other.shape )
+        return dot( other, self.matrix() )
     def XYZR( self ):
         """Get a VRML-style axis plus rotation form of the rotation.
         Note that this is in radians, not degrees, and that the angle
@@ -98,6 +498,34 @@ class Quaternion(object):
         """
         w,x,y,z = self.internal 
         return self.__class__( array((w,-x,-y,-z),'d'))
+    def imul( self, other ):
+        """In-place equivalent of self = self * other, returns self"""
+        w1,x1,y1,z1 = self.internal.tolist()
+        w2,x2,y2,z2 = other.internal.tolist()
+        internal = self.internal
+        internal[0] = w1*w2 - x1*x2 - y1*y2 - z1*z2
+        internal[1] = w1*x2 + x1*w2 + y1*z2 - z1*y2
+        internal[2] = w1*y2 + y1*w2 + z1*x2 - x1*z2
+        internal[3] = w1*z2 + z1*w2 + x1*y2 - y1*x2
+        return self._step()
+    def _step( self ):
+        """Count an in-place operation, renormalising per renormaliseInterval"""
+        self.steps += 1
+        if self.renormaliseInterval and self.steps >= self.renormaliseInterval:
+            self.normaliseInPlace()
+        return self
+    def normaliseInPlace( self ):
+        """Rescale internal to unit length (unless 0-length), returns self"""
+        w,x,y,z = self.internal.tolist()
+        length = (w*w + x*x + y*y + z*z) ** .5
+        if length and length != 1.0:
+            self.internal /= length
+        self.steps = 0
+        return self
+    def conjugateInPlace( self ):
+        """In-place equivalent of self = self.inverse() (without renormalising), returns self"""
+        self.internal[1:] *= -1
+        return self
     def matrix( self, dtype='f',inverse=False ):
         """Get a rotation matrix representing this rotation
         
@@ -163,3 +591,115 @@ class Quaternion(object):
             sourceScale = 1.0-fraction
             targetScale = fraction
         return self.__class__( (sourceScale * self.internal)+(targetScale * target) )
+    def islerp( self, other, fraction = 0, minimalStep= 0.0001):
+        """In-place equivalent of self = self.slerp( other, fraction ), returns self"""
+        fraction = float( fraction )
+        w1,x1,y1,z1 = self.internal.tolist()
+        w2,x2,y2,z2 = other.internal.tolist()
+        cosValue = w1*w2 + x1*x2 + y1*y2 + z1*z2
+        sign = 1.0
+        if cosValue < 0.0:
+            cosValue = -cosValue
+            sign = -1.0
+        if (1.0- cosValue) > minimalStep:
+            angle = math.acos( min( cosValue, 1.0 ) )
+            angleSin = math.sin( angle )
+            sourceScale = math.sin( (1.0- fraction) * angle ) / angleSin
+            targetScale = math.sin( fraction * angle ) / angleSin
+        else:
+            sourceScale = 1.0-fraction
+            targetScale = fraction
+        targetScale *= sign
+        internal = self.internal
+        internal[0] = sourceScale*w1 + targetScale*w2
+        internal[1] = sourceScale*x1 + targetScale*x2
+        internal[2] = sourceScale*y1 + targetScale*y2
+        internal[3] = sourceScale*z1 + targetScale*z2
+        if (1.0- cosValue) <= minimalStep:
+            # the linear fallback is not unit length, as for slerp
+            return self.normaliseInPlace()
+        return self._step()
+
+class QuaternionArray(object):
+    """Vectorized container for (N,4) arrays of (w,x,y,z) quaternions
+
+    Provides the Quaternion operations (multiplication, inverse,
+    XYZR and matrix conversion) for all N quaternions at once,
+    indexing with an integer (or iterating) returns a Quaternion
+    holding a copy of the row (so its in-place operations do not
+    modify the array), while slices, index arrays and masks return
+    QuaternionArray instances.
+    """
+    __slots__ = ('internal','__weakref__')
+    def __init__( self, elements=((1,0,0,0),), normalise=True ):
+        """Initialise from an (N,4) array of w,x,y,z elements
+
+        normalise -- if True (default) normalise each quaternion,
+            pass False for data which is known to be unit length
+        """
+        elements = ascontiguousarray( asarray( elements, 'd' ).reshape( (-1,4) ) )
+        if normalise:
+            elements = normaliseQuaternions( elements )
+        self.internal = elements
+    @classmethod
+    def fromXYZR( cls, rotations ):
+        """Create from (N,4) VRML-style (x,y,z,radians) rotations"""
+        return cls( xyzrToQuaternions( rotations ), normalise=False )
+    @classmethod
+    def fromMatrices( cls, matrices ):
+        """Create from (N,3,3) or (N,4,4) rotation matrices"""
+        return cls( matricesToQuaternions( matrices ), normalise=False )
+    @classmethod
+    def fromQuaternions( cls, quaternions ):
+        """Create from a sequence of Quaternion instances"""
+        return cls( [q.internal for q in quaternions], normalise=False )
+    def __len__( self ):
+        return len( self.internal )
+    def __iter__( self ):
+        for element in self.internal:
+            yield Quaternion.trusted( element.copy() )
+    def __getitem__( self, index ):
+        if isinstance( index, (int,integer) ):
+            return Quaternion.trusted( self.internal[index].copy() )
+        return self.__class__( self.internal[index], normalise=False )
+    def __setitem__( self, index, value ):
+        if isinstance( value, (Quaternion,QuaternionArray) ):
+            value = value.internal
+        self.internal[index] = value
+    def __mul__( self, other ):
+        """Multiply element-wise by another QuaternionArray or Quaternion
+
+        Either side may have a single element, which is broadcast.
+
+        Alternately, if "other" is an (N,3) or (N,4) array of
+        vectors, return each vector rotated by the corresponding
+        quaternion (as for Quaternion.__mul__)
+        """
+        if hasattr( other, 'internal' ):
+            return self.__class__(
+                multiplyQuaternions( self.internal, other.internal ),
+            )
+        other = asarray( other )
+        size = other.shape[-1]
+        if size == 3 and other.ndim <= 2:
+            return rotateVectors( self.internal, other ).reshape(
+                broadcast_shapes( other.shape, (len(self),3) ),
+            )
+        matrices = self.matrix( dtype=other.dtype )[:,:size,:size]
+        return matmul( other[...,newaxis,:], matrices )[...,0,:]
+    def __repr__( self ):
+        return """<%s of %s>"""%( self.__class__.__name__, len(self) )
+    def XYZR( self ):
+        """Get (N,4) VRML-style axis plus rotation (radians, angle last) array"""
+        return quaternionsToXYZR( self.internal )
+    def inverse( self ):
+        """Construct the inverse of each (unit) quaternion (the conjugate)"""
+        result = self.internal.copy()
+        result[:,1:] *= -1
+        return self.__class__( result, normalise=False )
+    def normalise( self ):
+        """Return a re-normalised copy (e.g. after accumulated multiplications)"""
+        return self.__class__( self.internal, normalise=True )
+    def matrix( self, dtype='f', inverse=False ):
+        """Get (N,4,4) stack of rotation matrices (see Quaternion.matrix)"""
+        return quaternionsToMatrices( self.internal, dtype=dtype, inverse=inverse )
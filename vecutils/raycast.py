@@ -0,0 +1,151 @@
+"""Batched ray/triangle intersection (Moller-Trumbore)
+
+Triangles are given either in the triangleutilities (triangle
+soup) layout, as for basisVectors, or as (V,3) vertices plus
+(F,3) indices.  Rays are (R,3) origins and directions, the hit
+point being origin + t*direction (t is a distance only for unit
+directions).
+
+With cull=True only front faces are hit, a face being front-facing
+when the ray travels against its normal, that is, for ccw=1 the
+face is counter-clockwise when viewed from the ray origin, matching
+the normals of triangleutilities.normalPerFace( ccw=ccw ).
+
+raycast tests every ray against every triangle, in chunks of
+at most chunkSize ray/triangle pairs so memory stays bounded,
+raycast_bvh tests only the candidates found by a bvh.TriangleBVH.
+"""
+from .arrays import (
+    asarray, zeros, full, arange, cross, einsum, absolute, argmin,
+    where, inf, intp, newaxis, take, lexsort, flatnonzero, concatenate,
+    broadcast_to, stack,
+)
+from . import triangleutilities
+from .vectorutilities import _fformat
+
+CHUNK_SIZE = 1<<18
+
+def _triangles( vertices, indices=None ):
+    """Get (F,3) first vertices and first/second edges (double precision)"""
+    if indices is None:
+        vertices = asarray( vertices, _fformat(vertices) ).reshape( (-1,3) )
+        indices = arange( len(vertices) - len(vertices)%3 )
+    vertices, indices = triangleutilities._indexed( vertices, indices )
+    corners = take( asarray( vertices[:,:3], 'd' ), indices, axis=0 )
+    first = corners[:,0]
+    return first, corners[:,1] - first, corners[:,2] - first
+
+def intersect( origins, directions, first, edge1, edge2, cull=False, ccw=1, epsilon=1e-12 ):
+    """Moller-Trumbore intersection of rays with triangles (broadcasting)
+
+    origins, directions -- (...,3) ray origins and directions
+    first, edge1, edge2 -- (...,3) first vertex of each triangle
+        and the edges from it to the second and third vertices
+    cull -- if True, back faces (see module) are not hit
+    ccw -- whether triangles use counter-clockwise winding
+    epsilon -- rays with |determinant| below this are treated as
+        parallel to the triangle (a miss)
+
+    returns (t, u, v) arrays with the broadcast shape, t being inf
+    for misses, and (u,v) the barycentric weights of the second
+    and third vertices
+    """
+    pvec = cross( directions, edge2 )
+    determinant = einsum( '...i,...i->...', edge1, pvec )
+    if cull:
+        valid = (determinant > epsilon) if ccw else (determinant < -epsilon)
+    else:
+        valid = absolute( determinant ) > epsilon
+    inverse = 1.0 / where( valid, determinant, 1.0 )
+    tvec = origins - first
+    u = einsum( '...i,...i->...', tvec, pvec ) * inverse
+    qvec = cross( tvec, edge1 )
+    v = einsum( '...i,...i->...', directions, qvec ) * inverse
+    t = einsum( '...i,...i->...', edge2, qvec ) * inverse
+    valid &= (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return where( valid, t, inf ), u, v
+
+def _results( count ):
+    return full( (count,), inf ), full( (count,), -1, intp ), zeros( (count,3) )
+
+def _barycentrics( u, v ):
+    return stack( (1.0 - u - v, u, v), 1 )
+
+def raycast(
+        origins, directions, vertices, indices=None, cull=False, ccw=1,
+        tmax=inf, chunkSize=CHUNK_SIZE,
+    ):
+    """Find the nearest triangle hit by each ray (brute force, chunked)
+
+    origins, directions -- (R,3) rays
+    vertices, indices -- triangle soup, or (V,3) vertices and
+        (F,3) indices (see module)
+    cull, ccw -- backface culling, see intersect
+    tmax -- (R,) (or single) maximum ray parameter
+    chunkSize -- maximum ray/triangle pairs tested at once
+
+    returns (t, triangles, barycentrics), (R,) nearest ray parameters
+    (inf for misses), (R,) triangle indices (-1 for misses) and (R,3)
+    barycentric weights of the triangle's vertices at the hit
+    """
+    first, edge1, edge2 = _triangles( vertices, indices )
+    origins = asarray( origins, 'd' ).reshape( (-1,3) )
+    directions = asarray( directions, 'd' ).reshape( (-1,3) )
+    limits = broadcast_to( asarray( tmax, 'd' ), (len(origins),) )
+    best, triangles, barycentrics = _results( len(origins) )
+    triangleChunk = max( 1, min( len(first), chunkSize ) )
+    rayChunk = max( 1, chunkSize // triangleChunk )
+    for rayStart in range( 0, len(origins), rayChunk ):
+        rays = slice( rayStart, rayStart + rayChunk )
+        rayOrigins = origins[rays,newaxis]
+        rayDirections = directions[rays,newaxis]
+        for start in range( 0, len(first), triangleChunk ):
+            faces = slice( start, start + triangleChunk )
+            t, u, v = intersect(
+                rayOrigins, rayDirections, first[faces], edge1[faces], edge2[faces],
+                cull=cull, ccw=ccw,
+            )
+            nearest = argmin( t, 1 )
+            selected = arange( len(t) )
+            t, u, v = t[selected,nearest], u[selected,nearest], v[selected,nearest]
+            closer = flatnonzero( (t < best[rays]) & (t <= limits[rays]) )
+            target = closer + rayStart
+            best[target] = t[closer]
+            triangles[target] = nearest[closer] + start
+            barycentrics[target] = _barycentrics( u[closer], v[closer] )
+    return best, triangles, barycentrics
+
+def raycast_bvh( tree, origins, directions, cull=False, ccw=1, tmax=inf, chunkSize=CHUNK_SIZE ):
+    """Find the nearest triangle hit by each ray using a bvh.TriangleBVH
+
+    Only the ray/triangle pairs whose bounding boxes intersect
+    (see TriangleBVH.query_rays) are tested, in chunks of at most
+    chunkSize pairs.  Arguments and results are as for raycast.
+    """
+    origins = asarray( origins, 'd' ).reshape( (-1,3) )
+    directions = asarray( directions, 'd' ).reshape( (-1,3) )
+    limits = broadcast_to( asarray( tmax, 'd' ), (len(origins),) )
+    first, edge1, edge2 = _triangles( tree.vertices, tree.indices )
+    queries, candidates = tree.query_rays( origins, directions, limits )
+    hits = []
+    for start in range( 0, len(queries), chunkSize ):
+        rays = queries[start:start+chunkSize]
+        faces = candidates[start:start+chunkSize]
+        t, u, v = intersect(
+            origins[rays], directions[rays], first[faces], edge1[faces], edge2[faces],
+            cull=cull, ccw=ccw,
+        )
+        found = flatnonzero( (t < inf) & (t <= limits[rays]) )
+        hits.append( (rays[found],faces[found],t[found],u[found],v[found]) )
+    best, triangles, barycentrics = _results( len(origins) )
+    if hits:
+        rays, faces, t, u, v = [concatenate( values ) for values in zip( *hits )]
+        # nearest hit is the first of each ray's hits sorted by t
+        order = lexsort( (t, rays) )
+        sortedRays = rays[order]
+        firsts = order[flatnonzero( sortedRays != concatenate( ([-1],sortedRays[:-1]) ) )]
+        target = rays[firsts]
+        best[target] = t[firsts]
+        triangles[target] = faces[firsts]
+        barycentrics[target] = _barycentrics( u[firsts], v[firsts] )
+    return best, triangles, barycentrics
@@ -0,0 +1,245 @@
+"""Batched linear-blend and dual-quaternion skinning
+
+Vertices are bound to up to K bones each with (V,K) bone index
+and weight arrays (weights for a vertex should sum to 1, unused
+slots may use any valid index with weight 0).  Bone transforms
+are supplied either as (B,4,4) matrices in the transformmatrix
+row-vector convention (the skinned point is dot( point, matrix ),
+normally dot( inverseBindMatrix, boneWorldMatrix )) or as (B,8)
+dual quaternions (see matrices_to_dual_quaternions).
+
+Each pass loops over the K influences (not over bones or
+vertices), blending the transforms for all vertices at once.
+Results use the data-type of the rest positions and follow the
+out/scratch contract of vectorutilities, a Skinner holds the
+output buffers and scratch arrays for a mesh so that per-frame
+skinning allocates nothing, and optionally splits the vertices
+across the shared parallel pool (numpy releases the GIL for the
+bulk operations).
+"""
+from .arrays import (
+    asarray, zeros, empty, einsum, take, multiply, copysign, sqrt,
+    maximum, finfo, newaxis, concatenate, intp, scratch_array,
+    asfortranarray,
+)
+from . import parallel, quaternion, vectorutilities
+
+def _bindings( positions, indices, weights ):
+    """Coerce rest positions, bone indices and weights to matching arrays"""
+    dtype = vectorutilities._fformat( positions )
+    positions = asarray( positions, dtype ).reshape( (-1,3) )
+    indices = asarray( indices, intp ).reshape( (len(positions),-1) )
+    weights = asarray( weights, dtype ).reshape( indices.shape )
+    return positions, indices, weights
+
+def _check_indices( indices, bones ):
+    """Raise ValueError unless all indices are valid for bones bones
+
+    The gathers use take( mode='clip' ) (which avoids a copy of
+    the out buffer), so out-of-range indices must be rejected
+    here rather than being silently clamped.
+    """
+    if indices.size and (indices.min() < 0 or indices.max() >= bones):
+        raise ValueError( "Bone index out of range for %s bones: %s"%(
+            bones, indices.min() if indices.min() < 0 else indices.max(),
+        ))
+
+def linear_blend_skinning(
+        matrices, indices, weights, positions, normals=None,
+        out=None, normalsOut=None, scratch=None,
+    ):
+    """Deform vertices by the weighted sum of their bone matrices
+
+    matrices -- (B,4,4) bone skinning matrices
+    indices -- (V,K) bone index for each influence
+    weights -- (V,K) weight for each influence
+    positions -- (V,3) rest positions
+    normals -- optional (V,3) rest normals, transformed by the
+        blended upper 3x3 and renormalised
+    out, normalsOut -- optional (V,3) arrays for the results,
+        must not overlap positions/normals
+    scratch -- optional scratch dictionary for temporaries
+
+    Raises ValueError for bone indices outside matrices.
+
+    returns (positions, normals) with normals None if not provided
+    """
+    positions, indices, weights = _bindings( positions, indices, weights )
+    matrices = asarray( matrices, positions.dtype ).reshape( (-1,4,4) )
+    _check_indices( indices, len(matrices) )
+    return _linear_blend(
+        matrices, indices, weights, positions, normals, out, normalsOut, scratch,
+    )
+
+def _linear_blend( matrices, indices, weights, positions, normals, out, normalsOut, scratch ):
+    """linear_blend_skinning for validated bindings"""
+    dtype = positions.dtype
+    matrices = matrices[:,:,:3]
+    count = len(positions)
+    blended = scratch_array( scratch, 'skinning.blended', (count,4,3), dtype )
+    term = scratch_array( scratch, 'skinning.term', (count,4,3), dtype )
+    for influence in range( indices.shape[1] ):
+        target = blended if influence == 0 else term
+        take( matrices, indices[:,influence], axis=0, out=target, mode='clip' )
+        target *= weights[:,influence,newaxis,newaxis]
+        if influence:
+            blended += term
+    out = einsum( 'vi,vij->vj', positions, blended[:,:3], out=out )
+    out += blended[:,3]
+    if normals is not None:
+        normals = asarray( normals, dtype ).reshape( (-1,3) )
+        normalsOut = einsum( 'vi,vij->vj', normals, blended[:,:3], out=normalsOut )
+        vectorutilities.normalise( normalsOut, out=normalsOut, scratch=scratch )
+    return out, normalsOut
+
+def matrices_to_dual_quaternions( matrices ):
+    """Convert (B,4,4) rigid (rotation plus translation) matrices to (B,8) dual quaternions
+
+    matrices -- matrices in the transformmatrix convention, any
+        scale or shear is discarded
+
+    returns (B,8) double array of real (w,x,y,z) and dual
+    (w,x,y,z) parts, the dual part being 0.5 * translation * real
+    """
+    matrices = asarray( matrices, 'd' ).reshape( (-1,4,4) )
+    real = quaternion.matricesToQuaternions( matrices )
+    translations = zeros( (len(matrices),4), 'd' )
+    translations[:,1:] = matrices[:,3,:3]
+    dual = quaternion.multiplyQuaternions( translations, real )
+    dual *= .5
+    return concatenate( (real,dual), 1 )
+
+def dual_quaternion_skinning(
+        dualQuaternions, indices, weights, positions, normals=None,
+        out=None, normalsOut=None, scratch=None,
+    ):
+    """Deform vertices by the normalised blend of their bone dual quaternions
+
+    dualQuaternions -- (B,8) unit dual quaternions, see
+        matrices_to_dual_quaternions
+    indices, weights, positions, normals, out, normalsOut, scratch --
+        as for linear_blend_skinning, out (normalsOut) may be
+        positions (normals) for in-place deformation
+
+    Each influence is negated when its rotation lies in the
+    opposite hemisphere to the vertex's first influence, so that
+    blending takes the shortest path.  Only rigid transforms are
+    represented, avoiding the volume loss of linear blending.
+
+    Raises ValueError for bone indices outside dualQuaternions.
+
+    returns (positions, normals) with normals None if not provided
+    """
+    positions, indices, weights = _bindings( positions, indices, weights )
+    dualQuaternions = asarray( dualQuaternions, positions.dtype ).reshape( (-1,8) )
+    _check_indices( indices, len(dualQuaternions) )
+    return _dual_quaternion(
+        dualQuaternions, indices, weights, positions, normals, out, normalsOut, scratch,
+    )
+
+def _dual_quaternion( dualQuaternions, indices, weights, positions, normals, out, normalsOut, scratch ):
+    """dual_quaternion_skinning for validated bindings"""
+    dtype = positions.dtype
+    count = len(positions)
+    blended = scratch_array( scratch, 'skinning.dual', (count,8), dtype )
+    term = scratch_array( scratch, 'skinning.dualTerm', (count,8), dtype )
+    pivot = scratch_array( scratch, 'skinning.pivot', (count,4), dtype )
+    factors = scratch_array( scratch, 'skinning.factors', (count,), dtype )
+    take( dualQuaternions[:,:4], indices[:,0], axis=0, out=pivot, mode='clip' )
+    for influence in range( indices.shape[1] ):
+        target = blended if influence == 0 else term
+        take( dualQuaternions, indices[:,influence], axis=0, out=target, mode='clip' )
+        einsum( 'ij,ij->i', target[:,:4], pivot, out=factors )
+        copysign( weights[:,influence], factors, out=factors )
+        target *= factors[:,newaxis]
+        if influence:
+            blended += term
+    real, dual = blended[:,:4], blended[:,4:]
+    lengths = einsum( 'ij,ij->i', real, real, out=factors )
+    sqrt( lengths, out=lengths )
+    maximum( lengths, finfo( dtype ).tiny, out=lengths )
+    blended /= lengths[:,newaxis]
+    # translation is the vector part of 2 * dual * conjugate(real)
+    translations = scratch_array( scratch, 'skinning.translations', (count,3), dtype )
+    temporary = scratch_array( scratch, 'skinning.temporary', (count,3), dtype )
+    vectorutilities._cross( real[:,1:], dual[:,1:], translations, factors )
+    multiply( dual[:,1:], real[:,:1], out=temporary )
+    translations += temporary
+    multiply( real[:,1:], dual[:,:1], out=temporary )
+    translations -= temporary
+    translations *= 2
+    out = quaternion.rotateVectors( real, positions, out=out, scratch=scratch )
+    out += translations
+    if normals is not None:
+        normals = asarray( normals, dtype ).reshape( (-1,3) )
+        normalsOut = quaternion.rotateVectors( real, normals, out=normalsOut, scratch=scratch )
+    return out, normalsOut
+
+class Skinner(object):
+    """Reusable skinning state for a single mesh
+
+    indices, weights, positions, normals -- bindings and rest pose,
+        see linear_blend_skinning
+    positionsOut, normalsOut -- (V,3) output buffers, overwritten
+        (and returned) by each skin call
+    bones -- number of bones the indices require (maximum index + 1)
+    workers -- number of workers (see parallel) among which the
+        vertices are split, None for the global default
+    chunkSize -- vertices per chunk when running in parallel, None
+        to split the vertices evenly between the workers
+    scratch -- scratch dictionary (with per-worker entries)
+
+    The output buffers are reused between calls, copy the results
+    if they must persist across frames.
+    """
+    def __init__( self, indices, weights, positions, normals=None, workers=None, chunkSize=None ):
+        """Bind the mesh and allocate output buffers
+
+        workers -- if parallel.resolve gives more than 1 (None uses
+            the global setting at each skin call), vertices are split
+            into chunks which are skinned concurrently on the shared
+            parallel pool (meshes below parallel.THRESHOLD vertices
+            are skinned serially)
+        chunkSize -- vertices per chunk, defaults to splitting the
+            vertices evenly between the workers
+
+        Raises ValueError for negative bone indices.
+        """
+        self.positions, indices, weights = _bindings( positions, indices, weights )
+        if indices.size and indices.min() < 0:
+            raise ValueError( "Negative bone index: %s"%( indices.min(), ))
+        self.bones = int( indices.max() ) + 1 if indices.size else 0
+        # column-major so that each influence is a contiguous column
+        self.indices, self.weights = asfortranarray( indices ), asfortranarray( weights )
+        dtype = self.positions.dtype
+        self.normals = None if normals is None else asarray( normals, dtype ).reshape( (-1,3) )
+        count = len(self.positions)
+        self.positionsOut = empty( (count,3), dtype )
+        self.normalsOut = None if normals is None else empty( (count,3), dtype )
+        self.workers = workers
+        self.chunkSize = chunkSize
+        self.scratch = {}
+    def _skin( self, function, bones ):
+        if len(bones) < self.bones:
+            raise ValueError( "Require %s bones, got %s"%( self.bones, len(bones) ))
+        def run( start, stop ):
+            selected = slice( start, stop )
+            function(
+                bones, self.indices[selected], self.weights[selected],
+                self.positions[selected],
+                None if self.normals is None else self.normals[selected],
+                self.positionsOut[selected],
+                None if self.normals is None else self.normalsOut[selected],
+                parallel.thread_scratch( self.scratch ),
+            )
+        count = len(self.positions)
+        workers = parallel.resolve( self.workers, count )
+        chunkSize = self.chunkSize or -(-count // workers) or 1
+        parallel.run_chunked( run, count, workers, chunkSize )
+        return self.positionsOut, self.normalsOut
+    def skin_matrices( self, matrices ):
+        """Linear-blend skin with (B,4,4) bone matrices, returns (positions, normals)"""
+        return self._skin( _linear_blend, asarray( matrices, self.positions.dtype ).reshape( (-1,4,4) ) )
+    def skin_dual_quaternions( self, dualQuaternions ):
+        """Dual-quaternion skin with (B,8) dual quaternions, returns (positions, normals)"""
+        return self._skin( _dual_quaternion, asarray( dualQuaternions, self.positions.dtype ).reshape( (-1,8) ) )
@@ -0,0 +1,90 @@
+"""Out-of-core (chunked) versions of the triangleutilities functions
+
+For meshes too large to process in memory, the vertex data is
+read from a numpy.memmap (or any object supporting the buffer
+protocol, such as an mmap.mmap) and processed in triangle-aligned
+chunks, with each chunk's results written into the (normally
+memory-mapped) output.  Peak memory use is bounded by the chunk
+size (the temporaries of a single chunk are re-used for every
+chunk via a scratch dictionary) rather than the mesh size.
+
+    vertices = numpy.memmap( 'mesh.f32', dtype='f', mode='r' )
+    normals = streaming.create_output( 'normals.f32', (len(vertices)//9,3) )
+    streaming.normalPerFace( vertices, normals )
+"""
+from .arrays import (memmap, ndarray, frombuffer, empty, float32)
+from . import triangleutilities
+
+CHUNK_SIZE = 65536
+
+def as_vertices( source, dtype=float32, components=3 ):
+    """Get an (N,components) array view of source without copying
+
+    source -- ndarray (including numpy.memmap) or buffer-protocol
+        object, buffers are interpreted as packed dtype values
+    """
+    if not isinstance( source, ndarray ):
+        source = frombuffer( source, dtype )
+    return source.reshape( (-1,components) )
+
+def create_output( filename, shape, dtype=float32 ):
+    """Create a new writable memory-mapped array file for results"""
+    return memmap( filename, dtype=dtype, mode='w+', shape=shape )
+
+def chunks( count, chunkSize=CHUNK_SIZE ):
+    """Yield (start,stop) ranges covering count items in chunkSize blocks"""
+    for start in range( 0, count, chunkSize ):
+        yield start, min( start+chunkSize, count )
+
+def _finish( out ):
+    flush = getattr( out, 'flush', None )
+    if flush is not None:
+        flush()
+    return out
+
+def normalPerFace( vertices, out=None, ccw=1, chunkSize=CHUNK_SIZE, dtype=float32 ):
+    """Chunked triangleutilities.normalPerFace
+
+    vertices -- (x,3) triangle vertex array or buffer (see as_vertices)
+    out -- (x/3,3) array (normally a memmap, see create_output)
+        into which normals are written, if None a new in-memory
+        array is allocated
+    ccw -- whether to use counter-clock-wise winding
+    chunkSize -- number of triangles processed per chunk
+    dtype -- data-type of buffer (non-ndarray) vertices
+
+    returns out
+    """
+    vertices = as_vertices( vertices, dtype )
+    count = len(vertices)//3
+    if out is None:
+        out = empty( (count,3), vertices.dtype if vertices.dtype.kind == 'f' else float32 )
+    scratch = {}
+    for start,stop in chunks( count, chunkSize ):
+        triangleutilities.normalPerFace(
+            vertices[start*3:stop*3], ccw=ccw, out=out[start:stop], scratch=scratch,
+        )
+    return _finish( out )
+
+def centers( vertices, out=None, vertexCount=3, components=3, chunkSize=CHUNK_SIZE, dtype=float32 ):
+    """Chunked triangleutilities.centers
+
+    vertices -- (x,components) polygon vertex array or buffer
+    out -- (x/vertexCount,components) array for the results, if
+        None a new in-memory array is allocated
+    vertexCount -- the number of vertices in a given polygon
+    chunkSize -- number of polygons processed per chunk
+    dtype -- data-type of buffer (non-ndarray) vertices
+
+    returns out
+    """
+    vertices = as_vertices( vertices, dtype, components )
+    count = len(vertices)//vertexCount
+    if out is None:
+        out = empty( (count,components), vertices.dtype if vertices.dtype.kind == 'f' else float32 )
+    for start,stop in chunks( count, chunkSize ):
+        triangleutilities.centers(
+            vertices[start*vertexCount:stop*vertexCount],
+            vertexCount=vertexCount, components=components, out=out[start:stop],
+        )
+    return _finish( out )
@@ -19,8 +19,19 @@ you would do the following:
 
 That is, you use the homogenous coordinate, and
 make it the first item in the dot'ing.
+
+For arrays of coordinates, use transform_points (or
+transform_vectors/transform_normals) which apply the
+matrix to (N,3) or (N,4) arrays without building the
+homogenous copy.
 """
-from .arrays import (array, pi, cos, sin, tan, dot, identity)
+import math
+from .arrays import (
+    array, pi, cos, sin, tan, dot, identity, asarray, sqrt, where, empty,
+    matmul, broadcast_to, newaxis, remainder, any as any_, einsum, zeros,
+    linalg, empty_like, cross, argmin, absolute,
+)
+from . import quaternion
 try:
     from . import tmatrixaccel
 except ImportError:
@@ -33,6 +44,8 @@ DEGTORAD = TWOPI/360.
 # used to determine the center point of a transform
 ORIGINPOINT = array([0,0,0,1],'f')
 VERY_SMALL = 1e-300
+# number of records processed per pass by the bulk transform functions
+CHUNK_SIZE = 65536
 
 def transform_matrix(
         translation = (0,0,0),
@@ -359,3 +372,611 @@ else:
             [0,	0,	 -2/(zFar-zNear),	 tz],
             [0,	0,	0,	1],
         ], dtype='f')    
+
+def _parameter_stack( source, width, count=None ):
+    """Coerce a parameter array to a (count,width) double stack
+
+    source -- (N,>=width) array of parameters, or a single
+        (>=width,) record which is broadcast to count records
+    """
+    source = asarray( source, 'd' )
+    if source.ndim == 1:
+        source = source[newaxis]
+    source = source[:,:width]
+    if source.shape[1] != width:
+        raise ValueError( "Expected records of %s values, got shape %s"%( width, source.shape ))
+    if count is not None and len(source) != count:
+        source = broadcast_to( source, (count,width) )
+    return source
+
+def _identity_stack( count, dtype='f' ):
+    """Create a (count,4,4) stack of identity matrices"""
+    result = empty( (count,4,4), dtype )
+    result[:] = identity( 4, dtype )
+    return result
+
+def translate_matrix_stack( sources, dtype='f' ):
+    """Convert (N,3) VRML translations to matrix stacks
+
+    Returns (T, T', mask) where T and T' are (N,4,4) stacks
+    of the forward and inverse matrices and mask is an (N,)
+    boolean array which is False where translate_matrix would
+    have returned None (x == y == z == 0.0)
+    """
+    sources = _parameter_stack( sources, 3 )
+    count = len(sources)
+    T = _identity_stack( count, dtype )
+    T1 = _identity_stack( count, dtype )
+    T[:,3,:3] = sources
+    T1[:,3,:3] = -sources
+    return T, T1, any_( sources != 0.0, 1 )
+
+def scale_matrix_stack( sources, dtype='f' ):
+    """Convert (N,3) VRML scales to matrix stacks
+
+    Returns (S, S', mask) where S and S' are (N,4,4) stacks
+    of the forward and inverse matrices and mask is an (N,)
+    boolean array which is False where scale_matrix would
+    have returned None (x == y == z == 1.0)
+    """
+    sources = _parameter_stack( sources, 3 )
+    count = len(sources)
+    S = _identity_stack( count, dtype )
+    S1 = _identity_stack( count, dtype )
+    inverse = 1.0/where( sources, sources, VERY_SMALL )
+    for i in range(3):
+        S[:,i,i] = sources[:,i]
+        S1[:,i,i] = inverse[:,i]
+    return S, S1, any_( sources != 1.0, 1 )
+
+def _rotation3_stack( sources ):
+    """Calculate (N,3,3) double rotation matrices for (N,4) VRML rotations
+
+    Returns (R, mask), see rotation_matrix_stack
+    """
+    sources = _parameter_stack( sources, 4 )
+    a = sources[:,3]
+    mask = remainder( a, TWOPI ) != 0
+    axes = sources[:,:3]
+    length = sqrt( (axes*axes).sum( 1 ) )
+    length = where( length, length, 1.0 )
+    x,y,z = (axes / length[:,newaxis]).T
+    c = cos( a )
+    s = sin( a )
+    t = 1-c
+    R = empty( (len(sources),3,3), 'd' )
+    R[:,0,0] = t*x*x+c
+    R[:,0,1] = t*x*y+s*z
+    R[:,0,2] = t*x*z-s*y
+    R[:,1,0] = t*x*y-s*z
+    R[:,1,1] = t*y*y+c
+    R[:,1,2] = t*y*z+s*x
+    R[:,2,0] = t*x*z+s*y
+    R[:,2,1] = t*y*z-s*x
+    R[:,2,2] = t*z*z+c
+    R[~mask] = identity( 3 )
+    return R, mask
+
+def rotation_matrix_stack( sources, dtype='f' ):
+    """Convert (N,4) VRML rotations to matrix stacks
+
+    Returns (R, R', mask) where R and R' are (N,4,4) stacks
+    of the forward and inverse matrices and mask is an (N,)
+    boolean array which is False where rotation_matrix would
+    have returned None (angle an exact multiple of 2pi), those
+    records are set to exact identity matrices.
+
+    Rotation axes are normalised, as for rotation_matrix
+    """
+    R3,mask = _rotation3_stack( sources )
+    R = _identity_stack( len(R3), dtype )
+    R[:,:3,:3] = R3
+    # inverse of a rotation is its transpose
+    R1 = R.transpose( 0,2,1 ).copy()
+    return R, R1, mask
+
+def _stack_multiply( result, matrices, mask ):
+    """Right-multiply result by matrices for records where mask is set
+
+    Records where mask is False are identity components (the None
+    of the scalar functions) and are skipped entirely.
+    """
+    if mask.all():
+        matmul( result, matrices, out=result )
+    elif mask.any():
+        result[mask] = matmul( result[mask], matrices[mask] )
+    return result
+
+def _compose_stack( parentMatrices, *components ):
+    """Compose (matrices, mask) components in order onto each other
+
+    Equivalent to compress_matrices( parentMatrix, *reversed(components) )
+    for each record of the stacks.
+    """
+    first,mask = components[0]
+    result = first.copy()
+    for matrices,mask in components[1:]:
+        _stack_multiply( result, matrices, mask )
+    if parentMatrices is not None:
+        result = matmul( result, asarray( parentMatrices, result.dtype ) )
+    return result
+
+def _stack_parameters(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+    ):
+    """Coerce optional (or single-record) TRS parameters to (N,...) double stacks"""
+    count = None
+    for source in (translations,centers,rotations,scales,scaleOrientations):
+        if source is not None:
+            source = asarray( source )
+            if source.ndim > 1:
+                count = max( count or 0, len(source) )
+    if count is None:
+        count = 1
+    if translations is None:
+        translations = (0,0,0)
+    if centers is None:
+        centers = (0,0,0)
+    if rotations is None:
+        rotations = (0,1,0,0)
+    if scales is None:
+        scales = (1,1,1)
+    if scaleOrientations is None:
+        scaleOrientations = (0,1,0,0)
+    return (
+        _parameter_stack( translations, 3, count ),
+        _parameter_stack( centers, 3, count ),
+        _parameter_stack( rotations, 4, count ),
+        _parameter_stack( scales, 3, count ),
+        _parameter_stack( scaleOrientations, 4, count ),
+    )
+
+def _stack_components(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        dtype = 'f',
+    ):
+    """Produce the forward and inverse component stacks for transform_matrix_stack"""
+    translations,centers,rotations,scales,scaleOrientations = _stack_parameters(
+        translations,centers,rotations,scales,scaleOrientations,
+    )
+    T,T1,Tm = translate_matrix_stack( translations, dtype )
+    C,C1,Cm = translate_matrix_stack( centers, dtype )
+    R,R1,Rm = rotation_matrix_stack( rotations, dtype )
+    SO,SO1,SOm = rotation_matrix_stack( scaleOrientations, dtype )
+    S,S1,Sm = scale_matrix_stack( scales, dtype )
+    forward = (
+        (C1,Cm),(SO1,SOm),(S,Sm),(SO,SOm),(R,Rm),(C,Cm),(T,Tm),
+    )
+    inverse = (
+        (T1,Tm),(C1,Cm),(R1,Rm),(SO1,SOm),(S1,Sm),(SO,SOm),(C,Cm),
+    )
+    return forward, inverse
+
+def transform_matrix_stack(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        parentMatrices = None,
+        dtype = 'f',
+    ):
+    """Convert arrays of VRML transform values to a stack of matrices
+
+    translations, centers, scales -- (N,3) arrays
+    rotations, scaleOrientations -- (N,4) arrays (angle last, radians)
+    parentMatrices -- (N,4,4) or (4,4) parent transformation matrices
+
+    Any parameter may be None (default value for every record) or
+    a single record which is broadcast to all N records.
+
+    Returns (N,4,4) stack where each record is the matrix
+    transform_matrix would return for the corresponding parameters
+    (identity where transform_matrix would return None)
+    """
+    forward,inverse = _stack_components(
+        translations,centers,rotations,scales,scaleOrientations,dtype,
+    )
+    return _compose_stack( parentMatrices, *forward )
+
+def itransform_matrix_stack(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        parentMatrices = None,
+        dtype = 'f',
+    ):
+    """Convert arrays of VRML transform values to a stack of inverse matrices
+
+    See transform_matrix_stack for parameters, each record is the
+    matrix itransform_matrix would return for the record.
+    """
+    forward,inverse = _stack_components(
+        translations,centers,rotations,scales,scaleOrientations,dtype,
+    )
+    return _compose_stack( parentMatrices, *inverse )
+
+def transform_matrices_stack(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        parentMatrices = None,
+        dtype = 'f',
+    ):
+    """Calculate (N,4,4) forward and backward matrix stacks for these parameters
+
+    Batched version of transform_matrices, see transform_matrix_stack
+    for parameters.
+    """
+    forward,inverse = _stack_components(
+        translations,centers,rotations,scales,scaleOrientations,dtype,
+    )
+    return (
+        _compose_stack( parentMatrices, *forward ),
+        _compose_stack( parentMatrices, *inverse ),
+    )
+
+def local_matrices_stack(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        dtype = 'f',
+    ):
+    """Calculate (N,4,4) (forward,inverse) matrix stacks for transform elements
+
+    Batched version of local_matrices, see transform_matrix_stack
+    for parameters.
+    """
+    return transform_matrices_stack(
+        translations,centers,rotations,scales,scaleOrientations,None,dtype,
+    )
+
+def _rotation3( source ):
+    """Calculate 3x3 rotation rows for a VRML rotation
+
+    Returns None for null rotations (as rotation_matrix), the
+    calculation is done with Python floats to avoid creating
+    intermediate arrays.
+    """
+    x,y,z,a = [float(v) for v in source]
+    if not a % TWOPI:
+        return None
+    squared = x*x + y*y + z*z
+    if squared != 1.0:
+        length = squared ** .5
+        x /= length
+        y /= length
+        z /= length
+    c = math.cos( a )
+    s = math.sin( a )
+    t = 1-c
+    return (
+        (t*x*x+c, t*x*y+s*z, t*x*z-s*y),
+        (t*x*y-s*z, t*y*y+c, t*y*z+s*x),
+        (t*x*z+s*y, t*y*z-s*x, t*z*z+c),
+    )
+
+def _multiply3( a, b ):
+    """Multiply two 3x3 row-tuple matrices"""
+    return tuple([
+        tuple([ row[0]*b[0][j] + row[1]*b[1][j] + row[2]*b[2][j] for j in range(3) ])
+        for row in a
+    ])
+
+def _scale3( scale, orientation ):
+    """Calculate the 3x3 matrix for scale within scaleOrientation (SO' * S * SO)"""
+    if orientation is None:
+        x,y,z = scale
+        return ((x,0.,0.),(0.,y,0.),(0.,0.,z))
+    return tuple([
+        tuple([
+            sum([ orientation[k][i]*scale[k]*orientation[k][j] for k in range(3) ])
+            for j in range(3)
+        ])
+        for i in range(3)
+    ])
+
+def fused_transform_matrices(
+        translation = (0,0,0),
+        center = (0,0,0),
+        rotation = (0,1,0,0),
+        scale = (1,1,1),
+        scaleOrientation = (0,1,0,0),
+        parentMatrix = None,
+        out = None,
+        inverseOut = None,
+        dtype = 'f',
+    ):
+    """Calculate forward and backward matrices directly from VRML transform values
+
+    Closed-form equivalent of transform_matrices, rather than building
+    and multiplying each component matrix, the 3x3 linear part
+    (SO' * S * SO * R) and its inverse (R' * SO' * S' * SO) are
+    calculated directly and the translation rows are derived
+    from them.
+
+    out, inverseOut -- optional 4x4 arrays into which the forward
+        and inverse matrices are written
+    dtype -- data-type of the matrices if out/inverseOut not provided
+
+    Unlike transform_matrices, always returns (forward, inverse)
+    matrices, with identity matrices for null transforms.
+    """
+    tx,ty,tz = [float(v) for v in translation[:3]]
+    cx,cy,cz = [float(v) for v in center[:3]]
+    sx,sy,sz = [float(v) for v in scale[:3]]
+    R = _rotation3( rotation )
+    SO = _rotation3( scaleOrientation )
+    A = _scale3( (sx,sy,sz), SO )
+    B = _scale3( (1./(sx or VERY_SMALL),1./(sy or VERY_SMALL),1./(sz or VERY_SMALL)), SO )
+    if R is not None:
+        A = _multiply3( A, R )
+        B = _multiply3( tuple(zip(*R)), B )
+    # forward maps p -> (p-c)*A + c + t, inverse p -> (p-c-t)*B + c
+    px,py,pz = tx+cx, ty+cy, tz+cz
+    if out is None:
+        out = empty( (4,4), dtype )
+    if inverseOut is None:
+        inverseOut = empty( (4,4), dtype )
+    out[:] = (
+        A[0]+(0.,),
+        A[1]+(0.,),
+        A[2]+(0.,),
+        tuple([ p - (cx*A[0][j] + cy*A[1][j] + cz*A[2][j]) for j,p in enumerate((px,py,pz)) ])+(1.,),
+    )
+    inverseOut[:] = (
+        B[0]+(0.,),
+        B[1]+(0.,),
+        B[2]+(0.,),
+        tuple([ c - (px*B[0][j] + py*B[1][j] + pz*B[2][j]) for j,c in enumerate((cx,cy,cz)) ])+(1.,),
+    )
+    if parentMatrix is not None:
+        out[:] = dot( out, parentMatrix )
+        inverseOut[:] = dot( inverseOut, parentMatrix )
+    return out, inverseOut
+
+def _scale3_stack( scales, orientations, mask ):
+    """Calculate (N,3,3) scale-within-scaleOrientation matrices"""
+    if mask.any():
+        return einsum( 'nki,nk,nkj->nij', orientations, scales, orientations )
+    result = zeros( (len(scales),3,3), 'd' )
+    for i in range(3):
+        result[:,i,i] = scales[:,i]
+    return result
+
+def fused_transform_matrices_stack(
+        translations = None,
+        centers = None,
+        rotations = None,
+        scales = None,
+        scaleOrientations = None,
+        parentMatrices = None,
+        out = None,
+        inverseOut = None,
+        dtype = 'f',
+    ):
+    """Calculate (N,4,4) forward and backward stacks directly from VRML transform values
+
+    Closed-form equivalent of transform_matrices_stack (see
+    fused_transform_matrices), parameters are as for
+    transform_matrix_stack.
+
+    out, inverseOut -- optional (N,4,4) arrays into which the
+        forward and inverse matrices are written
+    dtype -- data-type of the matrices if out/inverseOut not provided
+
+    returns (forward, inverse)
+    """
+    translations,centers,rotations,scales,scaleOrientations = _stack_parameters(
+        translations,centers,rotations,scales,scaleOrientations,
+    )
+    count = len(translations)
+    R,Rm = _rotation3_stack( rotations )
+    SO,SOm = _rotation3_stack( scaleOrientations )
+    A = _scale3_stack( scales, SO, SOm )
+    B = _scale3_stack( 1.0/where( scales, scales, VERY_SMALL ), SO, SOm )
+    if Rm.any():
+        A = matmul( A, R )
+        B = matmul( R.transpose( 0,2,1 ), B )
+    pivots = translations + centers
+    if out is None:
+        out = empty( (count,4,4), dtype )
+    if inverseOut is None:
+        inverseOut = empty( (count,4,4), dtype )
+    for target,linear,translation in (
+        (out,A,pivots - einsum( 'ni,nij->nj', centers, A )),
+        (inverseOut,B,centers - einsum( 'ni,nij->nj', pivots, B )),
+    ):
+        target[:,:3,:3] = linear
+        target[:,:3,3] = 0
+        target[:,3,:3] = translation
+        target[:,3,3] = 1
+    if parentMatrices is not None:
+        parentMatrices = asarray( parentMatrices, out.dtype )
+        matmul( out, parentMatrices, out=out )
+        matmul( inverseOut, parentMatrices, out=inverseOut )
+    return out, inverseOut
+
+def _bulk_arrays( points, out ):
+    """Coerce points to an (N,3|4) float array and allocate out if necessary"""
+    points = asarray( points )
+    if points.dtype.kind != 'f':
+        points = asarray( points, 'f' )
+    if points.ndim != 2:
+        points = points.reshape( (-1,points.shape[-1]) )
+    if points.shape[-1] not in (3,4):
+        raise ValueError( "Expected (N,3) or (N,4) array, got %s"%( points.shape, ))
+    if out is None:
+        out = empty_like( points )
+    elif out.shape != points.shape:
+        raise ValueError( "Output shape %s does not match input %s"%( out.shape, points.shape ))
+    return points, out
+
+def transform_points( points, matrix, out=None, chunkSize=CHUNK_SIZE ):
+    """Apply matrix to an array of points
+
+    points -- (N,3) or (N,4) array of coordinates, (N,3) arrays
+        are treated as having an implicit w of 1.0, (N,4)
+        arrays are transformed as homogenous coordinates
+    matrix -- 4x4 transformation matrix, such as from transform_matrix
+    out -- optional output array of the same shape as points,
+        may be points itself for in-place operation
+    chunkSize -- number of points processed per pass, limits the
+        size of temporary arrays
+
+    For (N,3) points, if the matrix is projective (last column is
+    not (0,0,0,1)) the results are divided by the resulting w.
+
+    The calculation is done in the dtype of points (float32
+    arrays stay float32), returns out
+    """
+    points,out = _bulk_arrays( points, out )
+    matrix = asarray( matrix, points.dtype )
+    linear = matrix[:3,:3]
+    translation = matrix[3,:3]
+    projective = bool( any_( matrix[:3,3] != 0 ) or matrix[3,3] != 1 )
+    for start in range( 0, len(points), chunkSize ):
+        source = points[start:start+chunkSize]
+        target = out[start:start+chunkSize]
+        if points.shape[1] == 4:
+            matmul( source, matrix, out=target )
+            continue
+        if projective:
+            w = matmul( source, matrix[:3,3] )
+            w += matrix[3,3]
+        matmul( source, linear, out=target )
+        target += translation
+        if projective:
+            target /= w[:,newaxis]
+    return out
+
+def transform_vectors( vectors, matrix, out=None, chunkSize=CHUNK_SIZE ):
+    """Apply matrix to an array of direction vectors (ignoring translation)
+
+    vectors -- (N,3) or (N,4) array of vectors, for (N,4) arrays
+        the 4th component is copied unchanged
+    matrix -- 4x4 transformation matrix, only the upper 3x3 is used
+    out -- optional output array of the same shape as vectors,
+        may be vectors itself for in-place operation
+    chunkSize -- number of vectors processed per pass
+
+    returns out
+    """
+    vectors,out = _bulk_arrays( vectors, out )
+    linear = asarray( matrix, vectors.dtype )[:3,:3]
+    for start in range( 0, len(vectors), chunkSize ):
+        source = vectors[start:start+chunkSize]
+        target = out[start:start+chunkSize]
+        if vectors.shape[1] == 4:
+            target[:,3] = source[:,3]
+            source = source[:,:3]
+            target = target[:,:3]
+        matmul( source, linear, out=target )
+    return out
+
+def transform_normals( normals, matrix, inverse=None, normalise=True, out=None, chunkSize=CHUNK_SIZE ):
+    """Apply matrix to an array of surface normals
+
+    normals -- (N,3) or (N,4) array of normals (4th component copied)
+    matrix -- 4x4 transformation matrix
+    inverse -- optional inverse of matrix (such as from
+        transform_matrices), if not provided the inverse of
+        the upper 3x3 of matrix is calculated
+    normalise -- if True, re-normalise the transformed normals
+        (0-length normals are left as 0-length)
+    out -- optional output array of the same shape as normals,
+        may be normals itself for in-place operation
+    chunkSize -- number of normals processed per pass
+
+    Normals are transformed by the inverse-transpose of the
+    matrix so that they remain perpendicular to surfaces under
+    non-uniform scaling.
+
+    returns out
+    """
+    normals,out = _bulk_arrays( normals, out )
+    if inverse is None:
+        inverse = linalg.inv( asarray( matrix, 'd' )[:3,:3] )
+    linear = asarray( asarray( inverse )[:3,:3].T, normals.dtype )
+    for start in range( 0, len(normals), chunkSize ):
+        source = normals[start:start+chunkSize]
+        target = out[start:start+chunkSize]
+        if normals.shape[1] == 4:
+            target[:,3] = source[:,3]
+            source = source[:,:3]
+            target = target[:,:3]
+        matmul( source, linear, out=target )
+        if normalise:
+            lengths = sqrt( einsum( 'ij,ij->i', target, target ) )
+            target /= where( lengths, lengths, 1 )[:,newaxis]
+    return out
+
+def _unit_rows( vectors ):
+    """Normalise (N,3) double vectors (0-length vectors left unchanged)"""
+    lengths = sqrt( einsum( 'ij,ij->i', vectors, vectors ) )
+    return vectors / where( lengths, lengths, 1.0 )[:,newaxis]
+
+def decompose_matrices( matrices, quaternions=False, tolerance=1e-12 ):
+    """Decompose (N,4,4) matrices to VRML translation, rotation and scale values
+
+    matrices -- (N,4,4) (or single 4x4) affine transformation
+        matrices, such as produced by transform_matrix or
+        transform_matrix_stack
+    quaternions -- if True, return rotations as (N,4) (w,x,y,z)
+        quaternions rather than XYZR (angle last, radians)
+    tolerance -- scales with magnitude below this are considered 0
+
+    Reverse of transform_matrix( translation, rotation=rotation,
+    scale=scale ) for each record, that is, assumes center is 0
+    and scaleOrientation is null (no shear).  Matrices with a
+    negative determinant are reported with a negative x scale.
+    Degenerate (0-scale) axes are completed to an orthonormal
+    rotation, fully degenerate linear parts report null rotations.
+
+    returns (translations, rotations, scales) as (N,3), (N,4) and
+    (N,3) double arrays
+    """
+    matrices = asarray( matrices, 'd' ).reshape( (-1,4,4) )
+    translations = matrices[:,3,:3].copy()
+    linear = matrices[:,:3,:3]
+    scales = sqrt( einsum( 'nij,nij->ni', linear, linear ) )
+    zero = scales < tolerance
+    scales[zero] = 0.0
+    rows = linear / where( zero, 1.0, scales )[:,:,newaxis]
+    negative = linalg.det( linear ) < 0
+    scales[negative,0] *= -1
+    rows[negative,0] *= -1
+    zeroCount = zero.sum( 1 )
+    for i in range(3):
+        j,k = (i+1)%3, (i+2)%3
+        # one degenerate axis, complete from the other two
+        fix = zero[:,i] & (zeroCount == 1)
+        if fix.any():
+            rows[fix,i] = _unit_rows( cross( rows[fix,j], rows[fix,k] ) )
+        # two degenerate axes, choose an arbitrary perpendicular pair
+        fix = ~zero[:,i] & (zeroCount == 2)
+        if fix.any():
+            axis = rows[fix,i]
+            helper = identity(3)[argmin( absolute( axis ), 1 )]
+            perpendicular = _unit_rows( cross( axis, helper ) )
+            rows[fix,j] = perpendicular
+            rows[fix,k] = cross( axis, perpendicular )
+    rows[zeroCount == 3] = identity(3)
+    rotations = quaternion.matricesToQuaternions( rows )
+    if not quaternions:
+        rotations = quaternion.quaternionsToXYZR( rotations )
+    return translations, rotations, scales
@@ -1,8 +1,33 @@
-"""Utility functions for processing triangle vertex arrays"""
-from .arrays import (asarray, reshape, divide, sum)
-from .vectorutilities import (normalise,crossProduct) 
+"""Utility functions for processing triangle vertex arrays
 
-def basisVectors( vertices, components = 3, ccw=1 ):
+Functions accept out= (and scratch=) arguments following the
+contract described in vectorutilities, floating-point vertex
+arrays keep their dtype, other arrays are promoted to float64 and
+non-array sequences are treated as float32.
+
+The *Indexed variants take a (V,components) vertex array plus
+an (F,3) index array (as for indexed face sets), gathering the
+vertices of each face directly rather than requiring the
+expanded (F*3,components) triangle soup.
+"""
+from .arrays import (
+    divide, sum, subtract, add, empty, take, intp, scratch_array,
+    bincount, argsort, cumsum, repeat, arange, einsum, arctan2,
+    maximum, minimum, finfo, newaxis, cos, any as any_, where,
+    segment_ranges, absolute, zeros, sqrt, rint, int64, uint64, lexsort,
+    concatenate, flatnonzero, searchsorted,
+)
+from .instrument import (asarray, reshape, traced)
+from . import parallel
+from .vectorutilities import (normalise,crossProduct,magnitude,_fformat)
+
+UNIFORM = 'uniform'
+AREA = 'area'
+ANGLE = 'angle'
+PAIR_CHUNK = 1<<20
+
+@traced
+def basisVectors( vertices, components = 3, ccw=1, out=None ):
     """Calculate basis vectors for given triangle vertices
     
     vertices -- x*components array of vertex
@@ -16,6 +41,8 @@ def basisVectors( vertices, components = 3, ccw=1 ):
         vertices.
     ccw -- whether to use counter-clock-wise
         winding
+    out -- optional pair of (x/3,components) arrays
+        for the results
     
     returns two x/3 arrays of vectors, (second
     minus first, third minus second), that is,
@@ -23,7 +50,7 @@ def basisVectors( vertices, components = 3, ccw=1 ):
     which is 1/3 of the length of the original
     vertices array.
     """
-    vertices = asarray( vertices, 'f')
+    vertices = asarray( vertices, _fformat(vertices))
     if len(vertices.shape)==2 and vertices.shape[1] in (3,4):
         # don't reshape...
         pass
@@ -32,19 +59,29 @@ def basisVectors( vertices, components = 3, ccw=1 ):
     firsts = vertices[0::3]
     seconds = vertices[1::3]
     thirds = vertices[2::3]
+    if out is None:
+        out = (None,None)
     if ccw:
-        return seconds-firsts, thirds-seconds
+        return (
+            subtract( seconds, firsts, out=out[0] ),
+            subtract( thirds, seconds, out=out[1] ),
+        )
     else:
         # clockwise winding, 
-        return thirds-firsts, seconds-thirds
+        return (
+            subtract( thirds, firsts, out=out[0] ),
+            subtract( seconds, thirds, out=out[1] ),
+        )
         
-def centers( vertices, vertexCount=3, components = 3  ):
+@traced
+def centers( vertices, vertexCount=3, components = 3, out=None ):
     """Calculate polygon center for given polygon vertices
 
     vertices -- x*components array of vertex
         coordinates, with x a multiple of vertexCount
     vertexCount -- the number of vertices in a given polygon
     components -- the number of coordinates in a given vertex
+    out -- optional (x,components) array for the result
     
     returns x-length array of center coordinates
 
@@ -52,29 +89,479 @@ def centers( vertices, vertexCount=3, components = 3  ):
     of vertexCount by components floats, you'll get a
     ValueError raised.
     """
-    vertices = asarray( vertices, 'f')
+    vertices = asarray( vertices, _fformat(vertices))
     targetShape = (-1, vertexCount, components)
     vertices = reshape( vertices, targetShape)
     # the center is the average of the vertices
     # (as far as we are concerned)
-    vertices = sum( vertices, 1 )
+    vertices = sum( vertices, 1, out=out )
     # note that this is done for space savings,
     # this does an in-place division, rather than
     # creating a new array
     vertices = divide(vertices, vertexCount, vertices )
     return vertices
 
-def normalPerFace( vertices, ccw=1 ):
+@traced
+def normalPerFace( vertices, ccw=1, out=None, scratch=None, workers=None ):
     """Calculate triangle normals for given triangle vertices
 
     vertices -- x*3 array of vertex
         coordinates, with x a multiple of 3
     ccw -- whether to use counter-clock-wise
         winding
+    out -- optional (x/3,3) array for the result
+    scratch -- optional scratch dictionary for temporaries
+    workers -- number of threads (see parallel), each chunk of
+        triangles is processed completely by a single thread
 
     returns array of normal vectors
     """
-    a,b = basisVectors( vertices, 3, ccw=ccw  )
-    cross = crossProduct(a,b)
-    return normalise( cross )
+    vertices = asarray( vertices, _fformat(vertices))
+    vertices = reshape( vertices, (-1,3))
+    shape = (len(vertices)//3,3)
+    if parallel.resolve( workers, shape[0] ) > 1:
+        if out is None:
+            out = empty( shape, vertices.dtype )
+        def chunk( start, stop ):
+            normalPerFace(
+                vertices[start*3:stop*3], ccw=ccw, out=out[start:stop],
+                scratch=parallel.thread_scratch( scratch ),
+            )
+        parallel.run_chunked( chunk, shape[0], workers )
+        return out
+    a,b = basisVectors( vertices, 3, ccw=ccw, out=(
+        scratch_array( scratch, 'normalPerFace.a', shape, vertices.dtype ),
+        scratch_array( scratch, 'normalPerFace.b', shape, vertices.dtype ),
+    ))
+    cross = crossProduct( a, b, out=out, scratch=scratch )
+    return normalise( cross, out=cross, scratch=scratch )
+
+
+def _indexed( vertices, indices, vertexCount=3, check=True ):
+    """Coerce vertices and (F,vertexCount) indices, checking index range
+
+    check -- False when the caller passes the indices on to a
+        function which checks them itself
+    """
+    vertices = asarray( vertices, _fformat(vertices))
+    if not (len(vertices.shape)==2 and vertices.shape[1] in (3,4)):
+        vertices = reshape( vertices, (-1,3))
+    indices = asarray( indices )
+    if indices.dtype.kind not in 'iu':
+        indices = asarray( indices, intp )
+    indices = reshape( indices, (-1,vertexCount))
+    if check and len(indices) and (indices.min() < 0 or indices.max() >= len(vertices)):
+        raise ValueError( "Vertex indices must be in the range 0 to %s"%( len(vertices)-1, ))
+    return vertices, indices
+
+def _gather( vertices, indices, out ):
+    """Gather vertices[indices] into out (indices already range-checked)"""
+    # mode='clip' avoids the buffered copy take makes of out for mode='raise'
+    return take( vertices, indices, axis=0, out=out, mode='clip' )
+
+@traced
+def basisVectorsIndexed( vertices, indices, ccw=1, out=None, scratch=None ):
+    """Calculate basis vectors for indexed triangles
+
+    vertices -- (V,3) or (V,4) array of vertex coordinates
+    indices -- (F,3) array of vertex indices for each triangle
+    ccw -- whether to use counter-clock-wise winding
+    out -- optional pair of (F,components) arrays for the results
+    scratch -- optional scratch dictionary for temporaries
+
+    returns two (F,components) arrays as for basisVectors
+    """
+    vertices, indices = _indexed( vertices, indices )
+    shape = (len(indices),vertices.shape[1])
+    if out is None:
+        out = (empty( shape, vertices.dtype ),empty( shape, vertices.dtype ))
+    first,second = out
+    if ccw:
+        order = (1,0,2)
+    else:
+        order = (2,0,1)
+    temporary = _gather(
+        vertices, indices[:,order[1]],
+        scratch_array( scratch, 'basisVectorsIndexed', shape, vertices.dtype ),
+    )
+    # for ccw, first = v1 - v0 and second = v2 - v1
+    _gather( vertices, indices[:,order[0]], first )
+    _gather( vertices, indices[:,order[2]], second )
+    subtract( second, first, out=second )
+    subtract( first, temporary, out=first )
+    return first, second
+
+@traced
+def centersIndexed( vertices, indices, out=None, scratch=None ):
+    """Calculate polygon centers for indexed polygons
+
+    vertices -- (V,3) or (V,4) array of vertex coordinates
+    indices -- (F,vertexCount) array of vertex indices for each polygon
+    out -- optional (F,components) array for the result
+    scratch -- optional scratch dictionary for temporaries
+
+    returns (F,components) array of center coordinates
+    """
+    indices = asarray( indices )
+    vertexCount = indices.shape[-1] if indices.ndim > 1 else 3
+    vertices, indices = _indexed( vertices, indices, vertexCount )
+    shape = (len(indices),vertices.shape[1])
+    if out is None:
+        out = empty( shape, vertices.dtype )
+    _gather( vertices, indices[:,0], out )
+    if vertexCount > 1:
+        temporary = scratch_array( scratch, 'centersIndexed', shape, vertices.dtype )
+        for column in range( 1, vertexCount ):
+            add( out, _gather( vertices, indices[:,column], temporary ), out=out )
+    return divide( out, vertexCount, out )
+
+@traced
+def normalPerFaceIndexed( vertices, indices, ccw=1, out=None, scratch=None ):
+    """Calculate triangle normals for indexed triangles
+
+    vertices -- (V,3) array of vertex coordinates
+    indices -- (F,3) array of vertex indices for each triangle
+    ccw -- whether to use counter-clock-wise winding
+    out -- optional (F,3) array for the result
+    scratch -- optional scratch dictionary for temporaries
+
+    returns (F,3) array of normal vectors
+    """
+    # basisVectorsIndexed checks the index range
+    vertices, indices = _indexed( vertices, indices, check=False )
+    shape = (len(indices),3)
+    a,b = basisVectorsIndexed( vertices[:,:3], indices, ccw=ccw, out=(
+        scratch_array( scratch, 'normalPerFace.a', shape, vertices.dtype ),
+        scratch_array( scratch, 'normalPerFace.b', shape, vertices.dtype ),
+    ), scratch=scratch )
+    cross = crossProduct( a, b, out=out, scratch=scratch )
+    return normalise( cross, out=cross, scratch=scratch )
+
+def _cornerWeights( vertices, indices, weighting, ccw ):
+    """Unit face normals and (F,3,3) weighted normal contribution of each corner"""
+    a,b = basisVectorsIndexed( vertices[:,:3], indices, ccw=ccw )
+    faces = crossProduct( a, b )
+    lengths = magnitude( faces )
+    unit = faces / maximum( lengths, finfo( faces.dtype ).tiny )[:,newaxis]
+    if weighting == AREA:
+        # cross product length is twice the triangle area
+        weights = lengths[:,newaxis].repeat( 3, 1 )
+    elif weighting == ANGLE:
+        corners = take( vertices[:,:3], indices, axis=0 )
+        weights = empty( indices.shape, faces.dtype )
+        for i in range( 3 ):
+            first = corners[:,(i+1)%3] - corners[:,i]
+            second = corners[:,(i+2)%3] - corners[:,i]
+            weights[:,i] = arctan2(
+                magnitude( crossProduct( first, second ) ),
+                einsum( 'ij,ij->i', first, second ),
+            )
+    elif weighting in (UNIFORM,None):
+        weights = (lengths > 0)[:,newaxis].repeat( 3, 1 ).astype( faces.dtype )
+    else:
+        raise ValueError( "Unknown normal weighting: %r"%( weighting, ))
+    return unit, unit[:,newaxis,:] * weights[:,:,newaxis]
+
+def _scatter( targets, contributions, count ):
+    """Sum (N,3) contributions into (count,3) by (N,) target index"""
+    result = empty( (count,3), contributions.dtype )
+    for component in range( 3 ):
+        result[:,component] = bincount(
+            targets, weights=contributions[:,component], minlength=count,
+        )
+    return result
+
+def _fallback( sums, segments, order, faces, unit ):
+    """Apply the combineNormals degenerate-sum fallback to zero rows of sums
+
+    segments -- (len(sums),) start of each row's segment in order
+    order -- corner indices sorted into segments
+    faces -- face index of each corner
+    """
+    degenerate = ~any_( sums, 1 )
+    if degenerate.any():
+        normals = unit[faces[order[segments[degenerate]]]]
+        flat = ~any_( normals[:,:2], 1 )
+        normals[~flat,:2] *= -1
+        normals[flat,2] *= -1
+        sums[degenerate] = normals
+    return normalise( sums, out=sums )
+
+@traced
+def vertexNormals( vertices, indices, weighting=UNIFORM, ccw=1 ):
+    """Calculate smooth per-vertex normals for an indexed triangle mesh
 
+    vertices -- (V,3) array of vertex coordinates
+    indices -- (F,3) array of vertex indices for each triangle
+    weighting -- UNIFORM (each adjacent face counts equally, as
+        for utilities.combineNormals), AREA (weighted by triangle
+        area) or ANGLE (weighted by the triangle's angle at the vertex)
+    ccw -- whether to use counter-clock-wise winding
+
+    Face normals are scatter-added into their vertices in a
+    single pass.  Where the sum for a vertex is zero (e.g. two
+    opposing faces) the first adjacent face normal is used,
+    flipped as in utilities.combineNormals.  Vertices referenced
+    by no face get zero normals.
+
+    returns (V,3) array of unit normals
+    """
+    vertices, indices = _indexed( vertices, indices )
+    unit, contributions = _cornerWeights( vertices, indices, weighting, ccw )
+    corners = indices.ravel()
+    sums = _scatter( corners, contributions.reshape( (-1,3) ), len(vertices) )
+    counts = bincount( corners, minlength=len(vertices) )
+    used = counts > 0
+    order = argsort( corners, kind='stable' )
+    starts = cumsum( counts ) - counts
+    sums[used] = _fallback(
+        sums[used], starts[used], order, arange( len(corners) )//3, unit,
+    )
+    return sums
+
+@traced
+def creaseNormals( vertices, indices, creaseAngle, weighting=UNIFORM, ccw=1, chunkSize=PAIR_CHUNK ):
+    """Calculate per-vertex normals, splitting vertices at creases
+
+    vertices, indices, weighting, ccw -- as for vertexNormals
+    creaseAngle -- angle (radians) between face normals above
+        which faces sharing a vertex are not smoothed together
+    chunkSize -- maximum number of corner pairs compared at once
+
+    Each corner of each face is smoothed with those faces around
+    its vertex whose normal is within creaseAngle of its own, then
+    corners of a vertex which produced identical normals are
+    merged back into a single (split) vertex.
+
+    A vertex with N faces compares N*N corner pairs, so the work
+    grows quadratically with valence (e.g. the centre of a large
+    fan), the pairs are processed in chunks of about chunkSize
+    (at least one corner's N pairs) so memory stays bounded.
+
+    returns (normals, sources, splitIndices) where normals is (S,3)
+    array of unit normals for the split vertices, sources is (S,)
+    index of the original vertex for each split vertex (i.e. the
+    split positions are vertices[sources]) and splitIndices is
+    (F,3) array of split vertex indices for each triangle
+    """
+    vertices, indices = _indexed( vertices, indices )
+    unit, contributions = _cornerWeights( vertices, indices, weighting, ccw )
+    contributions = contributions.reshape( (-1,3) )
+    corners = indices.ravel()
+    faces = arange( len(corners) )//3
+    order = argsort( corners, kind='stable' )
+    counts = bincount( corners, minlength=len(vertices) )
+    stops = cumsum( counts )
+    starts = stops - counts
+    # sorted corners are compared with every corner of their vertex,
+    # chunks are ranges of sorted corners with about chunkSize pairs
+    sortedVertex = corners[order]
+    repeats = counts[sortedVertex]
+    ends = cumsum( repeats )
+    bounds = [0]
+    while bounds[-1] < len(corners):
+        limit = (ends[bounds[-1]-1] if bounds[-1] else 0) + chunkSize
+        bounds.append( max( bounds[-1]+1, int( searchsorted( ends, limit, 'right' ) ) ) )
+    def pairs( start, stop ):
+        """(sorted corner, other sorted corner) pairs for sorted corners [start:stop]"""
+        vertex = sortedVertex[start:stop]
+        rows = repeat( arange( start, stop ), repeats[start:stop] )
+        return rows, segment_ranges( starts[vertex], stops[vertex] )
+    sortedUnit = unit[faces[order]]
+    threshold = cos( creaseAngle )
+    sums = empty( (len(corners),3), contributions.dtype )
+    for start, stop in zip( bounds[:-1], bounds[1:] ):
+        rows, others = pairs( start, stop )
+        smooth = einsum( 'ij,ij->i', sortedUnit[rows], sortedUnit[others] ) >= threshold
+        smooth[rows == others] = True
+        sums[start:stop] = _scatter(
+            rows - start, contributions[order[others]] * smooth[:,newaxis], stop - start,
+        )
+    sums = _fallback( sums, starts[sortedVertex], order, faces, unit )
+    # merge each corner into the first corner of its vertex with an identical normal
+    first = empty( (len(corners),), intp )
+    for start, stop in zip( bounds[:-1], bounds[1:] ):
+        rows, others = pairs( start, stop )
+        same = (sums[rows] == sums[others]).all( 1 )
+        offsets = ends[start:stop] - repeats[start:stop]
+        offsets -= offsets[0]
+        first[start:stop] = minimum.reduceat( where( same, others, len(corners) ), offsets )
+    merged = first == arange( len(corners) )
+    splitIndices = empty( (len(corners),), intp )
+    splitIndices[order] = (cumsum( merged ) - 1)[first]
+    normals = sums[merged]
+    sources = sortedVertex[merged]
+    return normals, sources, reshape( splitIndices, indices.shape )
+
+@traced
+def tangents( vertices, normals, texCoords, indices=None, out=None ):
+    """Calculate per-vertex tangents (with handedness) for normal mapping
+
+    vertices -- (V,3) array of vertex coordinates
+    normals -- (V,3) array of unit vertex normals
+    texCoords -- (V,2) array of texture coordinates
+    indices -- optional (F,3) array of vertex indices for each
+        triangle, if None vertices is a triangle soup (V a
+        multiple of 3)
+    out -- optional (V,4) array for the result
+
+    Per-triangle tangents and bitangents (the directions of
+    increasing u and v) are scatter-added into their vertices,
+    the tangent is then orthogonalised against the normal and
+    normalised (Gram-Schmidt).  Triangles with degenerate texture
+    coordinates contribute nothing, vertices without a usable
+    tangent get an arbitrary unit tangent perpendicular to the
+    normal, so the result never contains NaNs.
+
+    returns (V,4) array of (x,y,z) unit tangents and w handedness
+    (+1 or -1), the bitangent being w * cross( normal, tangent )
+    """
+    if indices is None:
+        vertices = asarray( vertices, _fformat(vertices))
+        indices = arange( len(reshape( vertices, (-1,3) )) )
+    vertices, indices = _indexed( vertices, indices )
+    vertices = vertices[:,:3]
+    dtype = vertices.dtype
+    normals = reshape( asarray( normals, dtype ), (-1,3) )
+    texCoords = reshape( asarray( texCoords, dtype ), (-1,2) )
+    if len(normals) != len(vertices) or len(texCoords) != len(vertices):
+        raise ValueError( "Require one normal and texture coordinate per vertex" )
+    first, second = (
+        take( vertices, indices[:,1], axis=0 ) - take( vertices, indices[:,0], axis=0 ),
+        take( vertices, indices[:,2], axis=0 ) - take( vertices, indices[:,0], axis=0 ),
+    )
+    firstUV, secondUV = (
+        take( texCoords, indices[:,1], axis=0 ) - take( texCoords, indices[:,0], axis=0 ),
+        take( texCoords, indices[:,2], axis=0 ) - take( texCoords, indices[:,0], axis=0 ),
+    )
+    determinant = firstUV[:,0]*secondUV[:,1] - secondUV[:,0]*firstUV[:,1]
+    scale = absolute( firstUV ).sum( 1 ) + absolute( secondUV ).sum( 1 )
+    valid = absolute( determinant ) > finfo( dtype ).eps * scale * scale
+    inverse = where( valid, 1.0, 0.0 ).astype( dtype ) / where( valid, determinant, 1.0 )
+    faceTangents = first * secondUV[:,1:] - second * firstUV[:,1:]
+    faceTangents *= inverse[:,newaxis]
+    faceBitangents = second * firstUV[:,:1] - first * secondUV[:,:1]
+    faceBitangents *= inverse[:,newaxis]
+    corners = indices.ravel()
+    vertexTangents = _scatter( corners, faceTangents.repeat( 3, 0 ), len(vertices) )
+    vertexBitangents = _scatter( corners, faceBitangents.repeat( 3, 0 ), len(vertices) )
+    # Gram-Schmidt orthogonalise against the normal
+    original = magnitude( vertexTangents )
+    vertexTangents -= normals * einsum( 'ij,ij->i', normals, vertexTangents )[:,newaxis]
+    # no contributions, or tangent (nearly) parallel to the normal
+    missing = magnitude( vertexTangents ) <= sqrt( finfo( dtype ).eps ) * original
+    missing |= original == 0
+    if missing.any():
+        # any unit vector perpendicular to the normal
+        selected = normals[missing]
+        axes = zeros( selected.shape, dtype )
+        axes[arange( len(selected) ), absolute( selected ).argmin( 1 )] = 1
+        vertexTangents[missing] = crossProduct( selected, axes )
+    if out is None:
+        out = empty( (len(vertices),4), dtype )
+    out[:,:3] = normalise( vertexTangents, out=vertexTangents )
+    handedness = einsum( 'ij,ij->i', crossProduct( normals, out[:,:3] ), vertexBitangents )
+    out[:,3] = where( handedness < 0, -1.0, 1.0 )
+    return out
+
+def _quantize( values, tolerance, width, columns ):
+    """Append (N,) int64 grid coordinates of values' columns to columns"""
+    if tolerance <= 0:
+        raise ValueError( "Weld tolerances must be positive: %r"%( tolerance, ))
+    values = reshape( asarray( values, 'd' ), (-1,width) )
+    for column in range( width ):
+        scaled = rint( values[:,column] / tolerance )
+        if len(scaled) and absolute( scaled ).max() >= 2**62:
+            raise ValueError( "Weld tolerance %r too small for values"%( tolerance, ))
+        columns.append( scaled.astype( int64 ) )
+    return len(values)
+
+@traced
+def weldVertices(
+        vertices, normals=None, texCoords=None,
+        tolerance=1e-6, normalTolerance=1e-3, texCoordTolerance=1e-6,
+    ):
+    """Merge duplicate vertices of a triangle soup into an indexed mesh
+
+    vertices -- (x,3) triangle soup (x a multiple of 3, otherwise
+        ValueError is raised)
+    normals -- optional (x,3) per-vertex normals, vertices only
+        merge when their normals also match
+    texCoords -- optional (x,2) per-vertex texture coordinates,
+        vertices only merge when these also match
+    tolerance, normalTolerance, texCoordTolerance -- grid spacing
+        to which positions, normals and texture coordinates are
+        rounded before comparison
+
+    Values which round to the same grid cell are merged, so values
+    closer than the tolerance may still be kept apart when they
+    fall either side of a cell boundary.  The rounded keys are
+    packed into a single integer (or compared column-wise when
+    they do not fit) and grouped by sorting, so there is no
+    per-vertex Python work.
+
+    returns (vertices, indices, sources) where vertices is the (W,3)
+    welded positions, indices is (x/3,3) welded vertex indices for
+    each triangle and sources is (W,) index of the soup vertex used
+    for each welded vertex (its first occurrence, welded vertices
+    are in order of first occurrence), so that other attributes
+    can be gathered as normals[sources]
+    """
+    vertices = reshape( asarray( vertices, _fformat(vertices) ), (-1,3) )
+    count = len(vertices)
+    if count % 3:
+        raise ValueError( "Triangle soup requires a multiple of 3 vertices, got %s"%( count, ))
+    columns = []
+    _quantize( vertices, tolerance, 3, columns )
+    for values, width, spacing in ((normals,3,normalTolerance),(texCoords,2,texCoordTolerance)):
+        if values is not None:
+            if _quantize( values, spacing, width, columns ) < count:
+                raise ValueError( "Require one normal and texture coordinate per vertex" )
+            columns[-width:] = [column[:count] for column in columns[-width:]]
+    if not count:
+        return vertices, empty( (0,3), intp ), empty( (0,), intp )
+    lowest = [column.min() for column in columns]
+    ranges = [int( column.max() - low ) + 1 for column, low in zip( columns, lowest )]
+    total = 1
+    for size in ranges:
+        total *= size
+    if total < 2**63:
+        # pack the grid coordinates into a single exact integer key
+        key = zeros( (count,), int64 )
+        for column, low, size in zip( columns, lowest, ranges ):
+            key *= size
+            key += column
+            key -= low
+    else:
+        # hash the grid coordinates, collisions are checked below
+        key = zeros( (count,), uint64 )
+        for column in columns:
+            key ^= column.view( uint64 )
+            key *= uint64( 0x9E3779B97F4A7C15 )
+            key ^= key >> uint64( 29 )
+    order = argsort( key )
+    key = key[order]
+    first = key[1:] != key[:-1]
+    if total >= 2**63:
+        collided = zeros( (count-1,), bool )
+        for column in columns:
+            column = column[order]
+            collided |= column[1:] != column[:-1]
+        if (collided & ~first).any():
+            order = lexsort( columns[::-1] )
+            first = zeros( (count-1,), bool )
+            for column in columns:
+                column = column[order]
+                first |= column[1:] != column[:-1]
+    # group number of each sorted vertex, groups in sorted-key order
+    groups = cumsum( concatenate( ([0],first) ) )
+    # the first occurrence is the lowest soup index within each group
+    sources = minimum.reduceat( order, concatenate( ([0],flatnonzero( first ) + 1) ) )
+    # renumber groups by first occurrence (sources are distinct soup indices)
+    occurs = zeros( (count,), bool )
+    occurs[sources] = True
+    renumber = (cumsum( occurs ) - 1)[sources]
+    remap = empty( (count,), intp )
+    remap[order] = renumber[groups]
+    sources = flatnonzero( occurs )
+    return take( vertices, sources, axis=0 ), reshape( remap, (-1,3) ), sources
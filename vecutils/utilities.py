@@ -1,39 +1,62 @@
-'''Simple utility functions that should really be in a C module'''
+'''Simple utility functions that should really be in a C module
+
+Array-returning functions accept out= (and scratch=) arguments
+following the contract described in vectorutilities.
+'''
 from .arrays import (
-    asarray, zeros, 
-    dot, reshape, sometrue, compress, 
-    allclose, 
+    zeros, subtract,
+    dot, sometrue, compress,
+    allclose, scratch_array,
 )
+from .instrument import (asarray, reshape, traced)
 from . import vectorutilities
 
+@traced
 def crossProduct( first, second ):
     """Given 2 4-item vectors, return the cross product as a 4-item vector"""
     x,y,z = vectorutilities.crossProduct( first[:3], second[:3] )[0]
     return [x,y,z,0]
+@traced
 def magnitude( vector ):
     """Given a 3 or 4-item vector, return the vector's magnitude"""
     return vectorutilities.magnitude( vector[:3] )[0]
-def normalise( vector ):
-    """Given a 3 or 4-item vector, return a 3-item unit vector"""
+@traced
+def normalise( vector, out=None ):
+    """Given a 3 or 4-item vector, return a 3-item unit vector
+
+    out -- optional 3-item array for the result
+    """
+    if out is not None:
+        vectorutilities.normalise( vector[:3], out=reshape( out, (1,3) ) )
+        return out
     return vectorutilities.normalise( vector[:3] )[0]
 
-def pointNormal2Plane( point, normal ):
+@traced
+def pointNormal2Plane( point, normal, out=None ):
     """Create parametric equation of plane from point and normal
+
+    out -- optional 4-item array for the result
     """
     point = asarray(point,'f')
-    normal = normalise(normal)
-    result = zeros((4,),'f')
-    result[:3] = normal
+    if out is None:
+        out = zeros((4,),'f')
+    result = out
+    normal = normalise(normal, out=result[:3])
     result[3] = - dot(normal, point)
     return result
 
+@traced
 def plane2PointNormal( plane ):
     """Get a point and normal from a plane equation"""
     (a,b,c,d) = plane
     return asarray((-d*a,-d*b,-d*c),'f'), asarray((a,b,c),'f')
 
-def combineNormals( normals, weights=None ):
-    """Given set of N normals, return (weighted) combination"""
+@traced
+def combineNormals( normals, weights=None, out=None ):
+    """Given set of N normals, return (weighted) combination
+
+    out -- optional 3-item array for the result
+    """
     normals = asarray( normals,'d')
     if weights:
         weights = reshape(asarray( weights, 'f'),(len(weights),1))
@@ -47,9 +70,10 @@ def combineNormals( normals, weights=None ):
             x,y,z = -x,-y,z
         else:
             x,y,z = -x,y,-z
-    return normalise( (x,y,z) )
+    return normalise( (x,y,z), out=out )
 
-def coplanar( points ):
+@traced
+def coplanar( points, scratch=None, workers=None ):
     """Determine if points are coplanar
 
     All sets of points < 4 are coplanar
@@ -58,20 +82,30 @@ def coplanar( points ):
     calculate cross-product where the cross-product is
     non-zero (not colinear), if the normalised cross-product
     is all equal, the points are collinear...
+
+    scratch -- optional scratch dictionary for temporaries
+    workers -- number of threads for the cross products and
+        normalisation (see parallel)
     """
     points = asarray( points, 'f' )
     if len(points) < 4:
         return True
     a,b = points[:2]
     vec1 = reshape(b-a,(1,3))
-    rest = points[2:] - b
+    shape = (len(points)-2,3)
+    rest = subtract(
+        points[2:], b, out=scratch_array( scratch, 'coplanar.rest', shape, points.dtype ),
+    )
     vecs = vectorutilities.crossProduct(
         rest,
         vec1,
+        out=scratch_array( scratch, 'coplanar.vecs', shape, points.dtype ),
+        scratch=scratch,
+        workers=workers,
     )
     vecsNonZero = sometrue(vecs,1)
     vecs = compress(vecsNonZero, vecs,0)
     if not len(vecs):
         return True
-    vecs = vectorutilities.normalise(vecs)
+    vecs = vectorutilities.normalise(vecs, out=vecs, scratch=scratch, workers=workers)
     return allclose( vecs[0], vecs )
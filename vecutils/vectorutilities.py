@@ -1,78 +1,195 @@
-"""Utilities for processing arrays of vectors"""
+"""Utilities for processing arrays of vectors
+
+Array-returning functions in this module (and in utilities
+and triangleutilities) share a common contract:
+
+    out -- optional pre-allocated array into which the result
+        is written (and returned), must not overlap the inputs
+        unless the function documents in-place support
+    scratch -- optional dictionary owned by the caller in which
+        temporary arrays are cached between calls, see
+        arrays.scratch_array
+
+Results use the data-type of the (floating-point) inputs, so
+float32 arrays produce float32 results without upcasting,
+non-float arrays (e.g. integer) produce float64 results and
+non-array sequences are treated as float32.
+
+Functions taking a workers argument split large inputs into
+chunks processed on a shared thread pool, see parallel (workers
+defaults to the global setting, normally 1, i.e. serial).
+
+Zero-allocation mode: a steady-state loop which passes the
+same out arrays and scratch dictionary on each iteration
+(with ndarray inputs of the final dtype and shape) allocates
+no new array buffers after the first iteration:
+
+    scratch = {}
+    normals = zeros( (len(vertices)//3,3), 'f' )
+    while running:
+        normalPerFace( vertices, out=normals, scratch=scratch )
+"""
 from .arrays import (
-    asarray, reshape, cross, zeros, sqrt, 
-    allclose, arccos, dot, where, divide_safe, sum, float32, 
+    zeros, empty, sqrt, einsum, multiply, subtract, maximum, divide,
+    allclose, arccos, dot, float32, float64, finfo, result_type, newaxis,
+    may_share_memory, cross, scratch_array,
 )
+from .instrument import (asarray, reshape, traced)
+from . import parallel
 
 def _aformat( a ):
     """If an array, return dtype, otherwise return float32 datatype"""
     return getattr( a, 'dtype', float32)
 
-def crossProduct( set1, set2):
+def _fformat( *sources ):
+    """Floating-point result dtype for the given sources (see _aformat)
+
+    Non-float arrays are promoted to float64 (as numpy does),
+    float32 is only the default for non-array sequences.
+    """
+    dtypes = []
+    for source in sources:
+        dtype = _aformat( source )
+        dtypes.append( dtype if getattr( dtype, 'kind', 'f' ) == 'f' else float64 )
+    return result_type( *dtypes )
+
+def _cross( set1, set2, out, temporary ):
+    """Write cross product of (N,3) set1 and set2 into out using temporary (N,) array"""
+    if may_share_memory( out, set1 ) or may_share_memory( out, set2 ):
+        out[:] = cross( set1, set2 )
+        return out
+    for i in range( 3 ):
+        j,k = (i+1)%3, (i+2)%3
+        target = out[:,i]
+        multiply( set1[:,j], set2[:,k], out=target )
+        multiply( set1[:,k], set2[:,j], out=temporary )
+        subtract( target, temporary, out=target )
+    return out
+
+@traced
+def crossProduct( set1, set2, out=None, scratch=None, workers=None ):
     """Compute element-wise cross-product of two arrays of vectors.
     
     set1, set2 -- sequence objects with 1 or more
         3-item vector values.  If both sets are
         longer than 1 vector, they must be the same
         length.
+    out -- optional (x,3) array for the result
+    scratch -- optional scratch dictionary for temporaries
+    workers -- number of threads (see parallel)
     
-    returns a double array with x elements,
+    returns an array with x elements,
     where x is the number of 3-element vectors
     in the longer set
     """
-    set1 = asarray( set1, _aformat(set1))
+    dtype = _aformat( set1 ), _aformat( set2 )
+    set1 = asarray( set1, dtype[0] )
     set1 = reshape( set1, (-1, 3))
-    set2 = asarray( set2, _aformat(set2))
+    set2 = asarray( set2, dtype[1] )
     set2 = reshape( set2, (-1, 3))
-    return cross( set1, set2 )
+    count = max( len(set1), len(set2) )
+    if out is None:
+        out = empty( (count,3), result_type( *dtype ) )
+    if parallel.resolve( workers, count ) > 1:
+        def chunk( start, stop ):
+            _cross(
+                set1[start:stop] if len(set1) > 1 else set1,
+                set2[start:stop] if len(set2) > 1 else set2,
+                out[start:stop],
+                scratch_array(
+                    parallel.thread_scratch( scratch ), 'crossProduct',
+                    (stop-start,), out.dtype,
+                ),
+            )
+        parallel.run_chunked( chunk, count, workers )
+        return out
+    return _cross( set1, set2, out, scratch_array( scratch, 'crossProduct', (count,), out.dtype ) )
 
-def crossProduct4( set1, set2 ):
+@traced
+def crossProduct4( set1, set2, out=None, scratch=None ):
     """Cross-product of 3D vectors stored in 4D arrays
 
-    Identical to crossProduct otherwise.
+    Identical to crossProduct otherwise, the 4th
+    component of the result is set to 1.0
     """
-    set1 = asarray( set1, _aformat(set1))
+    dtype = _aformat( set1 ), _aformat( set2 )
+    set1 = asarray( set1, dtype[0] )
     set1 = reshape( set1, (-1, 4))
-    set2 = asarray( set2, _aformat(set1))
+    set2 = asarray( set2, dtype[1] )
     set2 = reshape( set2, (-1, 4))
-    result = zeros( (len(set1),4), _aformat(set1))
-    result[:,:3] = cross( set1[:,:3],set2[:,:3])
-    result[:,3] = 1.0
-    return result
+    count = max( len(set1), len(set2) )
+    if out is None:
+        out = empty( (count,4), result_type( *dtype ) )
+    _cross(
+        set1[:,:3], set2[:,:3], out[:,:3],
+        scratch_array( scratch, 'crossProduct', (count,), out.dtype ),
+    )
+    out[:,3] = 1.0
+    return out
 
-def magnitude( vectors ):
+@traced
+def magnitude( vectors, out=None, workers=None ):
     """Calculate the magnitudes of the given vectors
     
     vectors -- sequence object with 1 or more
         3-item vector values.
+    out -- optional (x,) array for the result
+    workers -- number of threads (see parallel)
     
     returns a float array with x elements,
     where x is the number of 3-element vectors
     """
-    vectors = asarray( vectors, _aformat(vectors))
+    vectors = asarray( vectors, _fformat(vectors))
     if not (len(vectors.shape)==2 and vectors.shape[1] in (3,4)):
         vectors = reshape( vectors, (-1,vectors.shape[-1]))
-    result = sum(vectors*vectors,1 ) # index 1
+    if parallel.resolve( workers, len(vectors) ) > 1:
+        if out is None:
+            out = empty( (len(vectors),), vectors.dtype )
+        def chunk( start, stop ):
+            magnitude( vectors[start:stop], out=out[start:stop] )
+        parallel.run_chunked( chunk, len(vectors), workers )
+        return out
+    # einsum avoids the (x,3) vectors*vectors temporary
+    result = einsum( 'ij,ij->i', vectors, vectors, out=out )
     sqrt( result, result )
     return result
-def normalise( vectors ):
+
+@traced
+def normalise( vectors, out=None, scratch=None, workers=None ):
     """Get normalised versions of the vectors.
     
     vectors -- sequence object with 1 or more
         3-item vector values.
+    out -- optional (x,3) array for the result, may be
+        vectors itself for in-place normalisation
+    scratch -- optional scratch dictionary for temporaries
+    workers -- number of threads (see parallel)
     
     returns a float array with x 3-element vectors,
     where x is the number of 3-element vectors in "vectors"
 
-    Will raise ZeroDivisionError if there are 0-magnitude
-    vectors in the set.
+    0-magnitude vectors are returned unchanged (0-length).
     """
-    vectors = asarray( vectors, _aformat(vectors))
+    vectors = asarray( vectors, _fformat(vectors))
     vectors = reshape( vectors, (-1,3)) # Numpy 23.7 and 64-bit machines fail here, upgrade to 23.8
-    mags = reshape( magnitude( vectors ), (-1, 1))
-    mags = where( mags, mags, 1.0)
-    return divide_safe( vectors, mags)
+    if parallel.resolve( workers, len(vectors) ) > 1:
+        if out is None:
+            out = empty( vectors.shape, vectors.dtype )
+        def chunk( start, stop ):
+            normalise(
+                vectors[start:stop], out=out[start:stop],
+                scratch=parallel.thread_scratch( scratch ),
+            )
+        parallel.run_chunked( chunk, len(vectors), workers )
+        return out
+    mags = magnitude(
+        vectors, out=scratch_array( scratch, 'normalise', (len(vectors),), vectors.dtype ),
+    )
+    # 0-length vectors divided by the smallest normal value stay 0
+    maximum( mags, finfo( vectors.dtype ).tiny, out=mags )
+    return divide( vectors, mags[:,newaxis], out=out )
 
+@traced
 def colinear( points ):
     """Given up to 3 points, determine if they are colinear
 
@@ -93,6 +210,7 @@ def colinear( points ):
             return points
     return None
 
+@traced
 def orientToXYZR( a, b ):
     """Calculate axis/angle rotation transforming vec a -> vec b"""
     if allclose(a,b):